@@ -0,0 +1,58 @@
+"""掉落物基准测试
+
+模拟大量挖掘：在地面上方撒下许多掉落物，等它们合并、落地休眠后，
+测量每帧的开销是否只与未休眠的掉落物数量有关。
+用法: python -m benchmarks.bench_drops
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from entities import EntityManager
+from drops import ItemDrops
+from benchmarks.bench_entities import make_world
+
+
+def tick(entities, drops):
+    awake = entities.update()
+    drops.update(awake)
+    return len(awake)
+
+
+def main():
+    pygame.init()
+    world = make_world()
+    entities = EntityManager(world)
+    drops = ItemDrops(entities)
+    rng = np.random.default_rng(0)
+    grid_size = world.grid_size
+
+    total = 0
+    for count in (1000, 5000, 20000):
+        total += count
+        spawned = 0
+        while spawned < count:
+            # 每次在一片很宽的区域里挖出一批方块
+            x = rng.uniform(0, world.width * grid_size)
+            drops.spawn(int(rng.integers(1, 4)), 1, x, (world.height // 2 - 60) * grid_size)
+            spawned += 1
+
+        start = time.perf_counter()
+        frames = 0
+        while tick(entities, drops) and frames < 1000:
+            frames += 1
+        settle = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(100):
+            tick(entities, drops)
+        sleeping = (time.perf_counter() - start) / 100 * 1000
+        print(f"本轮生成 {count:>6}, 累计生成 {total:>6}: 合并后剩余 {len(entities):>6} 堆, "
+              f"全部休眠用了 {frames} 帧 ({settle:.2f} s), 休眠后每帧 {sleeping:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
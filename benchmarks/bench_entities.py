@@ -0,0 +1,66 @@
+"""实体子系统基准测试
+
+在一个有起伏地面的世界里生成不同数量的实体，测量每帧批量更新和绘制的耗时。
+用法: python -m benchmarks.bench_entities
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from entities import EntityManager
+
+FRAMES = 60
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def make_world(width=1280, height=720, grid_size=32):
+    world = World(width, height, grid_size)
+    rng = np.random.default_rng(0)
+    surface = height // 2 + np.cumsum(rng.integers(-1, 2, width)).clip(-50, 50)
+    rows = np.arange(height)[:, None]
+    world.set_grid(np.where(rows > surface[None, :], World.PLATFORM, World.EMPTY))
+    return world
+
+
+def bench(world, count):
+    entities = EntityManager(world)
+    sprite = pygame.Surface((24, 24))
+    sprite.fill((200, 50, 50))
+    entities.add_sprite(sprite)
+    rng = np.random.default_rng(1)
+    grid_size = world.grid_size
+    # 实体集中在屏幕附近，绘制时大部分可见
+    for _ in range(count):
+        entities.spawn(EntityManager.MOB,
+                       rng.uniform(20000, 21280), rng.uniform(8000, 10000),
+                       24, 24, vx=rng.uniform(-3, 3), flags=EntityManager.WALKER)
+
+    screen = pygame.Surface((1280, 720))
+    camera = (20000, (world.height // 2 - 10) * grid_size)
+    update_ms = draw_ms = 0.0
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        entities.update()
+        update_ms += time.perf_counter() - start
+        start = time.perf_counter()
+        entities.draw(screen, *camera)
+        draw_ms += time.perf_counter() - start
+    return update_ms / FRAMES * 1000, draw_ms / FRAMES * 1000
+
+
+def main():
+    pygame.init()
+    world = make_world()
+    print(f"{'实体数':>8} {'更新(ms)':>10} {'绘制(ms)':>10} {'占帧预算':>8}")
+    for count in (100, 1000, 2000, 5000, 10000):
+        update_ms, draw_ms = bench(world, count)
+        share = (update_ms + draw_ms) / FRAME_BUDGET_MS * 100
+        print(f"{count:>8} {update_ms:>10.3f} {draw_ms:>10.3f} {share:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""无窗口模拟基准测试
+
+不打开窗口，用简单的机器人输入不限帧率地运行模拟核心，报告每秒帧数和
+帧耗时分布。地图在内存中生成，不需要地图文件和角色文件。
+用法: python -m benchmarks.bench_headless
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from simulation import Simulation, ScriptedInput, wander_bot
+from entities import EntityManager
+from benchmarks.bench_entities import make_world
+
+PLAYER_DATA = {
+    "name": "测试", "hairstyle": "发型1", "body_type": "普通", "class": "弓箭手",
+    "skin_color": [255, 220, 180], "health": 100, "mana": 100, "inventory": []
+}
+
+
+def world_data(width, height):
+    world = make_world(width, height)
+    return {'width': world.width, 'height': world.height, 'grid_size': world.grid_size, 'grid': world.grid}
+
+
+def main():
+    pygame.init()
+    for width, height in ((1280, 720), (3840, 2160)):
+        simulation = Simulation(world_data(width, height), PLAYER_DATA, seed=0)
+        rng = np.random.default_rng(0)
+        center = simulation.player.rect.centerx
+        for x in rng.uniform(center - 2000, center + 2000, 200):
+            simulation.entities.spawn(EntityManager.MOB, x, simulation.player.rect.y - 200, 32, 32,
+                                      sprite=simulation.mob_sprite, flags=EntityManager.WALKER)
+        stats = simulation.run(ScriptedInput(wander_bot))
+        print(f"{width}x{height}: {stats['ticks']} 帧, {stats['ticks_per_s']:.0f} 帧/秒, "
+              f"平均 {stats['mean_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, 最慢 {stats['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""菜单空闲模式基准测试
+
+测量菜单界面空闲时的 CPU 占用，以及输入事件到达后主循环被唤醒的延迟。
+用法: python -m benchmarks.bench_idle
+"""
+import os
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from main import Game
+
+
+def measure_idle_cpu(game, seconds):
+    """让主循环在主菜单空转指定秒数，返回 CPU 占用率"""
+    game.game_state = "main_menu"
+    game.last_game_state = "main_menu"
+    game.running = True
+    timer = threading.Timer(seconds, lambda: pygame.event.post(pygame.event.Event(pygame.QUIT)))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    timer.start()
+    game.run()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return cpu / wall
+
+
+def measure_wake_latency(wait, samples):
+    """从另一个线程投递事件，统计 wait() 感知到事件的延迟（毫秒）"""
+    latencies = []
+    for _ in range(samples):
+        sent = []
+
+        def post():
+            time.sleep(0.02)
+            sent.append(time.perf_counter())
+            pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+
+        thread = threading.Thread(target=post)
+        thread.start()
+        wait()
+        latencies.append((time.perf_counter() - sent[0]) * 1000)
+        thread.join()
+    latencies.sort()
+    return latencies
+
+
+def main():
+    game = Game()
+    pygame.event.clear()
+
+    def event_wait():
+        """新的空闲模式：阻塞等待"""
+        while True:
+            game.wait_for_events()
+            events = game.get_events()
+            if any(e.type == pygame.USEREVENT for e in events):
+                return
+
+    def poll_wait():
+        """旧的轮询模式：每帧 event.get() + clock.tick(60)"""
+        while True:
+            if any(e.type == pygame.USEREVENT for e in pygame.event.get()):
+                return
+            game.clock.tick(game.fps)
+
+    print(f"空闲 CPU 占用: {measure_idle_cpu(game, 3.0) * 100:.1f}%")
+    for name, wait in (("event.wait", event_wait), ("轮询", poll_wait)):
+        lat = measure_wake_latency(wait, 50)
+        print(f"{name} 唤醒延迟: 平均 {sum(lat) / len(lat):.2f} ms, "
+              f"p50 {lat[len(lat) // 2]:.2f} ms, 最大 {lat[-1]:.2f} ms")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
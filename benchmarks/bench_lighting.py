@@ -0,0 +1,91 @@
+"""光照基准测试
+
+在大型地图上测量：计算一个区块的光照、挖掘或放置一个方块后的局部重新计算、
+以及绘制一个光照区块的耗时；并检查随机修改之后增量结果与从头计算完全一致。
+用法: python -m benchmarks.bench_lighting
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from lighting import LightMap, ChunkRenderer
+from benchmarks.bench_entities import make_world
+
+
+def check_incremental(world, light, rng, edits=300):
+    """随机挖掘、放置和放萤石之后，与新建的 LightMap 对比"""
+    size = World.CHUNK_SIZE
+    for chunk_y in range(world.height // 2 // size - 3, world.height // 2 // size + 3):
+        for chunk_x in range(10):
+            light.get_chunk(chunk_x, chunk_y)
+    for _ in range(edits):
+        x = int(rng.integers(0, 10 * size))
+        y = int(rng.integers(world.height // 2 - 60, world.height // 2 + 60))
+        world.set_block(x, y, int(rng.choice([World.EMPTY, World.EMPTY, World.PLATFORM, World.GLOWSTONE])))
+    fresh = LightMap(world)
+    world.remove_listener(fresh)
+    for (chunk_x, chunk_y), chunk in light.chunks.items():
+        if not np.array_equal(chunk, fresh.get_chunk(chunk_x, chunk_y)):
+            return False
+    return True
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((1280, 720))
+    world = make_world(3840, 2160)
+    light = LightMap(world)
+    renderer = ChunkRenderer(world, light)
+    rng = np.random.default_rng(0)
+    size = World.CHUNK_SIZE
+
+    start = time.perf_counter()
+    count = 0
+    for chunk_y in range(world.height // 2 // size - 4, world.height // 2 // size + 4):
+        for chunk_x in range(0, 40):
+            light.get_chunk(chunk_x, chunk_y)
+            count += 1
+    print(f"计算一个区块的光照: {(time.perf_counter() - start) / count * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    whole = LightMap(world)
+    world.remove_listener(whole)
+    whole.compute(0, 0, world.width, world.height)
+    print(f"（对比）一次计算整个世界 {world.width}x{world.height}: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # 在地表附近挖掘，然后放回去
+    timings = []
+    for _ in range(200):
+        x = int(rng.integers(0, 40 * size))
+        y = int(world.heights[x]) + int(rng.integers(0, 20))
+        old = world.get_block(x, y)
+        start = time.perf_counter()
+        world.set_block(x, y, World.EMPTY if old else World.PLATFORM)
+        timings.append(time.perf_counter() - start)
+    print(f"修改一个方块后的局部重新计算: 平均 {np.mean(timings) * 1000:.3f} ms, "
+          f"最慢 {np.max(timings) * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    for chunk_x in range(20):
+        renderer.render_chunk(chunk_x, world.height // 2 // size)
+    print(f"绘制一个光照区块: {(time.perf_counter() - start) / 20 * 1000:.3f} ms")
+
+    screen = pygame.Surface((1280, 720))
+    camera_x, camera_y = 0, (world.height // 2) * world.grid_size - 360
+    renderer.draw(screen, camera_x, camera_y)
+    start = time.perf_counter()
+    for _ in range(100):
+        renderer.draw(screen, camera_x, camera_y)
+    print(f"缓存命中时绘制整个屏幕: {(time.perf_counter() - start) / 100 * 1000:.3f} ms")
+
+    world = make_world()
+    ok = check_incremental(world, LightMap(world), rng)
+    print(f"增量结果与从头计算一致: {'是' if ok else '否!'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""液体基准测试
+
+在大型地图上放一个 600×60 的湖，静止时测量每帧开销；然后挖开湖岸，
+让湖水流进旁边的深坑，测量流动过程中每帧的耗时、活跃区块数，
+并检查总水量守恒。最后对比只模拟玩家附近的情况。
+用法: python -m benchmarks.bench_liquids
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from liquids import Liquids
+
+FRAMES = 600
+
+
+def make_lake_world():
+    world = World(3840, 2160, 32)
+    grid = np.zeros((world.height, world.width), dtype=np.uint8)
+    grid[1100:] = World.PLATFORM
+    # 湖：x 1000~1600，深 60；湖的右边隔一堵墙是一个 200×150 的深坑
+    grid[1040:1100, 1000:1600] = World.WATER
+    grid[1040:1100, 990:1000] = World.PLATFORM
+    grid[1040:1100, 1600:1610] = World.PLATFORM
+    grid[1100:1250, 1610:1810] = World.EMPTY
+    world.set_grid(grid)
+    return world
+
+
+def run(world, liquids, center=None):
+    timings = []
+    active = []
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        liquids.update(center)
+        timings.append(time.perf_counter() - start)
+        active.append(len(liquids.active))
+    return np.array(timings) * 1000, active
+
+
+def main():
+    pygame.init()
+    world = make_lake_world()
+    liquids = Liquids(world)
+    total = int(liquids.mass.sum())
+
+    timings, _ = run(world, liquids)
+    print(f"静止的湖: 每帧 {timings.mean():.4f} ms, 活跃区块 {len(liquids.active)}")
+
+    # 挖开湖岸的墙
+    for y in range(1040, 1100):
+        for x in range(1600, 1610):
+            world.set_block(x, y, World.EMPTY)
+    timings, active = run(world, liquids)
+    print(f"挖开湖岸后 {FRAMES} 帧: 平均 {timings.mean():.2f} ms, 最慢 {timings.max():.2f} ms, "
+          f"活跃区块最多 {max(active)}, 最后 {active[-1]}")
+    print(f"总水量守恒: {'是' if int(liquids.mass.sum()) == total else '否!'}")
+
+    # 只模拟玩家附近：玩家站在湖的左端
+    world = make_lake_world()
+    liquids = Liquids(world, radius=96)
+    for y in range(1040, 1100):
+        for x in range(1600, 1610):
+            world.set_block(x, y, World.EMPTY)
+    timings, active = run(world, liquids, center=(1000, 1040))
+    print(f"只模拟玩家附近 96 格: 平均 {timings.mean():.2f} ms, 活跃区块最多 {max(active)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""寻路基准测试
+
+在起伏的地面上测量：生成区块寻路图的开销、冷启动和缓存后的单次寻路耗时、
+修改方块后只重建受影响区块的开销，以及大量怪物同时寻路时按预算分帧
+处理的每帧耗时；最后让怪物沿路径行走，统计到达终点的比例。
+用法: python -m benchmarks.bench_navigation
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from entities import EntityManager
+from navigation import NavGraph, PathPlanner
+from benchmarks.bench_entities import make_world
+
+
+def surface_node(graph, x):
+    return graph.snap(x, int(graph.world.heights[x]) - 1)
+
+
+def bench_queries(world):
+    graph = NavGraph(world)
+    planner = PathPlanner(graph, budget=10 ** 9)
+    center = world.width // 2
+    print(f"{'距离(格)':>8} {'冷启动(ms)':>10} {'缓存后(ms)':>10} {'路径长度':>8} {'生成区块':>8}")
+    for distance in (50, 200, 800):
+        results = []
+        for _ in range(2):
+            builds = graph.builds
+            start = time.perf_counter()
+            planner.request(0, surface_node(graph, center), surface_node(graph, center + distance))
+            planner.update()
+            results.append(((time.perf_counter() - start) * 1000, graph.builds - builds))
+        path = planner.paths.pop(0, [])
+        print(f"{distance:>8} {results[0][0]:>10.2f} {results[1][0]:>10.2f} {len(path):>8} {results[0][1]:>8}")
+
+    chunk_ms = min(timed(lambda: graph.build_chunk(center // 32, int(world.heights[center]) // 32))
+                   for _ in range(20))
+    print(f"生成一个区块: {chunk_ms:.3f} ms")
+
+    # 挖掉路上的一格，只有附近的区块被丢弃，再次寻路时重建
+    x = center + 100
+    builds = graph.builds
+    start = time.perf_counter()
+    world.set_block(x, int(world.heights[x]), World.EMPTY)
+    planner.request(0, surface_node(graph, center), surface_node(graph, center + 200))
+    planner.update()
+    print(f"修改方块后重新寻路: {(time.perf_counter() - start) * 1000:.2f} ms, "
+          f"重建 {graph.builds - builds} 个区块 (共缓存 {len(graph.chunks)} 个)")
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_many(world, count=500):
+    graph = NavGraph(world)
+    planner = PathPlanner(graph)
+    rng = np.random.default_rng(0)
+    center = world.width // 2
+    for index in range(count):
+        x = int(rng.integers(center - 300, center + 300))
+        planner.request(index, surface_node(graph, x), surface_node(graph, x + int(rng.integers(-60, 60))))
+    frames = []
+    while planner.queue:
+        frames.append(timed(planner.update))
+    print(f"{count} 个怪物同时寻路 (每帧预算 {planner.budget} 个节点): {len(frames)} 帧完成, "
+          f"平均 {np.mean(frames):.2f} ms/帧, 最慢 {np.max(frames):.2f} ms, 找到 {len(planner.paths)} 条路径")
+
+
+def bench_follow(world, count=50, frames=900):
+    graph = NavGraph(world)
+    planner = PathPlanner(graph)
+    entities = EntityManager(world)
+    entities.add_listener(planner)
+    grid_size = world.grid_size
+    rng = np.random.default_rng(1)
+    center = world.width // 2
+    goals = {}
+    for _ in range(count):
+        x = int(rng.integers(center - 200, center + 200))
+        start = surface_node(graph, x)
+        goal = surface_node(graph, x + int(rng.integers(-40, 40)))
+        index = entities.spawn(EntityManager.MOB, start[0] * grid_size + 2,
+                               (start[1] + 1) * grid_size - 28, 28, 28)
+        if planner.request(index, start, goal):
+            goals[index] = goal
+    steer_ms = []
+    for _ in range(frames):
+        planner.update()
+        steer_ms.append(timed(lambda: planner.steer(entities)))
+        entities.update()
+    arrived = sum(planner.foot_tile(entities, index) == goal for index, goal in goals.items())
+    print(f"{len(goals)} 个怪物沿路径行走 {frames} 帧: {arrived} 个到达终点, "
+          f"steer 平均 {np.mean(steer_ms):.3f} ms/帧")
+
+
+def main():
+    pygame.init()
+    bench_queries(make_world(4000, 720))
+    bench_many(make_world(4000, 720))
+    bench_follow(make_world(4000, 720))
+
+
+if __name__ == "__main__":
+    main()
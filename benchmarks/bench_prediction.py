@@ -0,0 +1,112 @@
+"""客户端预测与快照插值测试
+
+在本机启动专用服务器和模拟延迟、抖动的代理（LagProxy），几个脚本客户端通过代理
+连接服务器。报告：
+- 预测：自己的移动在本地立即生效（0 帧），而服务器确认一个输入要等一个往返；
+  预测错误（与服务器的权威状态不一致）的次数和校正的距离
+- 插值：其他玩家每帧显示位置的移动量。直接用最新快照时位置只在收到快照时跳动，
+  插值后每帧平滑移动，移动量的标准差和最大值小得多
+用法: python -m benchmarks.bench_prediction
+"""
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from simulation import Simulation, wander_bot
+from server import GameServer
+from netclient import GameClient
+from lag_proxy import LagProxy
+from benchmarks.bench_headless import world_data
+import protocol
+
+SECONDS = 5
+CLIENTS = 4
+TICK_RATE = 60
+
+
+class TimedClient(GameClient):
+    """记录每个输入从发出到服务器确认的时间"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.sent = {}
+        self.round_trips = []
+
+    def step(self, held):
+        super().step(held)
+        self.sent[self.sequence] = time.perf_counter()
+
+    def reconcile(self, sequence, tick, state):
+        now = time.perf_counter()
+        for old in [old for old in self.sent if old <= sequence]:
+            if old == sequence:
+                self.round_trips.append(now - self.sent[old])
+            del self.sent[old]
+        super().reconcile(sequence, tick, state)
+
+
+async def run_client(port, index, seconds):
+    client = TimedClient(f"机器人{index}")
+    await client.connect('127.0.0.1', port)
+    raw, smooth = [], []  # 每帧其他玩家的显示位置
+    interval = 1 / TICK_RATE
+    start = time.perf_counter()
+    tick = index * 300  # 错开每个客户端的走动
+    while time.perf_counter() - start < seconds:
+        client.step(wander_bot(tick % 2000).held)
+        raw.append({key: value[1:] for key, value in client.entities.items()
+                    if value[0] == protocol.PLAYER_KIND and key != protocol.PLAYER_FLAG | client.player_id})
+        smooth.append({key: value[1:] for key, value in client.interpolated().items()
+                       if value[0] == protocol.PLAYER_KIND})
+        tick += 1
+        await asyncio.sleep(interval)
+    await client.close()
+    return client, raw, smooth
+
+
+def frame_moves(frames):
+    """相邻两帧同一个玩家的移动距离"""
+    moves = []
+    for previous, current in zip(frames, frames[1:]):
+        for key, (x, y) in current.items():
+            if key in previous:
+                moves.append(np.hypot(x - previous[key][0], y - previous[key][1]))
+    return np.array(moves) if moves else np.zeros(1)
+
+
+async def bench(latency, jitter):
+    server = GameServer(Simulation(world_data(1280, 720), None, seed=0))
+    port = await server.start()
+    proxy = LagProxy('127.0.0.1', port, latency, jitter, seed=0)
+    proxy_port = await proxy.start()
+    runner = asyncio.ensure_future(server.run())
+    results = await asyncio.gather(*(run_client(proxy_port, i, SECONDS) for i in range(CLIENTS)))
+    runner.cancel()
+    await proxy.stop()
+    await server.stop()
+    return results
+
+
+def main():
+    pygame.init()
+    print(f"{'延迟(ms)':>8} {'抖动(ms)':>8} {'确认(ms)':>8} {'状态数':>6} {'预测错误':>8} {'平均校正':>8} "
+          f"{'最大校正':>8} {'原始移动std':>11} {'原始最大':>8} {'插值移动std':>11} {'插值最大':>8}")
+    for latency, jitter in ((0.0, 0.0), (0.05, 0.01), (0.1, 0.03)):
+        results = asyncio.run(bench(latency, jitter))
+        round_trips = np.concatenate([client.round_trips for client, _, _ in results]) * 1000
+        corrections = np.concatenate([client.corrections for client, _, _ in results] + [[]])
+        states = sum(client.states for client, _, _ in results)
+        raw = np.concatenate([frame_moves(raw) for _, raw, _ in results])
+        smooth = np.concatenate([frame_moves(smooth) for _, _, smooth in results])
+        print(f"{latency * 1000:>8.0f} {jitter * 1000:>8.0f} {round_trips.mean():>8.1f} {states:>6} "
+              f"{len(corrections):>8} {corrections.mean() if len(corrections) else 0:>8.1f} "
+              f"{corrections.max() if len(corrections) else 0:>8.1f} {raw.std():>11.2f} {raw.max():>8.1f} "
+              f"{smooth.std():>11.2f} {smooth.max():>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""投射物基准测试
+
+持续发射，让场上保持几百个投射物，并放置一批怪物，测量每帧更新耗时；
+另外检查速度远大于方块尺寸的投射物不会穿过一格厚的墙。
+用法: python -m benchmarks.bench_projectiles
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from entities import EntityManager
+from projectiles import ProjectilePool
+from benchmarks.bench_entities import make_world
+
+FRAMES = 300
+
+
+def check_tunneling():
+    """速度 200 像素/帧的箭射向一格厚的墙"""
+    world = World(64, 16, 32)
+    world.set_block(40, 8, World.PLATFORM)
+    pool = ProjectilePool(world, EntityManager(world))
+    index = pool.fire(ProjectilePool.SPELL, 10 * 32, 8 * 32 + 16, 200, 0)
+    while pool.active[index]:
+        pool.update()
+    stopped_at = pool.x[index] / 32
+    print(f"高速投射物停在第 {stopped_at:.2f} 格（墙在第 40 格）: {'通过' if 39 < stopped_at <= 40 else '穿墙!'}")
+
+
+def main():
+    pygame.init()
+    check_tunneling()
+
+    world = make_world()
+    entities = EntityManager(world)
+    pool = ProjectilePool(world, entities, capacity=2048)
+    rng = np.random.default_rng(0)
+    grid_size = world.grid_size
+    base_y = (world.height // 2 - 60) * grid_size
+    for x in rng.uniform(0, 4000, 200):
+        entities.spawn(EntityManager.MOB, x, base_y, 32, 32, hp=1000)
+
+    for target in (100, 300, 600, 1000):
+        total = 0.0
+        live = []
+        for _ in range(FRAMES):
+            while len(pool) < target:
+                angle = rng.uniform(-0.6, 0.2)
+                speed = rng.uniform(10, 40)
+                kind = ProjectilePool.ARROW if rng.random() < 0.5 else ProjectilePool.SPELL
+                pool.fire(kind, rng.uniform(0, 4000), base_y - 200,
+                          np.cos(angle) * speed, np.sin(angle) * speed)
+            start = time.perf_counter()
+            pool.update()
+            entities.update()
+            total += time.perf_counter() - start
+            live.append(len(pool))
+        print(f"场上约 {np.mean(live):>6.0f} 个投射物: 每帧 {total / FRAMES * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""区域调度基准测试
+
+在大型地图上到处放置流动的水和怪物，对比全部更新和按区域调度（玩家附近
+每帧更新、稍远降频、更远冻结）时每帧的耗时；并测量玩家走到远处时
+冻结区域恢复、补算的开销。
+用法: python -m benchmarks.bench_regions
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from entities import EntityManager
+from liquids import Liquids
+from block_updates import BlockUpdates
+from regions import RegionScheduler
+
+FRAMES = 120
+
+
+def make_world():
+    world = World(3840, 2160, 32)
+    grid = np.zeros((world.height, world.width), dtype=np.uint8)
+    surface = world.height // 2
+    grid[surface] = World.GRASS
+    grid[surface + 1:surface + 4] = World.GROUND
+    grid[surface + 4:] = World.PLATFORM
+    # 每隔 120 格一个悬在空中的水池，会一直往下流
+    for x in range(0, world.width - 20, 120):
+        grid[surface - 40:surface - 30, x:x + 20] = World.WATER
+    world.set_grid(grid)
+    return world
+
+
+def setup(world):
+    liquids = Liquids(world)
+    updates = BlockUpdates(world)
+    entities = EntityManager(world, capacity=8192)
+    rng = np.random.default_rng(0)
+    for x in rng.uniform(0, world.width * world.grid_size, 5000):
+        entities.spawn(EntityManager.MOB, x, (world.height // 2 - 3) * world.grid_size, 24, 24,
+                       vx=rng.uniform(-2, 2), flags=EntityManager.WALKER)
+    # 唤醒所有水池
+    for x in range(0, world.width - 20, 120):
+        liquids.wake(x, world.height // 2 - 40, x + 20, world.height // 2 - 30)
+    return liquids, updates, entities
+
+
+def run_everything(world):
+    liquids, updates, entities = setup(world)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        updates.update()
+        liquids.update()
+        entities.update(entities.alive_ids())
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def run_scheduled(world, walk=False):
+    liquids, updates, entities = setup(world)
+    regions = RegionScheduler(world)
+    regions.register(liquids.tick_region)
+    regions.register(updates.tick_region)
+    player_x, player_y = world.width // 2, world.height // 2
+    timings = []
+    for frame in range(FRAMES):
+        if walk:
+            player_x = (player_x + 8) % world.width  # 每帧跑 8 格，不断进入冻结区域
+        start = time.perf_counter()
+        regions.set_center(player_x, player_y)
+        updates.run_scheduled()
+        regions.update()
+        ids = entities.alive_ids()
+        grid_size = world.grid_size
+        steps = np.minimum(regions.elapsed_at(entities.x[ids] // grid_size, entities.y[ids] // grid_size),
+                           RegionScheduler.LAZY_INTERVAL)
+        entities.update(ids[steps > 0], steps[steps > 0])
+        timings.append(time.perf_counter() - start)
+    return np.mean(timings) * 1000, np.max(timings) * 1000
+
+
+def main():
+    pygame.init()
+    print(f"全部更新: 每帧 {run_everything(make_world()):.2f} ms")
+    mean, worst = run_scheduled(make_world())
+    print(f"按区域调度（玩家不动）: 平均 {mean:.2f} ms, 最慢 {worst:.2f} ms")
+    mean, worst = run_scheduled(make_world(), walk=True)
+    print(f"按区域调度（玩家快速移动，冻结区域恢复补算）: 平均 {mean:.2f} ms, 最慢 {worst:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
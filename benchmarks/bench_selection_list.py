@@ -0,0 +1,59 @@
+"""角色/地图选择界面基准测试
+
+在临时目录中生成大量角色和地图文件，测量目录扫描、列表刷新、绘制和滚动的耗时。
+用法: python -m benchmarks.bench_selection_list [条目数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from main import Game
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label}: {elapsed:.3f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    game = Game()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        game.player_path = os.path.join(tmp, "players")
+        game.world_path = os.path.join(tmp, "worlds")
+        os.makedirs(game.player_path)
+        os.makedirs(game.world_path)
+        for i in range(count):
+            for path in (game.player_path, game.world_path):
+                with open(os.path.join(path, f"条目{i:04d}.json"), "w", encoding="utf-8") as f:
+                    f.write("{}")
+
+        print(f"条目数: {count}")
+        timed("首次扫描并刷新列表", game.load_characters_and_maps)
+        timed("目录未变化时刷新列表", game.load_characters_and_maps, repeat=20)
+        timed("绘制角色选择界面", game.draw_character_select, repeat=20)
+        timed("绘制地图选择界面", game.draw_map_select, repeat=20)
+
+        wheel = pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=-1)
+        pygame.mouse.set_pos(game.character_list.rect.center)
+
+        def scroll_and_draw():
+            game.character_list.handle_event(wheel)
+            game.draw_character_select()
+
+        timed("滚动一次并重绘", scroll_and_draw, repeat=100)
+        print(f"复用的行控件数: {len(game.character_list.rows)}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""多人游戏服务器负载测试
+
+在本机启动专用服务器，连接不同数量的脚本客户端（走动、跳跃、每秒挖一个方块），
+报告服务器每帧的耗时、平均到每个客户端的耗时和每个客户端收到的流量。
+玩家或者都在出生点附近（互相都在视野内），或者分散在整个世界里；
+有兴趣管理时，分散的玩家每个客户端的流量和开销不随玩家数增长。
+客户端和服务器在同一个进程里运行。
+用法: python -m benchmarks.bench_server
+"""
+import asyncio
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from simulation import Simulation
+from server import GameServer
+from netclient import run_bot
+from benchmarks.bench_headless import world_data
+
+SECONDS = 5
+
+
+async def bench(count, spread):
+    server = GameServer(Simulation(world_data(3840, 720), None, seed=0))
+    if spread:
+        world = server.world
+        rng = np.random.default_rng(0)
+
+        def spawn_point():
+            x = int(rng.integers(20, world.width - 20))
+            return x * world.grid_size, int(world.heights[x]) * world.grid_size - 64
+
+        server.spawn_point = spawn_point
+    port = await server.start()
+    runner = asyncio.ensure_future(server.run())
+    clients = await asyncio.gather(*(run_bot('127.0.0.1', port, f"机器人{i}", SECONDS) for i in range(count)))
+    runner.cancel()
+    await server.stop()
+    stats = server.stats()
+    received = np.array([client.bytes_received for client in clients]) / 1024 / SECONDS
+    return stats, received.mean(), received.max()
+
+
+def main():
+    pygame.init()
+    print(f"{'分布':>4} {'客户端':>6} {'帧数':>6} {'平均(ms)':>10} {'p99(ms)':>10} {'每客户端(ms)':>12} "
+          f"{'KB/s/客户端':>12} {'最多(KB/s)':>10}")
+    for spread in (False, True):
+        for count in (4, 16, 64):
+            stats, mean_kb, max_kb = asyncio.run(bench(count, spread))
+            print(f"{'分散' if spread else '集中':>4} {count:>6} {stats['ticks']:>6} {stats['mean_ms']:>10.2f} "
+                  f"{stats['p99_ms']:>10.2f} {stats['mean_ms'] / count:>12.3f} {mean_kb:>12.1f} {max_kb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
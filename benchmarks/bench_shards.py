@@ -0,0 +1,89 @@
+"""多进程分片模拟测试
+
+在大型世界里放很多分散的玩家（只给出位置）和大量怪物，比较单进程的
+Simulation.step_world 和按列分片、每片一个工作进程的 ShardedSimulation 的
+每秒帧数。分片的帧耗时约等于最慢的一片加上协调器汇总的开销，
+所以吞吐量随 CPU 核数增长；核数少于分片数时没有收益。
+每条可能的分界线上都有一片水，检查流过分界线后液体总量不变。
+用法: python -m benchmarks.bench_shards
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from simulation import Simulation
+from shards import ShardedSimulation
+from entities import EntityManager
+from benchmarks.bench_headless import world_data
+
+WIDTH, HEIGHT = 8192, 1024
+PLAYERS = 64
+MOBS = 4000
+TICKS = 100
+WATER_SPACING = 1024  # 分片数为 2、4、8 时的分界线都是它的倍数
+
+
+def populate(world, spawn):
+    """均匀分散的玩家位置和怪物"""
+    rng = np.random.default_rng(0)
+    columns = rng.integers(20, world.width - 20, PLAYERS)
+    centers = [(int(x), int(world.heights[x]) - 2) for x in columns]
+    for x in rng.integers(20, world.width - 20, MOBS).tolist():
+        spawn(EntityManager.MOB, x * world.grid_size, (int(world.heights[x]) - 2) * world.grid_size, 32, 32,
+              vx=float(rng.choice([-2, 2])), flags=EntityManager.WALKER)
+    return centers
+
+
+def add_water(data):
+    """在每条可能的分界线两侧的地面上方放一片水，返回放水的位置（也作为玩家位置，让那里的区域更新）"""
+    grid = data['grid'].copy()
+    surface = np.argmax(World.SOLID[grid], axis=0)
+    centers = []
+    for x in range(WATER_SPACING, WIDTH, WATER_SPACING):
+        top = int(surface[x - 16:x + 16].min())
+        grid[top - 30:top - 10, x - 16:x + 16] = World.WATER
+        centers.append((x, top - 2))
+    return dict(data, grid=grid), centers
+
+
+def run(step_world, centers):
+    seconds = []
+    for _ in range(TICKS):
+        start = time.perf_counter()
+        step_world(centers)
+        seconds.append(time.perf_counter() - start)
+    return np.array(seconds) * 1000
+
+
+def main():
+    pygame.init()
+    data, water_centers = add_water(world_data(WIDTH, HEIGHT))
+    print(f"{WIDTH}x{HEIGHT}, {PLAYERS} 个玩家, {MOBS} 个怪物, CPU 核数 {os.cpu_count()}")
+    print(f"{'分片':>4} {'帧/秒':>8} {'平均(ms)':>10} {'p99(ms)':>10} {'最慢分片(ms)':>12} {'实体':>6} {'水量':>8}")
+
+    simulation = Simulation(data, None, seed=0)
+    centers = populate(simulation.world, simulation.entities.spawn) + water_centers
+    total = int(simulation.liquids.mass.sum(dtype=np.int64))
+    ms = run(simulation.step_world, centers)
+    assert int(simulation.liquids.mass.sum(dtype=np.int64)) == total, "液体总量变了"
+    print(f"{'单进程':>4} {1000 / ms.mean():>8.0f} {ms.mean():>10.2f} {np.percentile(ms, 99):>10.2f} "
+          f"{'-':>12} {len(simulation.entities):>6} {total:>8}")
+
+    for shards in (1, 2, 4, 8):
+        with ShardedSimulation(data, shards, seed=0) as simulation:
+            centers = populate(simulation.world, simulation.spawn) + water_centers
+            simulation.step_world(centers)  # 等工作进程启动完
+            simulation.tick_seconds.clear()
+            ms = run(simulation.step_world, centers)
+            assert simulation.liquid_mass() == total, "分片后液体总量变了"
+            slowest = max(stats['mean_ms'] for stats in simulation.stats()['shards'])
+            print(f"{shards:>4} {1000 / ms.mean():>8.0f} {ms.mean():>10.2f} {np.percentile(ms, 99):>10.2f} "
+                  f"{slowest:>12.2f} {len(simulation.entities):>6} {simulation.liquid_mass():>8}")
+
+
+if __name__ == "__main__":
+    main()
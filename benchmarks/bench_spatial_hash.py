@@ -0,0 +1,73 @@
+"""空间哈希基准测试
+
+实体密度保持不变、数量从 1000 增加到 10000，测量增量更新、每个实体做一次半径查询
+以及最近邻查询的耗时，并与逐对 colliderect 检测对比。耗时随实体数近似线性增长。
+用法: python -m benchmarks.bench_spatial_hash
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from entities import EntityManager
+
+DENSITY = 1 / (64 * 64)  # 平均每 64×64 像素一个实体
+
+
+def populate(count):
+    side = int((count / DENSITY) ** 0.5)
+    world = World(side // 32 + 1, side // 32 + 1, 32)
+    entities = EntityManager(world)
+    rng = np.random.default_rng(0)
+    for x, y in rng.uniform(0, side, (count, 2)):
+        entities.spawn(EntityManager.MOB, x, y, 24, 24)
+    return entities, rng
+
+
+def bench(count):
+    entities, rng = populate(count)
+    ids = entities.alive_ids()
+    result = {}
+
+    # 所有实体小幅移动后的增量更新
+    entities.x[ids] += rng.uniform(-4, 4, len(ids)).astype(np.float32)
+    entities.y[ids] += rng.uniform(-4, 4, len(ids)).astype(np.float32)
+    start = time.perf_counter()
+    entities.hash.update(ids)
+    result['更新'] = time.perf_counter() - start
+
+    centers_x = (entities.x[ids] + 12).tolist()
+    centers_y = (entities.y[ids] + 12).tolist()
+    start = time.perf_counter()
+    for cx, cy in zip(centers_x, centers_y):
+        entities.hash.query_radius(cx, cy, 48)
+    result['半径查询'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for cx, cy in zip(centers_x[:1000], centers_y[:1000]):
+        entities.hash.nearest(cx, cy, 512)
+    result['最近邻(1000次)'] = time.perf_counter() - start
+
+    if count <= 2000:
+        rects = [pygame.Rect(int(x), int(y), 24, 24) for x, y in zip(entities.x[ids], entities.y[ids])]
+        start = time.perf_counter()
+        for rect in rects:
+            rect.collidelistall(rects)
+        result['逐对检测'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    columns = ['更新', '半径查询', '最近邻(1000次)', '逐对检测']
+    print(f"{'实体数':>8}" + "".join(f"{c:>16}" for c in columns) + "    (ms)")
+    for count in (1000, 2000, 5000, 10000):
+        result = bench(count)
+        row = "".join(f"{result[c] * 1000:>16.2f}" if c in result else f"{'-':>16}" for c in columns)
+        print(f"{count:>8}{row}")
+
+
+if __name__ == "__main__":
+    main()
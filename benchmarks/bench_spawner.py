@@ -0,0 +1,69 @@
+"""怪物生成基准测试
+
+在不同大小的世界里、预先放入不同数量的实体，让玩家一直向右走，
+测量生成器每帧的平均、p99 和最慢耗时，说明开销与世界大小和实体数量无关。
+用法: python -m benchmarks.bench_spawner
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from entities import EntityManager
+from lighting import LightMap
+from spawner import MobSpawner
+
+FRAMES = 3000
+
+
+def make_world(width, height):
+    """草地地表，地下每隔 8 格有一层两格高的隧道"""
+    world = World(width, height, 32)
+    rng = np.random.default_rng(0)
+    surface = height // 3 + np.cumsum(rng.integers(-1, 2, width)).clip(-20, 20)
+    rows = np.arange(height)[:, None]
+    grid = np.where(rows > surface[None, :], World.PLATFORM, World.EMPTY).astype(np.uint8)
+    grid[rows == surface[None, :]] = World.GRASS
+    caves = (rows % 8 < 2) & (rows > surface[None, :] + 5)
+    grid[caves] = World.EMPTY
+    world.set_grid(grid)
+    return world
+
+
+def bench(width, height, others):
+    world = make_world(width, height)
+    entities = EntityManager(world, capacity=max(256, others + 256))
+    rng = np.random.default_rng(1)
+    grid_size = world.grid_size
+    # 与生成器无关的实体（掉落物），分布在整个世界
+    for x, y in zip(rng.uniform(0, width * grid_size, others), rng.uniform(0, height * grid_size, others)):
+        entities.spawn(EntityManager.DROP, x, y, 16, 16, flags=EntityManager.SLEEPING)
+    spawner = MobSpawner(world, entities, LightMap(world), seed=0)
+    player_x = width // 4
+    timings = []
+    for frame in range(FRAMES):
+        player_x += 0.2
+        player_y = world.heights[int(player_x)]  # 玩家站在地面上
+        start = time.perf_counter()
+        spawner.update([(player_x, player_y)])
+        timings.append(time.perf_counter() - start)
+    kinds = list(spawner.mobs.values())
+    ms = np.asarray(timings) * 1000
+    return (ms.mean(), np.percentile(ms, 99), ms.max(),
+            kinds.count(MobSpawner.ANIMAL), kinds.count(MobSpawner.ENEMY))
+
+
+def main():
+    pygame.init()
+    print(f"{'世界':>12} {'其他实体':>8} {'平均(ms)':>10} {'p99(ms)':>10} {'最慢(ms)':>10} {'动物':>6} {'敌人':>6}")
+    for width, height in ((1280, 720), (8000, 2400)):
+        for others in (0, 20000):
+            mean, p99, worst, animals, enemies = bench(width, height, others)
+            print(f"{width:>6}x{height:<5} {others:>8} {mean:>10.4f} {p99:>10.3f} {worst:>10.3f} {animals:>6} {enemies:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""地形生成测试
+
+用 TerrainGenerator 生成大地图（3840x2160），报告整张地图的耗时、
+单个区块的平均耗时和各种方块所占的比例，并检查按打乱顺序逐个区块生成
+的结果与整张地图一次生成的结果完全相同（区块之间没有接缝）。
+用法: python -m benchmarks.bench_terrain
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+from world import World
+from terrain import TerrainGenerator
+
+WIDTH, HEIGHT = 3840, 2160
+SEED = 1
+
+
+def main():
+    generator = TerrainGenerator(WIDTH, HEIGHT, SEED)
+    start = time.perf_counter()
+    grid = generator.generate()
+    whole_s = time.perf_counter() - start
+    print(f"整张地图 {WIDTH}x{HEIGHT}: {whole_s:.2f} 秒")
+
+    # 只检查左上角的一块，打乱区块的生成顺序
+    size = World.CHUNK_SIZE
+    chunks_x, chunks_y = 24, HEIGHT // size
+    chunks = [(chunk_x, chunk_y) for chunk_y in range(chunks_y) for chunk_x in range(chunks_x)]
+    np.random.default_rng(0).shuffle(chunks)
+    assembled = np.empty((chunks_y * size, chunks_x * size), dtype=np.uint8)
+    start = time.perf_counter()
+    for chunk_x, chunk_y in chunks:
+        assembled[chunk_y * size:(chunk_y + 1) * size,
+                  chunk_x * size:(chunk_x + 1) * size] = generator.generate_chunk(chunk_x, chunk_y)
+    chunk_s = (time.perf_counter() - start) / len(chunks)
+    assert (assembled == grid[:chunks_y * size, :chunks_x * size]).all(), "逐区块生成的结果与整张地图不同"
+    print(f"单个区块: {chunk_s * 1000:.2f} 毫秒（{len(chunks)} 个区块，结果与整张地图相同）")
+
+    counts = np.bincount(grid.ravel(), minlength=256)
+    for block_type in [World.EMPTY] + list(World.BLOCK_NAMES):
+        name = World.BLOCK_NAMES.get(block_type, "空气")
+        print(f"{name:>6} {counts[block_type] / grid.size * 100:>7.3f}%")
+
+
+if __name__ == "__main__":
+    main()
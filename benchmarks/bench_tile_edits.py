@@ -0,0 +1,79 @@
+"""每帧合并方块变化的测试
+
+每帧在玩家附近逐格修改一批方块（连续挖掘、放置、爆炸一类的突发修改），
+比较每次修改立即通知监听者和模拟核心默认的每帧结束时合并通知：
+报告每帧耗时，以及光照重新计算、渲染缓存收到通知的次数。
+用法: python -m benchmarks.bench_tile_edits
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from simulation import Simulation
+from lighting import ChunkRenderer
+from minimap import Minimap
+from world_map import WorldMap
+from benchmarks.bench_headless import world_data, PLAYER_DATA
+
+FRAMES = 60
+
+
+class Counter:
+    """统计被包装的方法调用了多少次"""
+
+    def __init__(self, method):
+        self.method = method
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.method(*args)
+
+
+def bench(data, deferred, edits):
+    simulation = Simulation(dict(data, grid=data['grid'].copy()), PLAYER_DATA, seed=0)
+    world = simulation.world
+    world.deferred = deferred
+    renderer = ChunkRenderer(world, simulation.lighting)
+    Minimap(world)
+    WorldMap(world)
+    center_x = simulation.player.rect.centerx // world.grid_size
+    center_y = simulation.player.rect.centery // world.grid_size
+    for chunk_y in range(center_y // World.CHUNK_SIZE - 2, center_y // World.CHUNK_SIZE + 3):
+        for chunk_x in range(center_x // World.CHUNK_SIZE - 2, center_x // World.CHUNK_SIZE + 3):
+            simulation.lighting.get_chunk(chunk_x, chunk_y)
+    relight = simulation.lighting.relight = Counter(simulation.lighting.relight)
+    tile_notices = renderer.on_block_changed = Counter(renderer.on_block_changed)
+    batch_notices = renderer.on_blocks_changed = Counter(renderer.on_blocks_changed)
+
+    rng = np.random.default_rng(0)
+    seconds = []
+    for _ in range(FRAMES):
+        xs = center_x + rng.integers(-12, 13, edits)
+        ys = center_y + rng.integers(-8, 9, edits)
+        types = rng.choice([World.EMPTY, World.PLATFORM, World.SAND], edits)
+        start = time.perf_counter()
+        for x, y, block_type in zip(xs.tolist(), ys.tolist(), types.tolist()):
+            world.set_block(x, y, block_type)
+        world.flush_changes()
+        seconds.append(time.perf_counter() - start)
+    return np.array(seconds) * 1000, relight.calls / FRAMES, (tile_notices.calls + batch_notices.calls) / FRAMES
+
+
+def main():
+    pygame.init()
+    data = world_data(1280, 720)
+    print(f"{'每帧修改':>8} {'方式':>6} {'平均(ms)':>10} {'最慢(ms)':>10} {'光照/帧':>8} {'渲染通知/帧':>10}")
+    for edits in (10, 50, 200):
+        for deferred in (False, True):
+            ms, relights, notices = bench(data, deferred, edits)
+            print(f"{edits:>8} {'合并' if deferred else '立即':>6} {ms.mean():>10.2f} {ms.max():>10.2f} "
+                  f"{relights:>8.1f} {notices:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""批量编辑测试
+
+在带有全部监听者（光照、渲染缓存、小地图、世界地图、液体、寻路等）的世界里，
+比较逐格 set_block 和 WorldEditor 的批量操作（矩形、圆、泛洪填充、贴图）以及
+撤销/重做的耗时，并报告撤销历史占用的内存。模拟核心在每帧结束时合并
+通知监听者，所有耗时都包括最后的 flush_changes。
+用法: python -m benchmarks.bench_world_edit
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from world import World
+from simulation import Simulation
+from lighting import ChunkRenderer
+from minimap import Minimap
+from world_map import WorldMap
+from benchmarks.bench_headless import world_data
+
+
+def make_simulation(data):
+    simulation = Simulation(dict(data, grid=data['grid'].copy()), None, seed=0)
+    world = simulation.world
+    # 让光照在编辑区域附近已经计算过，编辑时需要重新计算
+    for chunk_y in range(world.height // World.CHUNK_SIZE):
+        for chunk_x in range(4, 12):
+            simulation.lighting.get_chunk(chunk_x, chunk_y)
+    ChunkRenderer(world, simulation.lighting)
+    Minimap(world)
+    WorldMap(world)
+    return simulation
+
+
+def per_tile(world, before):
+    """用逐格 set_block 做出与 before 之后相同的修改"""
+    rows, cols = np.nonzero(world.grid != before)
+    values = world.grid[rows, cols].copy()
+    world.grid[rows, cols] = before[rows, cols]
+    world.set_grid(world.grid)
+    start = time.perf_counter()
+    for x, y, block_type in zip(cols.tolist(), rows.tolist(), values.tolist()):
+        world.set_block(x, y, block_type)
+    world.flush_changes()
+    return time.perf_counter() - start
+
+
+def main():
+    pygame.init()
+    data = world_data(1024, 512)
+    rng = np.random.default_rng(0)
+    stamp = rng.choice([World.EMPTY, World.PLATFORM, World.GLOWSTONE], size=(48, 64)).astype(np.uint8)
+    cx = 256
+    operations = [
+        ("矩形 64x64", lambda editor, cy: editor.fill_rect(cx - 32, cy - 32, cx + 32, cy + 32, World.PLATFORM)),
+        ("爆炸 r=24", lambda editor, cy: editor.fill_circle(cx, cy, 24, World.EMPTY,
+                                                             replace=[World.PLATFORM, World.GRASS])),
+        ("泛洪填充", lambda editor, cy: editor.flood_fill(cx, cy - 40, World.WATER, max_radius=48)),
+        ("贴图 64x48", lambda editor, cy: editor.paste(stamp, cx - 32, cy - 24, transparent=World.EMPTY)),
+    ]
+    print(f"{'操作':>10} {'格子数':>6} {'逐格(ms)':>10} {'批量(ms)':>10} {'加速':>6} {'撤销(ms)':>10} "
+          f"{'重做(ms)':>10} {'历史(KB)':>9}")
+    for name, operation in operations:
+        bulk = make_simulation(data)
+        world = bulk.world
+        cy = int(world.heights[cx])
+        before = world.grid.copy()
+        start = time.perf_counter()
+        count = operation(bulk.editor, cy)
+        world.flush_changes()
+        bulk_s = time.perf_counter() - start
+        history = sum(record.nbytes for record in bulk.editor.undo_stack) / 1024
+
+        tiles = make_simulation(data)
+        tiles.world.grid[:] = world.grid
+        tile_s = per_tile(tiles.world, before)
+
+        start = time.perf_counter()
+        bulk.editor.undo()
+        world.flush_changes()
+        undo_s = time.perf_counter() - start
+        assert (world.grid == before).all()
+        start = time.perf_counter()
+        bulk.editor.redo()
+        world.flush_changes()
+        redo_s = time.perf_counter() - start
+        print(f"{name:>10} {count:>6} {tile_s * 1000:>10.2f} {bulk_s * 1000:>10.2f} {tile_s / bulk_s:>6.1f} "
+              f"{undo_s * 1000:>10.2f} {redo_s * 1000:>10.2f} {history:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
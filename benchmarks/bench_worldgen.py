@@ -0,0 +1,41 @@
+"""并行地形生成测试
+
+用不同数量的工作进程生成大地图（3840x2160），报告耗时、相对单进程的加速比，
+并检查每次的结果与单进程生成的完全相同。多进程的耗时包括启动进程池。
+最后一行是 workers=None（按核数和世界大小自动选择）的耗时。
+用法: python -m benchmarks.bench_worldgen
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from terrain import TerrainGenerator
+
+WIDTH, HEIGHT = 3840, 2160
+SEED = 1
+
+
+def main():
+    generator = TerrainGenerator(WIDTH, HEIGHT, SEED)
+    start = time.perf_counter()
+    expected = generator.generate()
+    single_s = time.perf_counter() - start
+    print(f"CPU 核数: {os.cpu_count()}")
+    print(f"{'进程数':>6} {'耗时(秒)':>10} {'加速':>6}")
+    print(f"{1:>6} {single_s:>10.2f} {1.0:>6.2f}")
+    for workers in (2, 4, 8):
+        start = time.perf_counter()
+        grid = generator.generate(workers=workers)
+        seconds = time.perf_counter() - start
+        assert (grid == expected).all(), "并行生成的结果与单进程不同"
+        print(f"{workers:>6} {seconds:>10.2f} {single_s / seconds:>6.2f}")
+    start = time.perf_counter()
+    grid = generator.generate(workers=None)
+    seconds = time.perf_counter() - start
+    assert (grid == expected).all(), "并行生成的结果与单进程不同"
+    print(f"{'自动':>6} {seconds:>10.2f} {single_s / seconds:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import heapq
+import numpy as np
+from world import World
+
+
+class BlockUpdates:
+    """方块更新调度器
+
+    有两种更新：
+    - 计划更新：按游戏帧排序的优先队列。方块变化时通知它自己和上下左右的邻居，
+      需要响应的方块类型（例如会下落的沙子）被加入队列，在若干帧之后处理。
+    - 随机更新：每帧在每个已加载的区块里随机挑几个格子，交给对应方块类型处理
+      （例如草地向旁边的泥土蔓延）。总数有上限，所以每帧的开销与世界大小无关。
+    可以单独用 update(center) 驱动，也可以把 tick_region 注册到区域调度器，
+    每帧先调用 run_scheduled。
+    """
+    DELAYS = {World.SAND: 2}  # 方块类型 -> 计划更新的延迟（帧）
+    RANDOM_TICKS_PER_CHUNK = 3
+    MAX_RANDOM_TICKS = 4096  # 每帧随机更新的上限
+    MAX_SCHEDULED = 512  # 每帧最多处理的计划更新，剩下的留到下一帧
+    GRASS_MIN_LIGHT = 9  # 草地蔓延需要的亮度
+
+    def __init__(self, world, light=None, radius=64, seed=None):
+        self.world = world
+        self.light = light
+        self.radius = radius  # 中心点这么多格以内的区块视为已加载
+        self.chunk_size = World.CHUNK_SIZE
+        self.tick = 0
+        self.queue = []  # (帧, 序号, x, y)
+        self.pending = set()  # 已在队列中的 (x, y)，避免重复
+        self.sequence = 0
+        self.random_budget = self.MAX_RANDOM_TICKS
+        self.rng = np.random.default_rng(seed)
+
+        self.scheduled_handlers = {World.SAND: self.fall}
+        self.random_handlers = {World.GRASS: self.grow_grass}
+        self.random_types = np.zeros(256, dtype=bool)
+        self.random_types[list(self.random_handlers)] = True
+        world.add_listener(self)
+
+    def schedule(self, x, y, delay):
+        """delay 帧之后更新 (x, y)"""
+        if (x, y) in self.pending:
+            return
+        self.pending.add((x, y))
+        self.sequence += 1
+        heapq.heappush(self.queue, (self.tick + delay, self.sequence, x, y))
+
+    def on_block_changed(self, x, y, old, new):
+        """通知变化的方块和上下左右的邻居"""
+        world = self.world
+        for nx, ny in ((x, y), (x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            delay = self.DELAYS.get(world.get_block(nx, ny))
+            if delay is not None:
+                self.schedule(nx, ny, delay)
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        """批量变化时一次找出所有需要计划更新的方块和邻居"""
+        world = self.world
+        nx = np.concatenate([xs, xs, xs, xs - 1, xs + 1])
+        ny = np.concatenate([ys, ys - 1, ys + 1, ys, ys])
+        inside = (nx >= 0) & (nx < world.width) & (ny >= 0) & (ny < world.height)
+        nx, ny = nx[inside], ny[inside]
+        hit = np.isin(world.grid[ny, nx], list(self.DELAYS))
+        for x, y in set(zip(nx[hit].tolist(), ny[hit].tolist())):
+            self.schedule(x, y, self.DELAYS[world.get_block(x, y)])
+
+    def fall(self, x, y):
+        """沙子下面是空气时向下落一格（落下后由邻居通知继续下落）"""
+        if y + 1 < self.world.height and self.world.get_block(x, y + 1) == World.EMPTY:
+            block_type = self.world.get_block(x, y)
+            self.world.set_block(x, y, World.EMPTY)
+            self.world.set_block(x, y + 1, block_type)
+            return True
+        return False
+
+    def grow_grass(self, x, y):
+        """草地被盖住时变回泥土，否则向周围上方是空气的泥土蔓延"""
+        world = self.world
+        if World.SOLID[world.get_block(x, y - 1)]:
+            world.set_block(x, y, World.GROUND)
+            return True
+        nx = x + int(self.rng.integers(-1, 2))
+        ny = y + int(self.rng.integers(-1, 2))
+        if world.get_block(nx, ny) != World.GROUND or world.get_block(nx, ny - 1) != World.EMPTY:
+            return False
+        if self.light is not None and self.light.get_light(nx, ny - 1) < self.GRASS_MIN_LIGHT:
+            return False
+        world.set_block(nx, ny, World.GRASS)
+        return True
+
+    def loaded_chunks(self, center):
+        """中心点附近的区块 (区块x 数组, 区块y 数组)"""
+        size = self.chunk_size
+        chunks_x = -(-self.world.width // size)
+        chunks_y = -(-self.world.height // size)
+        if center is None:
+            xs, ys = np.arange(chunks_x), np.arange(chunks_y)
+        else:
+            reach = -(-self.radius // size)
+            cx, cy = int(center[0]) // size, int(center[1]) // size
+            xs = np.arange(max(0, cx - reach), min(chunks_x, cx + reach + 1))
+            ys = np.arange(max(0, cy - reach), min(chunks_y, cy + reach + 1))
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        return grid_x.ravel(), grid_y.ravel()
+
+    def random_ticks(self, chunk_x, chunk_y, count):
+        """在给定的区块里随机挑选 count 个格子，只处理有随机更新的方块类型，返回是否有方块变化"""
+        count = min(count, self.random_budget)
+        if count <= 0 or len(chunk_x) == 0:
+            return False
+        self.random_budget -= count
+        picks = self.rng.integers(0, len(chunk_x), count)
+        size = self.chunk_size
+        xs = chunk_x[picks] * size + self.rng.integers(0, size, count)
+        ys = chunk_y[picks] * size + self.rng.integers(0, size, count)
+        inside = (xs < self.world.width) & (ys < self.world.height)
+        xs, ys = xs[inside], ys[inside]
+        hits = self.random_types[self.world.grid[ys, xs]]
+        changed = False
+        for x, y in zip(xs[hits].tolist(), ys[hits].tolist()):
+            handler = self.random_handlers.get(self.world.get_block(x, y))
+            if handler is not None:  # 同一帧里可能已经被前面的更新改掉
+                changed |= handler(x, y)
+        return changed
+
+    def run_scheduled(self):
+        """开始新的一帧：处理到期的计划更新，返回是否有方块变化"""
+        self.tick += 1
+        self.random_budget = self.MAX_RANDOM_TICKS
+        processed = 0
+        changed = False
+        while self.queue and self.queue[0][0] <= self.tick and processed < self.MAX_SCHEDULED:
+            _, _, x, y = heapq.heappop(self.queue)
+            self.pending.discard((x, y))
+            handler = self.scheduled_handlers.get(self.world.get_block(x, y))
+            if handler is not None:
+                changed |= handler(x, y)
+            processed += 1
+        return changed
+
+    def tick_region(self, bounds, tick, elapsed):
+        """区域调度器的回调：区域内的随机更新，冻结后恢复的区域按经过的帧数补算"""
+        x0, y0, x1, y1 = bounds
+        size = self.chunk_size
+        grid_x, grid_y = np.meshgrid(np.arange(x0 // size, -(-x1 // size)),
+                                     np.arange(y0 // size, -(-y1 // size)))
+        count = grid_x.size * self.RANDOM_TICKS_PER_CHUNK * elapsed
+        return self.random_ticks(grid_x.ravel(), grid_y.ravel(), count)
+
+    def update(self, center=None):
+        """推进一帧：处理到期的计划更新，然后在中心点附近的区块做随机更新，返回是否有方块变化"""
+        changed = self.run_scheduled()
+        chunk_x, chunk_y = self.loaded_chunks(center)
+        return self.random_ticks(chunk_x, chunk_y, len(chunk_x) * self.RANDOM_TICKS_PER_CHUNK) or changed
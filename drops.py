@@ -0,0 +1,136 @@
+import pygame
+import numpy as np
+from world import World
+from entities import EntityManager
+
+class ItemDrops:
+    """掉落物
+
+    掉落物是 EntityManager 中种类为 DROP 的实体，方块类型和数量保存在
+    item/stack 数组里。附近相同的掉落物会合并成一堆，落地静止后进入休眠，
+    不再参与每帧的物理更新；玩家的拾取每帧批量进行一次。
+    每帧的开销只与未休眠的掉落物数量成正比。
+    """
+    SIZE = 12
+    MERGE_RADIUS = 24
+    PICKUP_RADIUS = 48
+
+    def __init__(self, entities, rng=None):
+        self.entities = entities
+        self.rng = rng if rng is not None else np.random.default_rng()  # 掉落时的水平初速度
+        self.sprites = {}  # 方块类型 -> 精灵编号
+        entities.world.add_listener(self)
+
+    def sprite_for(self, block_type):
+        """每种方块类型的掉落物精灵只创建一次"""
+        sprite = self.sprites.get(block_type)
+        if sprite is None:
+            image = pygame.Surface((self.SIZE, self.SIZE))
+            image.fill(World.BLOCK_COLORS.get(block_type) or World.UNKNOWN_COLOR)
+            pygame.draw.rect(image, (0, 0, 0), image.get_rect(), 1)
+            sprite = self.entities.add_sprite(image)
+            self.sprites[block_type] = sprite
+        return sprite
+
+    def spawn(self, block_type, count, x, y):
+        """在 (x, y)（像素，中心点）生成一个掉落物"""
+        e = self.entities
+        index = e.spawn(EntityManager.DROP, x - self.SIZE / 2, y - self.SIZE / 2,
+                        self.SIZE, self.SIZE, vx=self.rng.uniform(-2, 2), vy=-4,
+                        sprite=self.sprite_for(block_type))
+        e.item[index] = block_type
+        e.stack[index] = count
+        return index
+
+    def on_block_changed(self, x, y, old, new):
+        """方块变化时唤醒附近休眠的掉落物（例如脚下的方块被挖掉）"""
+        grid_size = self.entities.world.grid_size
+        ids = self.entities.hash.query_aabb((x - 1) * grid_size, (y - 1) * grid_size,
+                                            (x + 2) * grid_size, (y + 2) * grid_size,
+                                            EntityManager.DROP)
+        if len(ids):
+            self.entities.wake(ids)
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        grid_size = self.entities.world.grid_size
+        ids = self.entities.hash.query_aabb((int(xs.min()) - 1) * grid_size, (int(ys.min()) - 1) * grid_size,
+                                            (int(xs.max()) + 2) * grid_size, (int(ys.max()) + 2) * grid_size,
+                                            EntityManager.DROP)
+        if len(ids):
+            self.entities.wake(ids)
+
+    def update(self, awake_ids, player=None, inventory=None):
+        """在实体物理更新之后调用：合并、休眠和批量拾取，返回是否拾取了物品"""
+        e = self.entities
+        # entities.update 返回的编号里可能有本帧已经被移除（掉出世界）的实体
+        awake = awake_ids[(e.kind[awake_ids] == EntityManager.DROP) &
+                          ((e.flags[awake_ids] & EntityManager.ALIVE) != 0)]
+
+        # 合并：未休眠的掉落物按 (类型, 所在的合并格子) 分组，每组一次性合并成一堆
+        if len(awake) > 1:
+            cell_x = np.floor(e.x[awake] / self.MERGE_RADIUS).astype(np.int64)
+            cell_y = np.floor(e.y[awake] / self.MERGE_RADIUS).astype(np.int64)
+            keys = (e.item[awake].astype(np.int64) << 48) + ((cell_x & 0xFFFFFF) << 24) + (cell_y & 0xFFFFFF)
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            if len(first) < len(awake):
+                e.stack[awake[first]] = np.bincount(inverse, weights=e.stack[awake]).astype(np.int32)
+                keep = np.zeros(len(awake), dtype=bool)
+                keep[first] = True
+                for index in awake[~keep].tolist():
+                    e.despawn(index)
+                awake = awake[keep]
+
+        # 休眠：落地并且几乎不再水平移动的掉落物。入睡前并入附近已有的同类一堆，
+        # 每个掉落物只在入睡时查询一次空间哈希
+        resting = awake[((e.flags[awake] & EntityManager.ON_GROUND) != 0) &
+                        (np.abs(e.vx[awake]) < 0.1)]
+        for index in resting.tolist():
+            cx = e.x[index] + self.SIZE / 2
+            cy = e.y[index] + self.SIZE / 2
+            others = e.hash.query_radius(cx, cy, self.MERGE_RADIUS, EntityManager.DROP)
+            others = others[(others != index) & (e.item[others] == e.item[index])]
+            if len(others):
+                e.stack[int(others[0])] += e.stack[index]
+                e.despawn(index)
+            else:
+                e.vx[index] = 0
+                e.flags[index] |= EntityManager.SLEEPING
+
+        if player is None or inventory is None:
+            return False
+        return self.pickup(player, inventory)
+
+    def take(self, x, y):
+        """移除 (x, y)（像素）附近的所有掉落物，返回按方块类型汇总的 [(方块类型, 数量)]
+
+        分片进程里没有背包，由协调器把拾取的物品放进玩家的背包。
+        """
+        e = self.entities
+        ids = e.hash.query_radius(x, y, self.PICKUP_RADIUS, EntityManager.DROP)
+        if len(ids) == 0:
+            return []
+        items = e.item[ids]
+        taken = [(block_type, int(e.stack[ids[items == block_type]].sum()))
+                 for block_type in np.unique(items).tolist()]
+        for index in ids.tolist():
+            e.despawn(index)
+        return taken
+
+    def pickup(self, player, inventory):
+        """一次性拾取玩家附近的所有掉落物，按方块类型汇总后放入背包"""
+        e = self.entities
+        ids = e.hash.query_radius(player.rect.centerx, player.rect.centery,
+                                  self.PICKUP_RADIUS, EntityManager.DROP)
+        if len(ids) == 0:
+            return False
+        picked = False
+        items = e.item[ids]
+        for block_type in np.unique(items).tolist():
+            group = ids[items == block_type]
+            total = int(e.stack[group].sum())
+            # 背包放不下时 add_items 一个也不放，这一类掉落物留在原地
+            if inventory.add_items(block_type, total) == total:
+                for index in group.tolist():
+                    e.despawn(index)
+                picked = True
+        return picked
@@ -0,0 +1,256 @@
+import numpy as np
+from world import World
+from spatial_hash import SpatialHash
+
+class EntityManager:
+    """实体子系统（怪物、掉落物、投射物）
+
+    所有实体的位置、速度、碰撞箱和标志位以结构数组（SoA）的形式保存在
+    NumPy 数组中，重力、速度积分和方块碰撞每帧对所有实体批量计算，
+    绘制时通过一次 Surface.blits 完成。
+    """
+    # 实体种类
+    MOB = 0
+    DROP = 1
+    PROJECTILE = 2
+
+    # 标志位
+    ALIVE = 1
+    ON_GROUND = 2
+    NO_GRAVITY = 4
+    WALKER = 8  # 撞墙时掉头而不是停下
+    SLEEPING = 16  # 静止的实体不参与每帧更新
+
+    def __init__(self, world, capacity=256):
+        self.world = world
+        self.gravity = 0.8  # 与玩家相同的重力加速度
+        self.max_fall_speed = 20
+        self.ground_friction = 0.8  # 着地后水平速度每帧的衰减
+        self.walk_speed = 2  # 行走实体在地面上的最大速度
+        self.count = 0  # 已使用的最大槽位数
+        self.free = []  # 可复用的空槽位
+        self.sprites = []  # 精灵编号 -> Surface
+        self.listeners = []  # 实体被移除时调用 on_despawn(index)，用来清理按编号保存的状态
+        self.allocate(capacity)
+        self.hash = SpatialHash(self, world.grid_size)
+
+    def allocate(self, capacity):
+        """分配（或扩容）结构数组"""
+        def grow(old, dtype):
+            new = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        self.x = grow(getattr(self, 'x', None), np.float32)
+        self.y = grow(getattr(self, 'y', None), np.float32)
+        self.vx = grow(getattr(self, 'vx', None), np.float32)
+        self.vy = grow(getattr(self, 'vy', None), np.float32)
+        self.w = grow(getattr(self, 'w', None), np.float32)
+        self.h = grow(getattr(self, 'h', None), np.float32)
+        self.flags = grow(getattr(self, 'flags', None), np.uint8)
+        self.kind = grow(getattr(self, 'kind', None), np.uint8)
+        self.sprite = grow(getattr(self, 'sprite', None), np.int16)
+        self.hp = grow(getattr(self, 'hp', None), np.int16)
+        self.push_x = grow(getattr(self, 'push_x', None), np.float32)  # 本帧的分离位移
+        self.item = grow(getattr(self, 'item', None), np.uint8)  # 掉落物的方块类型
+        self.stack = grow(getattr(self, 'stack', None), np.int32)  # 掉落物的数量
+        self.capacity = capacity
+
+    def add_sprite(self, surface):
+        """注册一个精灵图像，返回精灵编号"""
+        self.sprites.append(surface)
+        return len(self.sprites) - 1
+
+    def spawn(self, kind, x, y, w, h, vx=0.0, vy=0.0, sprite=0, flags=0, hp=1):
+        """生成一个实体，返回实体编号"""
+        if self.free:
+            index = self.free.pop()
+        else:
+            if self.count == self.capacity:
+                self.allocate(self.capacity * 2)
+            index = self.count
+            self.count += 1
+        self.x[index], self.y[index] = x, y
+        self.vx[index], self.vy[index] = vx, vy
+        self.w[index], self.h[index] = w, h
+        self.kind[index] = kind
+        self.sprite[index] = sprite
+        self.hp[index] = hp
+        self.push_x[index] = 0
+        self.flags[index] = flags | self.ALIVE
+        self.hash.update(np.array([index]))
+        return index
+
+    def add_listener(self, listener):
+        """注册实体移除监听者（槽位会被之后生成的实体复用）"""
+        self.listeners.append(listener)
+
+    def despawn(self, index):
+        """移除一个实体"""
+        if self.flags[index] & self.ALIVE:
+            self.flags[index] = 0
+            self.hash.remove(index)
+            self.free.append(int(index))
+            for listener in self.listeners:
+                listener.on_despawn(int(index))
+
+    def alive_ids(self):
+        """所有存活实体的编号"""
+        return np.flatnonzero(self.flags[:self.count] & self.ALIVE)
+
+    def awake_ids(self):
+        """所有存活且未休眠的实体编号"""
+        flags = self.flags[:self.count]
+        return np.flatnonzero((flags & (self.ALIVE | self.SLEEPING)) == self.ALIVE)
+
+    def wake(self, ids):
+        """唤醒休眠的实体"""
+        self.flags[ids] &= ~np.uint8(self.SLEEPING | self.ON_GROUND)
+
+    def __len__(self):
+        return self.count - len(self.free)
+
+    def solid_at(self, col, row):
+        """批量查询方块是否为实心，世界左右边界之外视为实心"""
+        world = self.world
+        inside = (col >= 0) & (col < world.width) & (row >= 0) & (row < world.height)
+        solid = ~inside & ((col < 0) | (col >= world.width))
+        rows = np.clip(row, 0, world.height - 1)
+        cols = np.clip(col, 0, world.width - 1)
+        solid |= inside & World.SOLID[world.grid[rows, cols]]
+        return solid
+
+    def update(self, ids=None, steps=None):
+        """批量推进实体：重力、速度积分、方块碰撞。返回参与更新的实体编号
+
+        默认只更新未休眠的实体。steps 是每个实体要推进的帧数（降频更新的
+        区域里的实体补算经过的帧数），默认每个实体推进一帧。
+        """
+        if ids is None:
+            ids = self.awake_ids()
+        if steps is None or len(ids) == 0:
+            return self.step(ids)
+        # 逐帧推进，每帧位移仍然不超过一格；中途被移除的实体不再参与
+        for k in range(int(steps.max())):
+            moving = ids[steps > k]
+            self.step(moving[(self.flags[moving] & self.ALIVE) != 0])
+        return ids
+
+    def step(self, ids):
+        """批量推进一组实体一帧"""
+        if len(ids) == 0:
+            return ids
+        grid_size = self.world.grid_size
+        flags = self.flags[ids]
+
+        # 重力
+        vy = self.vy[ids]
+        falling = (flags & self.NO_GRAVITY) == 0
+        vy[falling] = np.minimum(vy[falling] + self.gravity, self.max_fall_speed)
+
+        # 每帧位移不超过一格，保证不会穿过方块
+        limit = grid_size - 1
+        vx = self.vx[ids]
+        # 分离位移与速度一起参与碰撞检测，用完清零
+        step_x = np.clip(vx + self.push_x[ids], -limit, limit)
+        self.push_x[ids] = 0
+        vy = np.clip(vy, -limit, limit)
+        x, y, w, h = self.x[ids], self.y[ids], self.w[ids], self.h[ids]
+        # 碰撞箱覆盖的最大行数/列数，按此数目批量采样边缘上的方块
+        rows_spanned = int(np.ceil(h.max() / grid_size)) + 1
+        cols_spanned = int(np.ceil(w.max() / grid_size)) + 1
+
+        # 水平移动并检测碰撞
+        x = x + step_x
+        moving = step_x != 0
+        edge = np.where(step_x > 0, x + w - 0.01, x)
+        col = np.floor(edge / grid_size).astype(np.int32)
+        top = np.floor(y / grid_size).astype(np.int32)
+        bottom = np.floor((y + h - 0.01) / grid_size).astype(np.int32)
+        hit = np.zeros(len(ids), dtype=bool)
+        for k in range(rows_spanned):
+            hit |= self.solid_at(col, np.minimum(top + k, bottom))
+        hit &= moving
+        x = np.where(hit & (step_x > 0), col * grid_size - w, x)
+        x = np.where(hit & (step_x < 0), (col + 1) * grid_size, x)
+        walker = (flags & self.WALKER) != 0
+        vx = np.where(hit & (vx != 0), np.where(walker, -vx, 0), vx)
+
+        # 垂直移动并检测碰撞
+        y = y + vy
+        edge = np.where(vy > 0, y + h - 0.01, y)
+        row = np.floor(edge / grid_size).astype(np.int32)
+        left = np.floor(x / grid_size).astype(np.int32)
+        right = np.floor((x + w - 0.01) / grid_size).astype(np.int32)
+        hit = np.zeros(len(ids), dtype=bool)
+        for k in range(cols_spanned):
+            hit |= self.solid_at(np.minimum(left + k, right), row)
+        hit &= vy != 0
+        landed = hit & (vy > 0)
+        y = np.where(landed, row * grid_size - h, y)
+        y = np.where(hit & (vy < 0), (row + 1) * grid_size, y)
+        vy = np.where(hit, 0, vy)
+
+        # 着地的普通实体逐渐停下，行走的实体恢复行走速度（例如被击退之后）
+        vx = np.where(landed & ~walker, vx * self.ground_friction, vx)
+        vx = np.where(landed & walker, np.clip(vx, -self.walk_speed, self.walk_speed), vx)
+
+        flags = np.where(landed, flags | self.ON_GROUND, flags & ~np.uint8(self.ON_GROUND))
+        self.x[ids], self.y[ids] = x, y
+        self.vx[ids], self.vy[ids] = vx, vy
+        self.flags[ids] = flags
+        self.hash.update(ids)
+
+        # 掉出世界底部的实体被移除
+        for index in ids[y > self.world.height * grid_size]:
+            self.despawn(index)
+        return ids
+
+    def separate(self, kind=MOB, strength=0.5):
+        """让互相重叠的同类实体水平分开，只通过空间哈希检查附近的实体"""
+        ids = self.alive_ids()
+        ids = ids[self.kind[ids] == kind]
+        for index in ids.tolist():
+            cx = self.x[index] + self.w[index] / 2
+            cy = self.y[index] + self.h[index] / 2
+            others = self.hash.query_radius(cx, cy, self.w[index], kind)
+            others = others[others != index]
+            if len(others) == 0:
+                continue
+            dx = float((cx - (self.x[others] + self.w[others] / 2)).sum())
+            direction = np.sign(dx) if dx != 0 else (1 if index % 2 else -1)
+            self.push_x[index] += direction * strength * len(others)
+
+    def damage(self, ids, amount, knockback):
+        """对实体造成伤害和击退，生命值耗尽的实体被移除"""
+        self.hp[ids] -= amount
+        self.vx[ids] = knockback
+        self.vy[ids] = -6
+        self.flags[ids] &= ~np.uint8(self.ON_GROUND | self.SLEEPING)
+        for index in ids[self.hp[ids] <= 0]:
+            self.despawn(index)
+
+    def melee_hit(self, x0, y0, x1, y1, damage, knockback):
+        """对矩形区域内的怪物造成伤害和击退，返回被击中的数量"""
+        ids = self.hash.query_aabb(x0, y0, x1, y1, self.MOB)
+        if len(ids):
+            self.damage(ids, damage, knockback)
+        return len(ids)
+
+    def draw(self, screen, camera_x, camera_y):
+        """用一次 blits 调用绘制屏幕内的所有实体"""
+        ids = self.alive_ids()
+        if len(ids) == 0 or not self.sprites:
+            return
+        sx = self.x[ids] - camera_x
+        sy = self.y[ids] - camera_y
+        visible = ((sx + self.w[ids] > 0) & (sx < screen.get_width()) &
+                   (sy + self.h[ids] > 0) & (sy < screen.get_height()))
+        sprites = self.sprites
+        screen.blits([
+            (sprites[s], (px, py))
+            for s, px, py in zip(self.sprite[ids][visible].tolist(),
+                                 sx[visible].astype(np.int32).tolist(),
+                                 sy[visible].astype(np.int32).tolist())
+        ], doreturn=False)
@@ -0,0 +1,85 @@
+import numpy as np
+from world import World
+import protocol
+
+
+class InterestManager:
+    """多人游戏的兴趣管理
+
+    每个客户端只接收视野里的东西。视野用与 Game.update_camera 相同的方式
+    （World.camera_target）由玩家位置和客户端的屏幕大小算出，再向外扩大
+    MARGIN 像素，弥补摄像机的平滑移动。
+    - 区块：视野内的区块推送给客户端，离开视野一圈以外的区块不再同步
+    - 方块变化：每帧按区块分组、每个区块编码一次，发给拥有这个区块的客户端
+    - 实体：视野内的实体和玩家，位置量化成整像素
+    玩家按视野大小的格子登记，查询视野内的实体和玩家都只检查附近的格子，
+    所以每个客户端的开销与玩家总数无关。
+    """
+    MARGIN = 64  # 视野向外扩大的像素
+    KEEP_CHUNKS = 1  # 离开视野多少个区块以内的区块继续同步
+
+    def __init__(self, world, entities):
+        self.world = world
+        self.entities = entities
+        self.cell_size = 1024  # 玩家格子的边长（像素），在 index_players 时按视野大小调整
+        self.cells = {}  # (格子x, 格子y) -> [(玩家编号, x, y), ...]
+
+    def view_rect(self, player, view_size):
+        """玩家的视野 (x0, y0, x1, y1)（像素）"""
+        width, height = view_size
+        x0, y0 = self.world.camera_target(player.rect.centerx, player.rect.centery, width, height)
+        margin = self.MARGIN
+        return x0 - margin, y0 - margin, x0 + width + margin, y0 + height + margin
+
+    def chunk_range(self, rect, extra=0):
+        """与视野重叠的区块范围 (cx0, cy0, cx1, cy1)，向外再扩大 extra 个区块"""
+        chunk = World.CHUNK_SIZE * self.world.grid_size
+        chunks_x = -(-self.world.width // World.CHUNK_SIZE)
+        chunks_y = -(-self.world.height // World.CHUNK_SIZE)
+        x0, y0, x1, y1 = rect
+        return (max(int(x0 // chunk) - extra, 0), max(int(y0 // chunk) - extra, 0),
+                min(int((x1 - 1) // chunk) + 1 + extra, chunks_x), min(int((y1 - 1) // chunk) + 1 + extra, chunks_y))
+
+    def chunks_in(self, rect):
+        """视野内的区块，由近到远排列"""
+        cx0, cy0, cx1, cy1 = self.chunk_range(rect)
+        center_x, center_y = (cx0 + cx1 - 1) / 2, (cy0 + cy1 - 1) / 2
+        keys = [(chunk_x, chunk_y) for chunk_y in range(cy0, cy1) for chunk_x in range(cx0, cx1)]
+        keys.sort(key=lambda key: abs(key[0] - center_x) + abs(key[1] - center_y))
+        return keys
+
+    def index_players(self, players, extent):
+        """按格子登记所有玩家，players 是 [(玩家编号, Player), ...]，extent 是最大的视野边长"""
+        self.cell_size = extent + 2 * self.MARGIN
+        cells = {}
+        size = self.cell_size
+        for player_id, player in players:
+            x, y = player.rect.x, player.rect.y
+            cells.setdefault((x // size, y // size), []).append((player_id, x, y))
+        self.cells = cells
+
+    def group_changes(self, changes):
+        """本帧的方块变化按区块分组，每个区块编码成一条消息"""
+        size = World.CHUNK_SIZE
+        grouped = {}
+        for change in changes:
+            grouped.setdefault((change[0] // size, change[1] // size), []).append(change)
+        return {key: protocol.blocks(key[0], key[1], group) for key, group in grouped.items()}
+
+    def visible(self, rect):
+        """视野内的实体和玩家 {编号: (种类, x, y)}"""
+        x0, y0, x1, y1 = rect
+        e = self.entities
+        ids = e.hash.query_aabb(x0, y0, x1, y1)
+        # 多进程分片时实体有自己的全局编号
+        keys = getattr(e, 'keys', None)
+        current = dict(zip((ids if keys is None else keys[ids]).tolist(), zip((e.kind[ids].astype(np.int64) + 1).tolist(),
+                                             np.rint(e.x[ids]).astype(np.int64).tolist(),
+                                             np.rint(e.y[ids]).astype(np.int64).tolist())))
+        size = self.cell_size
+        for cell_y in range(int(y0 // size), int((y1 - 1) // size) + 1):
+            for cell_x in range(int(x0 // size), int((x1 - 1) // size) + 1):
+                for player_id, x, y in self.cells.get((cell_x, cell_y), ()):
+                    if x0 <= x < x1 and y0 <= y < y1:
+                        current[protocol.PLAYER_FLAG | player_id] = (protocol.PLAYER_KIND, x, y)
+        return current
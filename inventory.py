@@ -1,4 +1,5 @@
 import pygame
+from world import World
 
 class InventorySlot:
     def __init__(self, x, y, size=32):
@@ -70,8 +71,8 @@ class Inventory:
         
         # 测试物品（临时）
         test_items = [
-            {'name': '石头', 'color': (128, 128, 128), 'count': 1},
-            {'name': '泥土', 'color': (139, 69, 19), 'count': 1}
+            {'name': '石头', 'color': (128, 128, 128), 'count': 1, 'block': World.PLATFORM},
+            {'name': '泥土', 'color': (139, 69, 19), 'count': 1, 'block': World.GROUND}
         ]
         for i, item in enumerate(test_items):
             if i < len(self.slots):
@@ -124,44 +125,39 @@ class Inventory:
 
     def add_item(self, block_type):
         """向背包中添加物品"""
-        # 创建物品数据
-        item = {
-            'name': self.get_block_name(block_type),
-            'color': self.get_block_color(block_type),
-            'count': 1
-        }
+        return self.add_items(block_type, 1) == 1
+        
+    def add_items(self, block_type, count):
+        """向背包中添加一组相同的物品，返回实际放入的数量"""
+        name = self.get_block_name(block_type)
         
         # 首先尝试找到相同类型的物品并堆叠
         for slot in self.slots:
-            if slot.item and slot.item['name'] == item['name']:
-                slot.item['count'] += 1
-                return True
+            if slot.item and slot.item['name'] == name:
+                slot.item['count'] = slot.item.get('count', 1) + count
+                slot.item.setdefault('block', block_type)
+                return count
         
         # 如果没有找到相同类型的物品，找一个空槽位
         for slot in self.slots:
             if not slot.item:
-                slot.item = item
-                return True
+                slot.item = {
+                    'name': name,
+                    'color': self.get_block_color(block_type),
+                    'count': count,
+                    'block': block_type
+                }
+                return count
         
-        return False  # 背包已满
+        return 0  # 背包已满
         
     def get_block_name(self, block_type):
         """获取方块名称"""
-        block_names = {
-            1: "泥土",
-            2: "石头",
-            3: "草地"
-        }
-        return block_names.get(block_type, f"方块{block_type}")
+        return World.BLOCK_NAMES.get(block_type, f"方块{block_type}")
         
     def get_block_color(self, block_type):
         """获取方块颜色"""
-        block_colors = {
-            1: (139, 69, 19),   # 泥土 - 棕色
-            2: (128, 128, 128), # 石头 - 灰色
-            3: (34, 139, 34)    # 草地 - 绿色
-        }
-        return block_colors.get(block_type, (200, 200, 200))  # 默认为浅灰色 
+        return World.BLOCK_COLORS.get(block_type) or World.UNKNOWN_COLOR  # 默认为浅灰色 
 
     def remove_grass_blocks(self):
         """删除所有草方块"""
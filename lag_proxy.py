@@ -0,0 +1,85 @@
+import asyncio
+import random
+
+
+class LagProxy:
+    """模拟网络延迟和抖动的 TCP 代理，用于在本机测试多人游戏
+
+    客户端连接代理，代理再连接服务器。两个方向上收到的每一段数据都延迟
+    latency ± jitter 秒再转发；TCP 不会乱序，所以送达时间不早于上一段。
+    """
+
+    def __init__(self, target_host, target_port, latency=0.05, jitter=0.01, seed=None):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.server = None
+        self.tasks = set()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """开始监听，返回实际的端口"""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def handle_client(self, client_reader, client_writer):
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            server_reader, server_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        except OSError:
+            client_writer.close()
+            self.tasks.discard(task)
+            return
+        try:
+            await asyncio.gather(self.pipe(client_reader, server_writer),
+                                 self.pipe(server_reader, client_writer))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            client_writer.close()
+            server_writer.close()
+            self.tasks.discard(task)
+
+    async def pipe(self, reader, writer):
+        """单向转发：读到的数据排队，到了送达时间再写出"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    break
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+
+        sender = asyncio.ensure_future(deliver())
+        last = 0.0
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                due = loop.time() + self.latency + self.rng.uniform(-self.jitter, self.jitter)
+                last = max(last, due)
+                queue.put_nowait((last, data))
+            queue.put_nowait((last, None))
+            await sender
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            sender.cancel()
+            writer.close()
@@ -0,0 +1,256 @@
+import pygame
+import numpy as np
+from world import World
+
+
+class LightMap:
+    """方块光照
+
+    光照等级为 0~15，按区块保存为 CHUNK_SIZE×CHUNK_SIZE 的 uint8 数组。
+    光源有两种：地表以上的格子受到满级阳光，发光方块按自身亮度发光。
+    光线每传播一格减 1，再减去进入的方块的不透明度（相当于带权的 BFS 洪泛），
+    所以一个格子的亮度只取决于 MAX_LIGHT 格以内的方块。
+
+    区块在第一次用到时才计算；方块变化时只重新计算它周围 MAX_LIGHT 格以内
+    （以及这一列阳光变化的部分）的区域，并记录亮度真正变化了的区块。
+    """
+    MAX_LIGHT = 15
+
+    def __init__(self, world):
+        self.world = world
+        self.chunk_size = World.CHUNK_SIZE
+        self.chunks = {}  # (区块x, 区块y) -> uint8 数组
+        self.dirty_chunks = set()  # 亮度变化过、需要重新绘制的区块
+
+        # 方块类型 -> 衰减 / 发光等级的查找表
+        self.attenuation = np.ones(256, dtype=np.int16)
+        for block_type, opacity in World.BLOCK_OPACITY.items():
+            self.attenuation[block_type] = 1 + opacity
+        self.emission = np.zeros(256, dtype=np.int16)
+        for block_type, level in World.BLOCK_LIGHT.items():
+            self.emission[block_type] = level
+        world.add_listener(self)
+
+    def compute(self, x0, y0, x1, y1):
+        """从光源重新计算矩形区域的亮度，返回 int16 数组"""
+        world = self.world
+        pad = self.MAX_LIGHT
+        px0, py0 = max(0, x0 - pad), max(0, y0 - pad)
+        px1, py1 = min(world.width, x1 + pad), min(world.height, y1 + pad)
+        grid = world.grid[py0:py1, px0:px1]
+
+        # 光源：地表以上的阳光和发光方块
+        rows = np.arange(py0, py1)[:, None]
+        light = np.where(rows < world.heights[None, px0:px1], self.MAX_LIGHT, 0).astype(np.int16)
+        np.maximum(light, self.emission[grid], out=light)
+
+        # 逐层传播：每一轮每个格子取四个相邻格子的最大亮度减去衰减。
+        # 每走一格至少减 1，所以 MAX_LIGHT 轮之后结果和 BFS 完全一致
+        attenuation = self.attenuation[grid]
+        for _ in range(self.MAX_LIGHT):
+            neighbors = np.zeros_like(light)
+            np.maximum(neighbors[1:], light[:-1], out=neighbors[1:])
+            np.maximum(neighbors[:-1], light[1:], out=neighbors[:-1])
+            np.maximum(neighbors[:, 1:], light[:, :-1], out=neighbors[:, 1:])
+            np.maximum(neighbors[:, :-1], light[:, 1:], out=neighbors[:, :-1])
+            spread = np.maximum(light, neighbors - attenuation)
+            if np.array_equal(spread, light):
+                break
+            light = spread
+        return light[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """返回区块的亮度数组，第一次用到时计算"""
+        light = self.chunks.get((chunk_x, chunk_y))
+        if light is None:
+            size = self.chunk_size
+            x0, y0 = chunk_x * size, chunk_y * size
+            x1, y1 = min(x0 + size, self.world.width), min(y0 + size, self.world.height)
+            light = self.compute(x0, y0, x1, y1).astype(np.uint8)
+            self.chunks[(chunk_x, chunk_y)] = light
+        return light
+
+    def get_light(self, x, y):
+        """获取指定方块的亮度"""
+        if 0 <= x < self.world.width and 0 <= y < self.world.height:
+            size = self.chunk_size
+            return int(self.get_chunk(x // size, y // size)[y % size, x % size])
+        return self.MAX_LIGHT
+
+    def relight(self, x0, y0, x1, y1):
+        """重新计算矩形区域的亮度，只更新已经计算过的区块"""
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.world.width, x1), min(self.world.height, y1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        size = self.chunk_size
+        if not any((chunk_x, chunk_y) in self.chunks
+                   for chunk_y in range(y0 // size, (y1 - 1) // size + 1)
+                   for chunk_x in range(x0 // size, (x1 - 1) // size + 1)):
+            return  # 区域内的区块都还没有计算过
+        light = self.compute(x0, y0, x1, y1)
+        for chunk_y in range(y0 // size, (y1 - 1) // size + 1):
+            for chunk_x in range(x0 // size, (x1 - 1) // size + 1):
+                chunk = self.chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    continue
+                # 区域与区块的交集
+                cx0, cy0 = max(x0, chunk_x * size), max(y0, chunk_y * size)
+                cx1, cy1 = min(x1, (chunk_x + 1) * size), min(y1, (chunk_y + 1) * size)
+                src = light[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+                dst = chunk[cy0 - chunk_y * size:cy1 - chunk_y * size,
+                            cx0 - chunk_x * size:cx1 - chunk_x * size]
+                if not np.array_equal(src, dst):
+                    dst[:] = src
+                    self.dirty_chunks.add((chunk_x, chunk_y))
+
+    def on_block_changed(self, x, y, old, new):
+        """方块变化时局部重新计算光照"""
+        radius = self.MAX_LIGHT
+        bottom = y + 1
+        if y <= self.world.heights[x]:
+            # 这一格在地表或地表以上：从它到下面第一个实心方块之间的阳光都会变化
+            column = self.world.grid[y + 1:, x]
+            solid = np.flatnonzero(column)
+            bottom = y + 1 + (int(solid[0]) if len(solid) else len(column))
+        self.relight(x - radius, y - radius, x + radius + 1, bottom + radius)
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        """批量变化时按区块聚类：相连（包括斜对角）的区块里的变化一起重新计算
+        一次，同一帧里相距很远的变化各自计算，不会合并成一个很大的区域"""
+        size = self.chunk_size
+        chunks_x = -(-self.world.width // size)
+        codes, inverse = np.unique((ys // size) * chunks_x + xs // size, return_inverse=True)
+        keys = set(codes.tolist())
+        cluster = {}  # 区块编号 -> 所在簇的编号
+        count = 0
+        for code in codes.tolist():
+            if code in cluster:
+                continue
+            cluster[code] = label = count
+            count += 1
+            stack = [code]
+            while stack:
+                chunk_y, chunk_x = divmod(stack.pop(), chunks_x)
+                for ny in (chunk_y - 1, chunk_y, chunk_y + 1):
+                    for nx in (chunk_x - 1, chunk_x, chunk_x + 1):
+                        neighbor = ny * chunks_x + nx
+                        if 0 <= nx < chunks_x and neighbor in keys and neighbor not in cluster:
+                            cluster[neighbor] = label
+                            stack.append(neighbor)
+        labels = np.array([cluster[code] for code in codes.tolist()])[inverse]
+        for label in range(count):
+            mask = labels == label
+            self.relight_changes(xs[mask], ys[mask])
+
+    def relight_changes(self, xs, ys):
+        """重新计算包含一组变化（以及它们影响的阳光）的区域"""
+        radius = self.MAX_LIGHT
+        bottom = int(ys.max()) + 1
+        # 地表或地表以上的变化：阳光一直照到下面第一个实心方块
+        exposed = ys <= self.world.heights[xs]
+        for x in np.unique(xs[exposed]).tolist():
+            y = int(ys[xs == x].max())
+            solid = np.flatnonzero(self.world.grid[y + 1:, x])
+            bottom = max(bottom, y + 1 + (int(solid[0]) if len(solid) else self.world.height - y - 1))
+        self.relight(int(xs.min()) - radius, int(ys.min()) - radius, int(xs.max()) + radius + 1, bottom + radius)
+
+
+class ChunkRenderer:
+    """按区块缓存的世界画面
+
+    每个区块画一次方块，再把放大后的亮度图以正片叠底的方式合成上去，
+    结果缓存成一张 Surface。方块或亮度变化时只丢弃对应区块的缓存，
+    离开屏幕较远的区块缓存会被释放。
+    """
+    # 亮度等级 -> 颜色倍数
+    SHADE = (np.arange(LightMap.MAX_LIGHT + 1) * 255 // LightMap.MAX_LIGHT).astype(np.uint8)
+
+    def __init__(self, world, light):
+        self.world = world
+        self.light = light
+        self.chunk_size = World.CHUNK_SIZE
+        self.surfaces = {}  # (区块x, 区块y) -> Surface
+
+        # 每种方块的图像（带黑色边框）只创建一次
+        grid_size = world.grid_size
+        self.block_images = {}
+        for block_type, color in World.BLOCK_COLORS.items():
+            if color is None:
+                continue
+            image = pygame.Surface((grid_size, grid_size))
+            image.fill(color)
+            if block_type not in World.LIQUIDS:  # 液体不画边框
+                pygame.draw.rect(image, (0, 0, 0), image.get_rect(), 2)
+            self.block_images[block_type] = image
+        world.add_listener(self)
+
+    def on_block_changed(self, x, y, old, new):
+        self.surfaces.pop((x // self.chunk_size, y // self.chunk_size), None)
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        for key in set(zip((xs // self.chunk_size).tolist(), (ys // self.chunk_size).tolist())):
+            self.surfaces.pop(key, None)
+
+    def block_image(self, block_type):
+        image = self.block_images.get(block_type)
+        if image is None:
+            grid_size = self.world.grid_size
+            image = pygame.Surface((grid_size, grid_size))
+            image.fill(World.UNKNOWN_COLOR)
+            pygame.draw.rect(image, (0, 0, 0), image.get_rect(), 2)
+            self.block_images[block_type] = image
+        return image
+
+    def render_chunk(self, chunk_x, chunk_y):
+        """绘制一个区块并合成光照"""
+        size = self.chunk_size
+        grid_size = self.world.grid_size
+        x0, y0 = chunk_x * size, chunk_y * size
+        tiles = self.world.grid[y0:y0 + size, x0:x0 + size]
+        height, width = tiles.shape
+
+        surface = pygame.Surface((width * grid_size, height * grid_size))
+        surface.fill(World.SKY_COLOR)
+        rows, cols = np.nonzero(tiles)
+        surface.blits([
+            (self.block_image(block_type), (col * grid_size, row * grid_size))
+            for row, col, block_type in zip(rows.tolist(), cols.tolist(), tiles[rows, cols].tolist())
+        ], doreturn=False)
+
+        shade = self.SHADE[self.light.get_chunk(chunk_x, chunk_y)]
+        if shade.min() < 255:
+            shade = np.repeat(shade.T[:, :, None], 3, axis=2)
+            shade_surface = pygame.transform.scale(pygame.surfarray.make_surface(shade),
+                                                   surface.get_size())
+            surface.blit(shade_surface, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+        return surface
+
+    def draw(self, screen, camera_x, camera_y):
+        """绘制屏幕内的区块"""
+        for key in self.light.dirty_chunks:
+            self.surfaces.pop(key, None)
+        self.light.dirty_chunks.clear()
+
+        span = self.chunk_size * self.world.grid_size
+        screen_w, screen_h = screen.get_size()
+        chunks_x = -(-self.world.width // self.chunk_size)
+        chunks_y = -(-self.world.height // self.chunk_size)
+        first_x, first_y = max(0, int(camera_x // span)), max(0, int(camera_y // span))
+        last_x = min(chunks_x - 1, int((camera_x + screen_w) // span))
+        last_y = min(chunks_y - 1, int((camera_y + screen_h) // span))
+
+        blits = []
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                surface = self.surfaces.get((chunk_x, chunk_y))
+                if surface is None:
+                    surface = self.render_chunk(chunk_x, chunk_y)
+                    self.surfaces[(chunk_x, chunk_y)] = surface
+                blits.append((surface, (chunk_x * span - camera_x, chunk_y * span - camera_y)))
+        screen.blits(blits, doreturn=False)
+
+        # 释放离可见范围超过一个区块的缓存
+        for chunk_x, chunk_y in list(self.surfaces):
+            if not (first_x - 1 <= chunk_x <= last_x + 1 and first_y - 1 <= chunk_y <= last_y + 1):
+                del self.surfaces[(chunk_x, chunk_y)]
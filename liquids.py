@@ -0,0 +1,228 @@
+import numpy as np
+from world import World
+
+
+class Liquids:
+    """水和岩浆的元胞自动机
+
+    每个液体格子有 0~FULL 的液量，保存在与方块数组同样大小的 uint8 数组里，
+    方块数组里对应的格子是 WATER/LAVA（液量为 0 时变回空气）。
+    只有活跃区块参与模拟：液体附近的方块被修改、或者上一帧还在流动的区块。
+    每个活跃区块（加一圈边界）用矢量化的规则推进一步：先向下流，再向左右
+    两侧液面较低的格子分流；一步之内没有任何变化的区块进入休眠。
+    多进程分片时用 share 让液量数组放在共享内存里，每个分片只写自己负责的列。
+    """
+    FULL = 8
+    LAVA_INTERVAL = 4  # 岩浆每隔几帧才流动一次
+    MAX_CATCH_UP = 8  # 区域回调里最多补算的步数
+
+    def __init__(self, world, radius=None):
+        self.world = world
+        self.chunk_size = World.CHUNK_SIZE
+        self.mass = np.where(np.isin(world.grid, World.LIQUIDS), self.FULL, 0).astype(np.uint8)
+        self.active = set()  # 活跃区块 (区块x, 区块y)
+        self.radius = radius  # 只模拟中心点这么多格以内的区块，None 表示不限制
+        self.tick = 0
+        self.columns = (0, world.width)  # 只写这个范围内的列的液量
+        self.outflow = []  # 流进其他分片负责的列的液量 (x, y, 液体类型, 液量)
+        world.add_listener(self)
+
+    def share(self, mass, x0, x1):
+        """改用所有分片共享的液量数组 mass，只写 x0~x1 列
+
+        边界外一圈的液量直接从共享数组读到；流进其他列的液量不写入，记在
+        outflow 里，由负责那几列的分片用 receive 加上，液体总量保持不变。
+        """
+        mass[:, x0:x1] = self.mass[:, x0:x1]
+        self.mass = mass
+        self.columns = (x0, x1)
+
+    def receive(self, transfers):
+        """加上其他分片流进来的液量 (x, y, 液体类型, 液量)
+
+        两个分片在同一帧都往分界线旁的一格流时可能超过 FULL，放不下的液量
+        退回分界线另一侧流出的那一格，与单进程时一样每格最多 FULL。
+        """
+        for x, y, kind, amount in transfers:
+            block = self.world.grid[y, x]
+            if block != kind and block != World.EMPTY:
+                continue  # 同一帧里这一格被放了别的方块，流进来的液体消失
+            total = int(self.mass[y, x]) + amount
+            if total > self.FULL:
+                # 液体只会从左右相邻的一列流过分界线
+                source = x + 1 if x + 1 == self.columns[1] else x - 1
+                self.outflow.append((source, y, kind, total - self.FULL))
+                total = self.FULL
+            self.mass[y, x] = total
+            if block == World.EMPTY:
+                self.world.set_block(x, y, kind)
+            self.wake(x - 1, y - 1, x + 2, y + 2)
+
+    def on_block_changed(self, x, y, old, new):
+        """方块被修改时同步液量，并唤醒附近有液体的区块
+
+        液体自己流动产生的变化液量已经是对的：只给新出现、还没有液量的液体
+        格子加满，不是液体的格子液量清零。其他分片负责的列由它们自己同步。
+        """
+        if self.columns[0] <= x < self.columns[1]:
+            if new in World.LIQUIDS:
+                if self.mass[y, x] == 0:
+                    self.mass[y, x] = self.FULL
+            else:
+                self.mass[y, x] = 0
+        self.wake(x - 1, y - 1, x + 2, y + 2)
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        own = (xs >= self.columns[0]) & (xs < self.columns[1])
+        oxs, oys = xs[own], ys[own]
+        mass = self.mass[oys, oxs]
+        self.mass[oys, oxs] = np.where(np.isin(new[own], World.LIQUIDS), np.where(mass == 0, self.FULL, mass), 0)
+        self.wake(int(xs.min()) - 1, int(ys.min()) - 1, int(xs.max()) + 2, int(ys.max()) + 2)
+
+    def wake(self, x0, y0, x1, y1):
+        """区域内有液体时，把与区域重叠的区块加入活跃集合"""
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.world.width, x1), min(self.world.height, y1)
+        if x0 >= x1 or y0 >= y1 or not self.mass[y0:y1, x0:x1].any():
+            return
+        size = self.chunk_size
+        for chunk_y in range(y0 // size, (y1 - 1) // size + 1):
+            for chunk_x in range(x0 // size, (x1 - 1) // size + 1):
+                self.active.add((chunk_x, chunk_y))
+
+    def step_chunk(self, chunk_x, chunk_y, kind):
+        """让区块内的一种液体流动一步，返回液量有变化的区域 (x0, y0, x1, y1) 或 None"""
+        world = self.world
+        size = self.chunk_size
+        x0, y0 = chunk_x * size, chunk_y * size
+        x1, y1 = min(x0 + size, world.width), min(y0 + size, world.height)
+        # 加一圈边界，液体可以流进相邻区块
+        hx0, hy0 = max(0, x0 - 1), max(0, y0 - 1)
+        hx1, hy1 = min(world.width, x1 + 1), min(world.height, y1 + 1)
+        grid = world.grid[hy0:hy1, hx0:hx1]
+        liquid = grid == kind
+        if not liquid[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0].any():
+            return None
+        open_cells = liquid | (grid == World.EMPTY)  # 可以接收这种液体的格子
+        sender = np.zeros_like(liquid)
+        sender[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0] = liquid[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+        mass = self.mass[hy0:hy1, hx0:hx1].astype(np.int16)
+
+        # 向下流：下面的格子只会从正上方接收，不会溢出
+        new = mass.copy()
+        down = np.where(sender[:-1] & open_cells[1:],
+                        np.minimum(mass[:-1], self.FULL - mass[1:]), 0)
+        new[:-1] -= down
+        new[1:] += down
+
+        # 向左右分流：每侧最多流出液面差的三分之一，两侧同时流入也不会溢出
+        right = np.where(sender[:, :-1] & open_cells[:, 1:],
+                         np.maximum((new[:, :-1] - new[:, 1:] + 1) // 3, 0), 0)
+        left = np.where(sender[:, 1:] & open_cells[:, :-1],
+                        np.maximum((new[:, 1:] - new[:, :-1] + 1) // 3, 0), 0)
+        new[:, :-1] -= right
+        new[:, 1:] += right
+        new[:, 1:] -= left
+        new[:, :-1] += left
+
+        changed = new != mass
+        if not changed.any():
+            return None
+        # 只写自己负责的列，流进其他分片的列的液量交给它们
+        own0, own1 = max(self.columns[0], hx0) - hx0, min(self.columns[1], hx1) - hx0
+        if own0 > 0 or own1 < new.shape[1]:
+            foreign = np.ones(new.shape[1], dtype=bool)
+            foreign[own0:own1] = False
+            rows, cols = np.nonzero(changed & foreign)
+            self.outflow.extend(zip((hx0 + cols).tolist(), (hy0 + rows).tolist(), [kind] * len(rows),
+                                    (new - mass)[rows, cols].tolist()))
+        self.mass[hy0:hy1, hx0 + own0:hx0 + own1] = new[:, own0:own1]
+
+        # 液体出现或消失的格子同步到方块数组
+        appeared = changed & ((new > 0) != (mass > 0))
+        rows, cols = np.nonzero(appeared[:, own0:own1])
+        cols += own0
+        if len(rows):
+            world.set_blocks(hx0 + cols, hy0 + rows, np.where(new[rows, cols] > 0, kind, World.EMPTY))
+
+        rows, cols = np.nonzero(changed)
+        return hx0 + cols.min(), hy0 + rows.min(), hx0 + cols.max() + 1, hy0 + rows.max() + 1
+
+    def solidify(self, chunk_x, chunk_y):
+        """碰到水的岩浆凝固成石头"""
+        world = self.world
+        size = self.chunk_size
+        x0, y0 = chunk_x * size, chunk_y * size
+        x1, y1 = min(x0 + size, world.width), min(y0 + size, world.height)
+        hx0, hy0 = max(0, x0 - 1), max(0, y0 - 1)
+        hx1, hy1 = min(world.width, x1 + 1), min(world.height, y1 + 1)
+        grid = world.grid[hy0:hy1, hx0:hx1]
+        water = grid == World.WATER
+        near_water = np.zeros_like(water)
+        near_water[1:] |= water[:-1]
+        near_water[:-1] |= water[1:]
+        near_water[:, 1:] |= water[:, :-1]
+        near_water[:, :-1] |= water[:, 1:]
+        rows, cols = np.nonzero((grid == World.LAVA) & near_water)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            # 通过 set_block 通知自己，液量会被清零
+            world.set_block(hx0 + col, hy0 + row, World.PLATFORM)
+        return len(rows) > 0
+
+    def update(self, center=None):
+        """推进一帧，center 为模拟中心（方块坐标），返回是否有液体变化"""
+        self.tick += 1
+        if not self.active:
+            return False
+        chunks = list(self.active)
+        if self.radius is not None and center is not None:
+            # 模拟范围外的区块保持活跃，等玩家靠近再继续
+            size = self.chunk_size
+            chunks = [(chunk_x, chunk_y) for chunk_x, chunk_y in chunks
+                      if max(abs((chunk_x + 0.5) * size - center[0]),
+                             abs((chunk_y + 0.5) * size - center[1])) <= self.radius + size / 2]
+        return self.step(chunks, self.tick % self.LAVA_INTERVAL == 0)
+
+    def tick_region(self, bounds, tick, elapsed):
+        """区域调度器的回调：推进区域内的活跃区块，降频更新的区域补算经过的帧数
+
+        冻结后恢复的区域最多补算 MAX_CATCH_UP 步，液体之后照常继续流动。
+        """
+        x0, y0, x1, y1 = bounds
+        size = self.chunk_size
+        changed = False
+        for step in range(min(elapsed, self.MAX_CATCH_UP)):
+            chunks = [(chunk_x, chunk_y) for chunk_x, chunk_y in self.active
+                      if x0 <= chunk_x * size < x1 and y0 <= chunk_y * size < y1]
+            if not chunks:
+                break
+            # 补算的每一步按它原本所在的帧判断岩浆是否流动
+            if self.step(chunks, (tick - step) % self.LAVA_INTERVAL == 0):
+                changed = True
+        return changed
+
+    def step(self, chunks, lava_tick):
+        """让一组活跃区块各流动一步，返回是否有液体变化"""
+        size = self.chunk_size
+        any_changed = False
+        # 从下往上处理，下落的液体在同一帧里不会被重复移动太多
+        for chunk_x, chunk_y in sorted(chunks, key=lambda key: -key[1]):
+            regions = [self.step_chunk(chunk_x, chunk_y, World.WATER)]
+            keep = False
+            if lava_tick:
+                regions.append(self.step_chunk(chunk_x, chunk_y, World.LAVA))
+                if self.solidify(chunk_x, chunk_y):
+                    any_changed = True
+            else:
+                keep = bool((self.world.grid[chunk_y * size:(chunk_y + 1) * size,
+                                             chunk_x * size:(chunk_x + 1) * size] == World.LAVA).any())
+
+            changed = [region for region in regions if region is not None]
+            if changed:
+                any_changed = True
+                # 液体流到区块边界时唤醒相邻区块
+                for x0, y0, x1, y1 in changed:
+                    self.wake(x0 - 1, y0 - 1, x1 + 1, y1 + 1)
+            elif not keep:
+                self.active.discard((chunk_x, chunk_y))
+        return any_changed
@@ -4,14 +4,17 @@ import math
 import os
 import json
 import random
+import time
 import numpy as np
 from player import Player
-from world import World
-from inventory import Inventory
+from terrain import TerrainGenerator
 from save_manager import SaveManager
-
-# 初始化Pygame
-pygame.init()
+from thumbnails import ThumbnailCache, THUMBNAIL_READY
+from minimap import Minimap
+from world_map import WorldMap
+from lighting import ChunkRenderer
+from simulation import Simulation, TickInput, HELD_ACTIONS
+from replay import ReplayRecorder
 
 # 游戏常量
 TILE_SIZE = 32
@@ -42,14 +45,43 @@ GREEN = (0, 255, 0)
 DARK_GREEN = (0, 150, 0)
 
 # 字体设置
+_font_cache = {}
+
 def get_font(size):
+    """按字号缓存字体，避免每次绘制都重新加载字体文件"""
+    if size in _font_cache:
+        return _font_cache[size]
     try:
-        return pygame.font.Font("msyh.ttc", size)  # 微软雅黑
+        font = pygame.font.Font("msyh.ttc", size)  # 微软雅黑
     except:
         try:
-            return pygame.font.Font("simhei.ttf", size)  # 黑体
+            font = pygame.font.Font("simhei.ttf", size)  # 黑体
         except:
-            return pygame.font.SysFont("microsoftyaheui", size)  # 系统字体
+            font = pygame.font.SysFont("microsoftyaheui", size)  # 系统字体
+    _font_cache[size] = font
+    return font
+
+# 目录扫描缓存: 路径 -> (目录修改时间, 文件名列表)
+_dir_cache = {}
+
+def scan_json_files(path):
+    """列出目录中所有 .json 文件的名称（不含后缀）
+
+    结果按目录的修改时间缓存，目录内容没有变化时不会重新扫描。
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cached = _dir_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        names = sorted(
+            entry.name[:-5] for entry in os.scandir(path)
+            if entry.name.endswith('.json') and entry.is_file()
+        )
+        cached = (mtime, names)
+        _dir_cache[path] = cached
+    return list(cached[1])
 
 def get_documents_path():
     """获取当前用户的文档文件夹路径"""
@@ -172,6 +204,123 @@ class Slider:
         # 确保值在范围内
         self.value = max(self.min_value, min(self.value, self.max_value))
 
+class ScrollList:
+    """虚拟化的滚动列表
+
+    每行由一个主按钮和一个删除按钮组成。只为一屏可见的行创建按钮，
+    滚动时复用这些行控件，因此列表有几百项也只需绘制可见的几行。
+    get_icon(项) 可以返回一个绘制在行左侧的图标（或 None）。
+    """
+    def __init__(self, x, y, width, height, row_height, row_spacing=10,
+                 color=(100, 100, 200), font_size=32, delete_width=80, get_icon=None):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.get_icon = get_icon
+        self.row_height = row_height
+        self.row_stride = row_height + row_spacing
+        self.delete_width = delete_width
+        self.button_width = width - delete_width - row_spacing
+        self.items = []
+        self.scroll_y = 0
+        self.hover = None  # (索引, 是否为删除按钮)
+        
+        # 可复用的行控件，数量只取决于列表区域的高度
+        self.rows = []
+        for _ in range(height // self.row_stride + 2):
+            button = SimpleButton(0, 0, self.button_width, row_height, "",
+                                  color=color, font_size=font_size)
+            delete_button = SimpleButton(0, 0, delete_width, row_height, "×",
+                                         color=(200, 0, 0), font_size=font_size)
+            self.rows.append((button, delete_button))
+            
+    def set_items(self, items):
+        """替换列表内容，并保持滚动位置有效"""
+        self.items = list(items)
+        self.hover = None
+        self.scroll_to(self.scroll_y)
+        
+    def max_scroll(self):
+        content_height = len(self.items) * self.row_stride - (self.row_stride - self.row_height)
+        return max(0, content_height - self.rect.height)
+        
+    def scroll_to(self, scroll_y):
+        """滚动到指定位置，返回位置是否改变"""
+        scroll_y = max(0, min(int(scroll_y), self.max_scroll()))
+        changed = scroll_y != self.scroll_y
+        self.scroll_y = scroll_y
+        return changed
+        
+    def visible_range(self):
+        """返回当前可见的项的索引范围"""
+        first = self.scroll_y // self.row_stride
+        last = min(len(self.items), (self.scroll_y + self.rect.height) // self.row_stride + 1)
+        return range(first, last)
+        
+    def row_at(self, pos):
+        """返回屏幕坐标处的 (索引, 是否为删除按钮)，没有则返回 None"""
+        if not self.rect.collidepoint(pos):
+            return None
+        offset = pos[1] - self.rect.y + self.scroll_y
+        index = offset // self.row_stride
+        if offset % self.row_stride >= self.row_height or index >= len(self.items):
+            return None
+        local_x = pos[0] - self.rect.x
+        if local_x < self.button_width:
+            return index, False
+        if local_x >= self.rect.width - self.delete_width:
+            return index, True
+        return None
+        
+    def handle_event(self, event):
+        """处理事件
+
+        返回 ("select", 项)、("delete", 项)，滚动或悬停变化时返回 ("scroll", None)
+        或 ("hover", None)，无需处理时返回 None。
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            if self.rect.collidepoint(pygame.mouse.get_pos()):
+                if self.scroll_to(self.scroll_y - event.y * self.row_stride // 2):
+                    self.hover = self.row_at(pygame.mouse.get_pos())
+                    return "scroll", None
+        elif event.type == pygame.MOUSEMOTION:
+            hover = self.row_at(event.pos)
+            if hover != self.hover:
+                self.hover = hover
+                return "hover", None
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            hit = self.row_at(event.pos)
+            if hit is not None:
+                index, is_delete = hit
+                return ("delete" if is_delete else "select"), self.items[index]
+        return None
+        
+    def draw(self, screen):
+        """只绘制可见的行"""
+        old_clip = screen.get_clip()
+        screen.set_clip(self.rect)
+        for (button, delete_button), index in zip(self.rows, self.visible_range()):
+            y = self.rect.y + index * self.row_stride - self.scroll_y
+            button.rect.topleft = (self.rect.x, y)
+            button.text = str(self.items[index])
+            button.is_hovered = self.hover == (index, False)
+            delete_button.rect.topleft = (self.rect.right - self.delete_width, y)
+            delete_button.is_hovered = self.hover == (index, True)
+            button.draw(screen)
+            delete_button.draw(screen)
+            if self.get_icon is not None:
+                icon = self.get_icon(self.items[index])
+                if icon is not None:
+                    screen.blit(icon, icon.get_rect(midleft=(button.rect.x + 4, button.rect.centery)))
+        screen.set_clip(old_clip)
+        
+        # 内容超出列表区域时绘制滚动条
+        max_scroll = self.max_scroll()
+        if max_scroll > 0:
+            track = pygame.Rect(self.rect.right + 6, self.rect.y, 6, self.rect.height)
+            thumb_height = max(20, track.height * track.height // (track.height + max_scroll))
+            thumb_y = track.y + (track.height - thumb_height) * self.scroll_y // max_scroll
+            pygame.draw.rect(screen, (60, 60, 60), track, border_radius=3)
+            pygame.draw.rect(screen, WHITE, (track.x, thumb_y, track.width, thumb_height), border_radius=3)
+
 class CharacterCreator:
     def __init__(self, x, y, width, height):
         self.rect = pygame.Rect(x, y, width, height)
@@ -434,6 +583,9 @@ class CharacterCreator:
         }
 
 class Game:
+    # 没有持续动画、只在输入后才需要重绘的界面
+    MENU_STATES = ("main_menu", "character_select", "character_create", "map_select")
+
     def __init__(self):
         """初始化游戏"""
         pygame.init()
@@ -450,6 +602,14 @@ class Game:
         # 初始化时钟和帧率
         self.clock = pygame.time.Clock()
         self.fps = 60  # 设置游戏帧率为60
+        self.idle_fps = 5  # 窗口失去焦点或最小化时的帧率
+        self.menu_wait_timeout = 500  # 菜单空闲时等待事件的超时时间（毫秒）
+        self.window_active = True
+        self.pending_events = []  # event.wait 取到、尚未被处理的事件
+        self.tick_actions = []  # 这一帧由事件产生、交给模拟核心的操作
+        self.record_replays = False  # 是否把每局游戏的输入录制下来
+        self.recorder = None
+        self.replay_path = "replays"
         
         # 游戏状态
         self.game_state = "main_menu"  # main_menu, character_select, character_create, map_select, playing, settings
@@ -457,6 +617,7 @@ class Game:
         self.running = True
         self.needs_redraw = True
         self.is_fullscreen = False
+        self.world_map_open = False
         self.volume = 1.0
         
         # 主菜单按钮
@@ -492,12 +653,6 @@ class Game:
         self.choosing_map_size = False
         self.selected_map_size = None
         
-        # 初始化按钮列表
-        self.character_buttons = []
-        self.character_delete_buttons = []
-        self.map_delete_buttons = []
-        self.map_size_buttons = []
-        
         # 地图大小选项
         self.map_sizes = {
             "小型": {"width": 1280, "height": 720, "grid_size": 32},
@@ -510,7 +665,9 @@ class Game:
             'left': pygame.K_a,
             'right': pygame.K_d,
             'jump': pygame.K_SPACE,
-            'exit': pygame.K_ESCAPE
+            'exit': pygame.K_ESCAPE,
+            'map': pygame.K_m,
+            'attack': pygame.K_f
         }
         
         # 按键名称映射
@@ -518,7 +675,9 @@ class Game:
             'left': '向左移动',
             'right': '向右移动',
             'jump': '跳跃',
-            'exit': '退出/背包'
+            'exit': '退出/背包',
+            'map': '世界地图',
+            'attack': '攻击'
         }
         
         # 创建按钮
@@ -537,6 +696,7 @@ class Game:
         self.world_path = "worlds"
         os.makedirs(self.player_path, exist_ok=True)
         os.makedirs(self.world_path, exist_ok=True)
+        self.thumbnails = ThumbnailCache(self.world_path)
         self.load_characters_and_maps()
         
         # 创建角色创建器
@@ -555,6 +715,10 @@ class Game:
     def run(self):
         """游戏主循环"""
         while self.running:
+            # 菜单界面没有需要重绘的内容时阻塞等待输入，而不是每帧轮询
+            if self.game_state in self.MENU_STATES and not self.needs_redraw:
+                self.wait_for_events()
+
             # 处理事件
             if self.game_state == "main_menu":
                 self.handle_events()
@@ -574,9 +738,10 @@ class Game:
                     self.draw_map_select()
             elif self.game_state == "playing":
                 self.handle_events()
-                # 更新游戏状态
-                if hasattr(self, 'player'):
-                    self.player.update(self.world, self.key_bindings)
+                # 用这一帧的键盘状态和操作推进模拟
+                if hasattr(self, 'sim'):
+                    if self.sim.tick(self.read_input()):
+                        self.needs_redraw = True
                     self.update_camera()
                 # 绘制游戏界面
                 if self.needs_redraw:
@@ -587,8 +752,46 @@ class Game:
                 self.needs_redraw = True
                 self.last_game_state = self.game_state
             
-            # 控制帧率
-            self.clock.tick(self.fps)
+            # 控制帧率（窗口不活动时降低帧率）
+            self.clock.tick(self.fps if self.window_active else self.idle_fps)
+        
+        self.stop_recording()
+
+    def wait_for_events(self):
+        """阻塞等待下一个事件，超时后返回"""
+        event = pygame.event.wait(self.menu_wait_timeout)
+        if event.type == pygame.NOEVENT:
+            # 超时：正在输入文本时重绘以让光标闪烁
+            if self.is_text_input_active():
+                self.needs_redraw = True
+            return
+        self.pending_events.append(event)
+
+    def get_events(self):
+        """取出所有待处理事件，并同步窗口的活动状态"""
+        events = self.pending_events + pygame.event.get()
+        self.pending_events = []
+        for event in events:
+            self.update_window_state(event)
+        return events
+
+    def update_window_state(self, event):
+        """根据窗口事件记录窗口是否处于活动状态"""
+        if event.type in (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED):
+            self.window_active = False
+        elif event.type in (pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED):
+            self.window_active = True
+            self.needs_redraw = True
+        elif event.type == pygame.WINDOWEXPOSED:
+            self.needs_redraw = True
+
+    def is_text_input_active(self):
+        """当前界面是否有正在输入的文本框"""
+        if self.game_state == "character_create":
+            return self.character_creator.name is None
+        if self.game_state == "map_select":
+            return self.choosing_map_size and self.map_name_active
+        return False
 
     def draw_map_select(self):
         """绘制地图选择界面"""
@@ -628,30 +831,12 @@ class Game:
             self.buffer.blit(size_text, size_rect)
             
             # 绘制地图大小按钮
-            button_y = 380
-            for i, (size_name, size_data) in enumerate(self.map_sizes.items()):
-                button = SimpleButton(
-                    self.screen_width//2 - 150,
-                    button_y + i*80,
-                    300,
-                    60,
-                    size_name,
-                    font_size=32
-                )
+            for button in self.map_size_buttons:
                 button.draw(self.buffer)
-                if size_name == self.selected_map_size:
+                if button.text == self.selected_map_size:
                     pygame.draw.rect(self.buffer, (0, 255, 0), button.rect, 3)
         else:
             # 绘制新建地图按钮
-            self.new_map_button = SimpleButton(
-                self.screen_width//2 - 150,
-                200,
-                300,
-                60,
-                "新建地图",
-                color=(0, 200, 0),
-                font_size=32
-            )
             self.new_map_button.draw(self.buffer)
             
             # 绘制现有地图列表标题
@@ -660,35 +845,10 @@ class Game:
                 maps_title_rect = maps_title.get_rect(center=(self.screen_width//2, 300))
                 self.buffer.blit(maps_title, maps_title_rect)
                 
-                # 绘制地图列表
-                map_list_y = 350
-                for i, map_name in enumerate(self.maps):
-                    # 创建地图选择按钮
-                    map_button = SimpleButton(
-                        self.screen_width//2 - 200,
-                        map_list_y + i*60,
-                        300,
-                        50,
-                        f"地图 {i+1}",
-                        color=(100, 100, 200),
-                        font_size=32
-                    )
-                    map_button.draw(self.buffer)
-                    
-                    # 绘制删除按钮
-                    if i < len(self.map_delete_buttons):
-                        self.map_delete_buttons[i].draw(self.buffer)
+                # 绘制地图列表（只绘制可见的行）
+                self.map_list.draw(self.buffer)
         
         # 绘制返回按钮
-        self.back_button = SimpleButton(
-            50,
-            self.screen_height - 100,
-            200,
-            80,
-            "返回",
-            color=(200, 100, 0),
-            font_size=36
-        )
         self.back_button.draw(self.buffer)
         
         # 将缓冲区内容复制到屏幕
@@ -698,11 +858,33 @@ class Game:
         self.needs_redraw = False
 
     def handle_map_select_events(self):
-        for event in pygame.event.get():
+        for event in self.get_events():
             if event.type == pygame.QUIT:
                 self.running = False
                 return
                 
+            # 后台生成的缩略图已就绪
+            if event.type == THUMBNAIL_READY:
+                self.needs_redraw = True
+                continue
+                
+            # 处理地图列表的滚动、悬停和点击
+            if not self.choosing_map_size:
+                action = self.map_list.handle_event(event)
+                if action:
+                    kind, map_name = action
+                    if kind == "select":
+                        print(f"选择了地图: {map_name}")
+                        self.selected_map = map_name
+                        self.initialize_game()
+                        return
+                    if kind == "delete":
+                        self.delete_map(map_name)
+                        self.needs_redraw = True
+                        return
+                    self.needs_redraw = True
+                    continue
+                
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = event.pos
                 
@@ -723,43 +905,14 @@ class Game:
                         self.choosing_map_size = True
                         self.needs_redraw = True
                         return
-                        
-                    # 检查地图选择按钮
-                    map_list_y = 350
-                    for i, map_name in enumerate(self.maps):
-                        map_button_rect = pygame.Rect(
-                            self.screen_width//2 - 200,
-                            map_list_y + i*60,
-                            300,
-                            50
-                        )
-                        if map_button_rect.collidepoint(mouse_pos):
-                            print(f"选择了地图: {map_name}")
-                            self.selected_map = map_name
-                            self.initialize_game()
-                            return
-                        
-                    # 检查地图删除按钮
-                    for i, map_name in enumerate(self.maps):
-                        if self.map_delete_buttons[i].handle_event(event):
-                            self.delete_map(map_name)
-                            self.needs_redraw = True
-                            return
                 else:
                     # 检查是否点击了输入框
                     input_rect = pygame.Rect(self.screen_width//2 - 150, 220, 300, 40)
                     self.map_name_active = input_rect.collidepoint(mouse_pos)
                     
                     # 检查地图大小选择按钮
-                    button_y = 380
-                    for i, (size_name, size_data) in enumerate(self.map_sizes.items()):
-                        button_rect = pygame.Rect(
-                            self.screen_width//2 - 150,
-                            button_y + i*80,
-                            300,
-                            60
-                        )
-                        if button_rect.collidepoint(mouse_pos):
+                    for button, (size_name, size_data) in zip(self.map_size_buttons, self.map_sizes.items()):
+                        if button.rect.collidepoint(mouse_pos):
                             if not self.map_name_input.strip():
                                 self.map_name_error = True
                                 self.needs_redraw = True
@@ -774,7 +927,7 @@ class Game:
                                 size_data["grid_size"],
                                 self.map_name_input.strip()
                             )
-                            self.maps.append(new_map)
+                            self.load_characters_and_maps()
                             self.selected_map = new_map
                             self.initialize_game()
                             return
@@ -792,7 +945,7 @@ class Game:
 
     def handle_events(self):
         """处理游戏主界面的事件"""
-        for event in pygame.event.get():
+        for event in self.get_events():
             if event.type == pygame.QUIT:
                 self.running = False
                 return
@@ -821,10 +974,20 @@ class Game:
                     
                 # 数字键选择物品栏
                 elif pygame.K_1 <= event.key <= pygame.K_9:
-                    self.inventory.selected_slot = event.key - pygame.K_1
-                    self.needs_redraw = True
+                    self.tick_actions.append(('select', event.key - pygame.K_1))
                 elif event.key == pygame.K_0:
-                    self.inventory.selected_slot = 9
+                    self.tick_actions.append(('select', 9))
+                    
+                # 攻击
+                elif event.key == self.key_bindings['attack'] and hasattr(self, 'sim'):
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    self.tick_actions.append(('attack', mouse_x + self.camera_x, mouse_y + self.camera_y))
+                    
+                # M 键打开/关闭世界地图
+                elif event.key == self.key_bindings['map'] and hasattr(self, 'world_map'):
+                    self.world_map_open = not self.world_map_open
+                    if self.world_map_open:
+                        self.world_map.set_zoom(self.world_map.fit_zoom((self.screen_width, self.screen_height)))
                     self.needs_redraw = True
                     
                 # F11 切换全屏
@@ -837,6 +1000,11 @@ class Game:
                     self.needs_redraw = True
                     return
                     
+            # 世界地图打开时滚轮缩放
+            elif event.type == pygame.MOUSEWHEEL:
+                if self.world_map_open and self.world_map.set_zoom(self.world_map.zoom + event.y):
+                    self.needs_redraw = True
+                    
             # 处理鼠标事件
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
@@ -850,14 +1018,16 @@ class Game:
                 # 如果背包可见，检查是否点击了背包槽位
                 if self.inventory.visible:
                     if self.inventory.handle_click(event.pos):
+                        self.tick_actions.append(('select', self.inventory.selected_slot))
                         self.needs_redraw = True
                         return
                         
-                # 左键放置方块，右键破坏方块
-                if event.button == 1:  # 左键
-                    self.place_block(event.pos)
-                elif event.button == 3:  # 右键
-                    self.break_block(event.pos)
+                # 左键放置方块，右键破坏方块：从玩家朝鼠标做射线检测，只能够到 REACH 格以内
+                if event.button in (1, 3) and hasattr(self, 'sim'):
+                    place = event.button == 1
+                    tile = self.sim.pick_tile(*self.screen_to_world(event.pos), place=place)
+                    if tile is not None:
+                        self.tick_actions.append(('place' if place else 'break',) + tile)
                     
     def handle_menu_events(self, event):
         """处理主菜单界面的事件"""
@@ -891,7 +1061,7 @@ class Game:
 
     def handle_character_create_events(self):
         """处理角色创建界面的事件"""
-        for event in pygame.event.get():
+        for event in self.get_events():
             if event.type == pygame.QUIT:
                 self.running = False
                 return
@@ -906,12 +1076,8 @@ class Game:
                         # 保存角色
                         self.save_character(character_data['name'], character_data)
                         
-                        # 添加到角色列表
-                        if character_data['name'] not in self.characters:
-                            self.characters.append(character_data['name'])
-                        
-                        # 更新选择按钮
-                        self.update_selection_buttons()
+                        # 重新扫描角色目录并更新列表
+                        self.load_characters_and_maps()
                         
                         # 返回角色选择界面
                         self.game_state = "character_select"
@@ -1004,42 +1170,25 @@ class Game:
 
     def load_characters_and_maps(self):
         """加载已有的角色和地图"""
-        # 加载角色
-        self.characters = []
-        if os.path.exists(self.player_path):
-            for file in os.listdir(self.player_path):
-                if file.endswith('.json'):
-                    character_name = file[:-5]  # 移除 .json 后缀
-                    self.characters.append(character_name)
+        # 目录扫描结果按目录修改时间缓存，内容没有变化时不会重新读取目录
+        self.characters = scan_json_files(self.player_path)
+        self.maps = scan_json_files(self.world_path)
         
-        # 加载地图
-        self.maps = []
-        if os.path.exists(self.world_path):
-            for file in os.listdir(self.world_path):
-                if file.endswith('.json'):
-                    map_name = file[:-5]  # 移除 .json 后缀
-                    self.maps.append(map_name)
-        
-        print(f"已加载的角色: {self.characters}")
-        print(f"已加载的地图: {self.maps}")
+        print(f"已加载的角色: {len(self.characters)} 个")
+        print(f"已加载的地图: {len(self.maps)} 个")
         
         # 更新选择按钮
         self.update_selection_buttons()
 
-    def update_selection_buttons(self):
-        """更新选择界面的按钮"""
+    def create_selection_widgets(self):
+        """创建选择界面的按钮和列表（只创建一次）"""
         # 按钮尺寸和位置
-        button_width = 500  # 增加宽度
-        button_height = 100  # 增加高度
-        button_spacing = 20  # 减小间距
+        button_width = 500
+        button_height = 100
         start_y = 200
-        delete_button_width = 80  # 增加删除按钮宽度
+        delete_button_width = 80
         delete_button_spacing = 10
-        
-        # 初始化按钮列表
-        self.character_buttons = []
-        self.character_delete_buttons = []
-        self.map_delete_buttons = []
+        list_bottom = self.screen_height - 120  # 留出返回按钮的位置
         
         # 创建新建角色按钮
         self.new_character_button = SimpleButton(
@@ -1052,54 +1201,48 @@ class Game:
             font_size=48
         )
         
-        # 如果有角色，创建对应的按钮
-        if self.characters:
-            for i, char_name in enumerate(self.characters):
-                # 主按钮
-                self.character_buttons.append(
-                    SimpleButton(
-                        self.screen_width//2 - button_width//2,
-                        start_y + (i + 1) * (button_height + button_spacing),
-                        button_width,
-                        button_height,
-                        char_name,
-                        color=(100, 100, 200),
-                        font_size=48
-                    )
-                )
-                # 删除按钮
-                self.character_delete_buttons.append(
-                    SimpleButton(
-                        self.screen_width//2 + button_width//2 + delete_button_spacing,
-                        start_y + (i + 1) * (button_height + button_spacing),
-                        delete_button_width,
-                        button_height,
-                        "×",
-                        color=(200, 0, 0),
-                        font_size=48
-                    )
-                )
-        
-        # 如果有地图，创建对应的删除按钮
-        if self.maps:
-            for i, map_name in enumerate(self.maps):
-                self.map_delete_buttons.append(
-                    SimpleButton(
-                        self.screen_width//2 + button_width//2 + delete_button_spacing,
-                        start_y + (i + 1) * (button_height + button_spacing),
-                        delete_button_width,
-                        button_height,
-                        "×",
-                        color=(200, 0, 0),
-                        font_size=48
-                    )
-                )
-        
-        # 更新地图大小选择按钮
+        # 角色列表：主按钮 + 删除按钮，只创建可见的行
+        list_y = start_y + button_height + 20
+        self.character_list = ScrollList(
+            self.screen_width//2 - button_width//2,
+            list_y,
+            button_width + delete_button_spacing + delete_button_width,
+            list_bottom - list_y,
+            row_height=80,
+            row_spacing=delete_button_spacing,
+            font_size=48,
+            delete_width=delete_button_width
+        )
+        
+        # 新建地图按钮
+        self.new_map_button = SimpleButton(
+            self.screen_width//2 - 150,
+            200,
+            300,
+            60,
+            "新建地图",
+            color=(0, 200, 0),
+            font_size=32
+        )
+        
+        # 地图列表
+        self.map_list = ScrollList(
+            self.screen_width//2 - 200,
+            350,
+            300 + delete_button_spacing + delete_button_width,
+            list_bottom - 350,
+            row_height=50,
+            row_spacing=delete_button_spacing,
+            font_size=32,
+            delete_width=delete_button_width,
+            get_icon=self.thumbnails.get
+        )
+        
+        # 地图大小选择按钮
         self.map_size_buttons = [
             SimpleButton(
                 self.screen_width//2 - 150,
-                200 + i*80,
+                380 + i*80,
                 300,
                 60,
                 size,
@@ -1107,7 +1250,7 @@ class Game:
             ) for i, size in enumerate(self.map_sizes.keys())
         ]
         
-        # 更新返回按钮
+        # 返回按钮
         self.back_button = SimpleButton(
             50,
             self.screen_height - 100,
@@ -1118,17 +1261,46 @@ class Game:
             font_size=36
         )
 
+    def update_selection_buttons(self):
+        """更新选择界面的列表内容"""
+        if not hasattr(self, 'character_list'):
+            self.create_selection_widgets()
+        self.character_list.set_items(self.characters)
+        self.map_list.set_items(self.maps)
+
+    def delete_map(self, map_name):
+        """删除地图文件"""
+        map_file = os.path.join(self.world_path, f"{map_name}.json")
+        if os.path.exists(map_file):
+            os.remove(map_file)
+        self.thumbnails.remove(map_name)
+        self.load_characters_and_maps()
+
     def draw_game(self):
         """绘制游戏主界面"""
         # 清空缓冲区
         self.buffer.fill((135, 206, 235))  # 天空蓝色背景
         
+        # 世界地图打开时代替世界和玩家绘制
+        if self.world_map_open:
+            self.world_map.draw(
+                self.buffer,
+                (self.camera_x + self.screen_width / 2) / self.world.grid_size,
+                (self.camera_y + self.screen_height / 2) / self.world.grid_size,
+                getattr(self, 'player', None)
+            )
+        
         # 绘制世界
-        if hasattr(self, 'world'):
-            self.world.draw(self.buffer, self.camera_x, self.camera_y)
+        elif hasattr(self, 'world_renderer'):
+            self.world_renderer.draw(self.buffer, self.camera_x, self.camera_y)
+        
+        # 绘制实体
+        if hasattr(self, 'entities') and not self.world_map_open:
+            self.entities.draw(self.buffer, self.camera_x, self.camera_y)
+            self.projectiles.draw(self.buffer, self.camera_x, self.camera_y)
         
         # 绘制玩家
-        if hasattr(self, 'player'):
+        if hasattr(self, 'player') and not self.world_map_open:
             player_screen_x = self.player.rect.x - self.camera_x
             player_screen_y = self.player.rect.y - self.camera_y
             self.player.rect.x = player_screen_x
@@ -1137,6 +1309,10 @@ class Game:
             self.player.rect.x = self.player.rect.x + self.camera_x
             self.player.rect.y = self.player.rect.y + self.camera_y
         
+        # 绘制小地图
+        if hasattr(self, 'minimap') and not self.world_map_open:
+            self.minimap.draw(self.buffer, self.camera_x, self.camera_y, getattr(self, 'player', None))
+        
         # 绘制设置按钮（只在背包打开时显示）
         if hasattr(self, 'inventory') and self.inventory.visible:
             self.settings_button.draw(self.buffer)
@@ -1192,13 +1368,8 @@ class Game:
         # 绘制新建角色按钮
         self.new_character_button.draw(self.buffer)
         
-        # 绘制现有角色按钮
-        for button in self.character_buttons:
-            button.draw(self.buffer)
-        
-        # 绘制删除按钮
-        for button in self.character_delete_buttons:
-            button.draw(self.buffer)
+        # 绘制角色列表（只绘制可见的行）
+        self.character_list.draw(self.buffer)
         
         # 绘制返回按钮
         self.back_button.draw(self.buffer)
@@ -1271,7 +1442,7 @@ class Game:
 
     def handle_character_select_events(self):
         """处理角色选择界面的事件"""
-        for event in pygame.event.get():
+        for event in self.get_events():
             if event.type == pygame.QUIT:
                 self.running = False
                 return
@@ -1291,41 +1462,55 @@ class Game:
                     self.needs_redraw = True
                     return
                 
-                # 检查现有角色按钮
-                for i, button in enumerate(self.character_buttons):
-                    if button.rect.collidepoint(mouse_pos):
-                        self.selected_character = self.characters[i]
-                        self.game_state = "map_select"
-                        self.needs_redraw = True
-                        return
-                
-                # 检查删除按钮
-                for i, button in enumerate(self.character_delete_buttons):
-                    if button.rect.collidepoint(mouse_pos):
-                        character_name = self.characters[i]
-                        # 删除角色文件
-                        character_file = os.path.join(self.player_path, f"{character_name}.json")
-                        if os.path.exists(character_file):
-                            os.remove(character_file)
-                        # 从列表中移除
-                        self.characters.remove(character_name)
-                        # 更新按钮
-                        self.update_selection_buttons()
-                        self.needs_redraw = True
-                        return
+            # 处理角色列表的滚动、悬停和点击
+            action = self.character_list.handle_event(event)
+            if action:
+                kind, character_name = action
+                self.needs_redraw = True
+                if kind == "select":
+                    self.selected_character = character_name
+                    self.game_state = "map_select"
+                    return
+                elif kind == "delete":
+                    # 删除角色文件并重新扫描目录
+                    character_file = os.path.join(self.player_path, f"{character_name}.json")
+                    if os.path.exists(character_file):
+                        os.remove(character_file)
+                    self.load_characters_and_maps()
+                    return
+
+    def screen_to_world(self, pos):
+        """屏幕坐标转换为世界像素坐标"""
+        return pos[0] + self.camera_x, pos[1] + self.camera_y
+
+    def read_input(self):
+        """把这一帧按住的按键和事件产生的操作打包成模拟核心的输入"""
+        keys = pygame.key.get_pressed()
+        held = [action for action in HELD_ACTIONS if keys[self.key_bindings[action]]]
+        tick_input = TickInput(held, self.tick_actions)
+        self.tick_actions = []
+        if self.recorder:
+            self.recorder.record(tick_input)
+        return tick_input
+
+    def stop_recording(self):
+        """保存当前的录像"""
+        if not self.recorder:
+            return
+        os.makedirs(self.replay_path, exist_ok=True)
+        path = os.path.join(self.replay_path, time.strftime("%Y%m%d-%H%M%S") + ".replay")
+        self.recorder.save(path, self.sim)
+        self.recorder = None
+        print(f"录像已保存: {path}")
 
     def update_camera(self):
         """更新摄像机位置以跟随玩家"""
         if not hasattr(self, 'player') or not hasattr(self, 'world'):
             return
             
-        # 计算目标摄像机位置（使玩家保持在屏幕中心）
-        target_x = self.player.rect.centerx - self.screen_width // 2
-        target_y = self.player.rect.centery - self.screen_height // 2
-        
-        # 限制摄像机不会超出世界边界
-        target_x = max(0, min(target_x, self.world.width * self.world.grid_size - self.screen_width))
-        target_y = max(0, min(target_y, self.world.height * self.world.grid_size - self.screen_height))
+        # 计算目标摄像机位置（使玩家保持在屏幕中心，且不超出世界边界）
+        target_x, target_y = self.world.camera_target(self.player.rect.centerx, self.player.rect.centery,
+                                                      self.screen_width, self.screen_height)
         
         # 平滑移动摄像机（简单线性插值）
         self.camera_x += (target_x - self.camera_x) * 0.1
@@ -1345,19 +1530,21 @@ class Game:
         with open(character_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=4)
 
-    def create_new_map(self, width, height, grid_size, name):
+    def create_new_map(self, width, height, grid_size, name, seed=None):
         """创建新地图并保存"""
-        # 创建新的世界数据
+        # 由种子生成地形（洞穴、矿脉、湖泊、岩浆洞），种子保存在地图里；
+        # 多核时分成竖条由进程池并行生成
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        grid = TerrainGenerator(width, height, seed).generate(workers=None)
         world_data = {
             'width': width,
             'height': height,
             'grid_size': grid_size,
-            'grid': [[0 for _ in range(width)] for _ in range(height)]
+            'seed': seed,
+            'grid': grid.tolist()
         }
         
-        # 生成地形
-        self.generate_terrain(world_data['grid'])
-        
         # 保存地图
         os.makedirs(self.world_path, exist_ok=True)
         map_file = os.path.join(self.world_path, f"{name}.json")
@@ -1365,77 +1552,58 @@ class Game:
             json.dump(world_data, f, ensure_ascii=False, indent=4)
         
         return name
-        
-    def generate_terrain(self, grid):
-        """生成基础地形"""
-        height = len(grid)
-        width = len(grid[0])
-        
-        # 生成基础地形高度
-        terrain_height = [height // 2] * width
-        for i in range(1, width):
-            terrain_height[i] = terrain_height[i-1] + random.randint(-1, 1)
-            terrain_height[i] = max(height // 4, min(terrain_height[i], height * 3 // 4))
-        
-        # 填充地形
-        for x in range(width):
-            for y in range(height):
-                if y > terrain_height[x]:
-                    if y > terrain_height[x] + 1:
-                        grid[y][x] = 2  # 石头
-                    else:
-                        grid[y][x] = 1  # 泥土
 
     def initialize_game(self):
-        """初始化游戏，创建世界和玩家"""
-        # 加载或创建世界
-        if self.selected_map:
-            world_file = os.path.join(self.world_path, f"{self.selected_map}.json")
-            if os.path.exists(world_file):
-                with open(world_file, 'r', encoding='utf-8') as f:
-                    world_data = json.load(f)
-                self.world = World(
-                    world_data['width'],
-                    world_data['height'],
-                    world_data['grid_size']
-                )
-                self.world.grid = world_data['grid']
-            else:
-                print(f"找不到地图文件: {world_file}")
-                return
-        
-        # 加载或创建玩家
-        if self.selected_character:
-            player_file = os.path.join(self.player_path, f"{self.selected_character}.json")
-            if os.path.exists(player_file):
-                with open(player_file, 'r', encoding='utf-8') as f:
-                    player_data = json.load(f)
-                # 创建玩家实例，将其放置在世界中心的地面上
-                spawn_x = (self.world.width * self.world.grid_size) // 2
-                spawn_y = 0
-                for y in range(self.world.height):
-                    if self.world.grid[y][spawn_x // self.world.grid_size] != self.world.EMPTY:
-                        spawn_y = y * self.world.grid_size - 64  # 64是玩家高度
-                        break
-                
-                # 使用正确的参数创建玩家实例
-                self.player = Player(spawn_x, spawn_y, player_data)
-            else:
-                print(f"找不到角色文件: {player_file}")
-                return
+        """初始化游戏，创建模拟核心和显示用的对象"""
+        if not self.selected_map or not self.selected_character:
+            return
+        world_file = os.path.join(self.world_path, f"{self.selected_map}.json")
+        if not os.path.exists(world_file):
+            print(f"找不到地图文件: {world_file}")
+            return
+        player_file = os.path.join(self.player_path, f"{self.selected_character}.json")
+        if not os.path.exists(player_file):
+            print(f"找不到角色文件: {player_file}")
+            return
+        with open(world_file, 'r', encoding='utf-8') as f:
+            world_data = json.load(f)
+        with open(player_file, 'r', encoding='utf-8') as f:
+            player_data = json.load(f)
+        
+        # 世界、玩家、背包和各个子系统都在模拟核心里，物品栏放在距离底部50像素处。
+        # 随机种子固定下来，录像回放时可以得到完全相同的结果
+        seed = random.randrange(2 ** 31)
+        self.stop_recording()
+        if self.record_replays:
+            self.recorder = ReplayRecorder(world_file, player_data, seed)
+        self.start_simulation(Simulation(world_data, player_data, seed=seed,
+                                         inventory_pos=(10, self.screen_height - 50)))
+
+    def start_simulation(self, sim):
+        """使用给定的模拟核心开始游戏，创建显示用的对象"""
+        self.sim = sim
+        self.world = sim.world
+        self.player = sim.player
+        self.inventory = sim.inventory
+        self.entities = sim.entities
+        self.projectiles = sim.projectiles
+        self.mob_sprite = sim.mob_sprite
+        
+        # 只用于显示的对象
+        self.world_renderer = ChunkRenderer(self.world, sim.lighting)
+        self.minimap = Minimap(self.world)
+        self.world_map = WorldMap(self.world)
+        self.world_map_open = False
         
         # 初始化摄像机位置
         self.camera_x = 0
         self.camera_y = 0
         
-        # 创建物品栏
-        inventory_x = 10  # 距离左边界10像素
-        inventory_y = self.screen_height - 50  # 距离底部50像素
-        self.inventory = Inventory(inventory_x, inventory_y)
-        
         self.game_state = "playing"
         self.needs_redraw = True
 
 if __name__ == "__main__":
     game = Game()
+    # python main.py --record：录制每局游戏的输入，用 replay.py 回放
+    game.record_replays = "--record" in sys.argv
     game.run()
\ No newline at end of file
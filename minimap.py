@@ -0,0 +1,65 @@
+import pygame
+from world import World
+
+class Minimap:
+    """小地图
+
+    整个世界按一个方块一个像素预先渲染成一张 Surface，之后只在方块变化时
+    修改单个像素。每帧只从中截取摄像机附近的一块区域绘制，开销与世界大小无关。
+    """
+    def __init__(self, world, view_size=(240, 135)):
+        self.world = world
+        self.view_size = view_size
+        self.lut = World.color_lut()
+
+        # 用查找表一次性把方块数组转换成像素（surfarray 使用 (x, y) 顺序）
+        self.surface = pygame.surfarray.make_surface(self.lut[world.grid].swapaxes(0, 1))
+        world.add_listener(self)
+
+    def on_block_changed(self, x, y, old, new):
+        """方块变化时只更新对应的一个像素"""
+        self.surface.set_at((x, y), self.lut[new])
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        """批量变化时只写变化的像素，开销与变化的数量成正比"""
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        pixels[xs, ys] = self.lut[new]
+        del pixels  # 释放对 Surface 的锁定
+
+    def draw(self, screen, camera_x, camera_y, player=None, margin=10):
+        """在屏幕右上角绘制以摄像机为中心的小地图和视口矩形"""
+        grid_size = self.world.grid_size
+        view_w = min(self.view_size[0], self.world.width)
+        view_h = min(self.view_size[1], self.world.height)
+
+        # 摄像机可见区域（以方块为单位）
+        cam_x = camera_x / grid_size
+        cam_y = camera_y / grid_size
+        cam_w = screen.get_width() / grid_size
+        cam_h = screen.get_height() / grid_size
+
+        # 截取以摄像机中心为中心、不超出世界边界的区域
+        area_x = int(cam_x + cam_w / 2 - view_w / 2)
+        area_y = int(cam_y + cam_h / 2 - view_h / 2)
+        area_x = max(0, min(area_x, self.world.width - view_w))
+        area_y = max(0, min(area_y, self.world.height - view_h))
+        area = pygame.Rect(area_x, area_y, view_w, view_h)
+
+        pos = (screen.get_width() - view_w - margin, margin)
+        screen.blit(self.surface, pos, area)
+        old_clip = screen.get_clip()
+        screen.set_clip(pygame.Rect(pos, (view_w, view_h)))
+
+        # 视口矩形
+        view_rect = pygame.Rect(pos[0] + cam_x - area_x, pos[1] + cam_y - area_y, cam_w, cam_h)
+        pygame.draw.rect(screen, (255, 255, 255), view_rect, 1)
+
+        # 玩家位置
+        if player is not None:
+            player_pos = (pos[0] + player.rect.centerx // grid_size - area_x,
+                          pos[1] + player.rect.centery // grid_size - area_y)
+            pygame.draw.circle(screen, (255, 0, 0), player_pos, 2)
+        screen.set_clip(old_clip)
+
+        # 边框
+        pygame.draw.rect(screen, (0, 0, 0), (pos[0] - 1, pos[1] - 1, view_w + 2, view_h + 2), 1)
@@ -0,0 +1,282 @@
+import heapq
+import math
+from collections import deque
+import numpy as np
+from world import World
+
+
+class NavGraph:
+    """平台游戏的寻路图
+
+    节点是可以站立的格子：格子本身和上方 agent_height-1 格都不是实心，
+    下面一格是实心（站在岩浆里不算）。每个节点有三种连接：
+    - 行走：左右相邻、同一高度的节点
+    - 跳跃：向左右最多 jump_reach 格、向上最多 jump_height 格的节点，
+      起点上方和落点所在的一排要有足够的空间
+    - 下落：走出边缘后向下落，最多落 max_drop 格
+    连接按区块生成并缓存，方块变化时只丢弃可能受影响的区块，查询时再重新生成。
+    """
+    def __init__(self, world, agent_height=1, jump_height=2, jump_reach=2, max_drop=6):
+        self.world = world
+        self.chunk_size = World.CHUNK_SIZE
+        self.agent_height = agent_height
+        self.jump_height = jump_height
+        self.jump_reach = jump_reach
+        self.max_drop = max_drop
+        self.chunks = {}  # (区块x, 区块y) -> {(x, y): [((nx, ny), 代价), ...]}
+        self.builds = 0  # 生成区块的次数，用于统计
+        world.add_listener(self)
+
+    def on_block_changed(self, x, y, old, new):
+        """丢弃连接可能经过 (x, y) 的节点所在的区块"""
+        if World.SOLID[old] == World.SOLID[new] and World.LAVA not in (old, new):
+            return  # 空气和水之间的变化不影响寻路
+        size = self.chunk_size
+        x0, x1 = x - self.jump_reach, x + self.jump_reach
+        y0, y1 = y - self.max_drop - 1, y + self.jump_height + self.agent_height
+        for chunk_y in range(max(y0, 0) // size, max(y1, 0) // size + 1):
+            for chunk_x in range(max(x0, 0) // size, max(x1, 0) // size + 1):
+                self.chunks.pop((chunk_x, chunk_y), None)
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        """批量变化时一次丢弃所有受影响的区块"""
+        relevant = ((World.SOLID[old] != World.SOLID[new]) | (old == World.LAVA) | (new == World.LAVA))
+        if not relevant.any():
+            return
+        xs, ys = xs[relevant], ys[relevant]
+        size = self.chunk_size
+        x0, x1 = int(xs.min()) - self.jump_reach, int(xs.max()) + self.jump_reach
+        y0, y1 = int(ys.min()) - self.max_drop - 1, int(ys.max()) + self.jump_height + self.agent_height
+        for chunk_y in range(max(y0, 0) // size, max(y1, 0) // size + 1):
+            for chunk_x in range(max(x0, 0) // size, max(x1, 0) // size + 1):
+                self.chunks.pop((chunk_x, chunk_y), None)
+
+    def chunk_of(self, x, y):
+        size = self.chunk_size
+        key = (x // size, y // size)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self.build_chunk(*key)
+        return chunk
+
+    def neighbors(self, node):
+        """节点的连接 [((x, y), 代价), ...]，不是可站立的格子时为空"""
+        x, y = node
+        if not (0 <= x < self.world.width and 0 <= y < self.world.height):
+            return ()
+        return self.chunk_of(x, y).get(node, ())
+
+    def is_node(self, x, y):
+        if not (0 <= x < self.world.width and 0 <= y < self.world.height):
+            return False
+        return (x, y) in self.chunk_of(x, y)
+
+    def snap(self, x, y):
+        """(x, y) 或它正下方最近的节点，用于把空中的实体落到图上；找不到时返回 None"""
+        for ny in range(max(y, 0), min(y + self.max_drop + self.agent_height, self.world.height)):
+            if self.is_node(x, ny):
+                return (x, ny)
+            if self.world.is_solid(x, ny):
+                break
+        return None
+
+    def build_chunk(self, chunk_x, chunk_y):
+        """生成区块内所有节点的连接"""
+        self.builds += 1
+        world = self.world
+        size = self.chunk_size
+        height, reach, jump = self.agent_height, self.jump_reach, self.jump_height
+        x0, y0 = chunk_x * size, chunk_y * size
+        x1, y1 = min(x0 + size, world.width), min(y0 + size, world.height)
+        # 加上连接可能读到的范围
+        px0, px1 = x0 - reach, x1 + reach
+        py0, py1 = y0 - jump - height, y1 + self.max_drop + 2
+        cols = np.arange(px0, px1)
+        rows = np.arange(py0, py1)
+        inside_x = (cols >= 0) & (cols < world.width)
+        inside_y = (rows >= 0) & (rows < world.height)
+        grid = world.grid[np.clip(rows, 0, world.height - 1)[:, None], np.clip(cols, 0, world.width - 1)[None, :]]
+        # 世界左右以外视为墙，上下以外视为空
+        solid = np.where(inside_x[None, :], World.SOLID[grid], True) & inside_y[:, None]
+        clear = ~solid & ((grid != World.LAVA) | ~inside_y[:, None])
+
+        # 每个格子向上、向下连续的非实心格子数（包括自己）
+        up = np.zeros(clear.shape, dtype=np.int32)
+        down = np.zeros(clear.shape, dtype=np.int32)
+        up[0] = clear[0]
+        for row in range(1, len(rows)):
+            up[row] = (up[row - 1] + 1) * clear[row]
+        down[-1] = clear[-1]
+        for row in range(len(rows) - 2, -1, -1):
+            down[row] = (down[row + 1] + 1) * clear[row]
+        stand = np.zeros(clear.shape, dtype=bool)
+        stand[:-1] = (up[:-1] >= height) & solid[1:]
+
+        up, down, stand = up.tolist(), down.tolist(), stand.tolist()
+        last = len(rows) - 1
+        chunk = {}
+        node_rows, node_cols = np.nonzero(np.asarray(stand)[y0 - py0:y1 - py0, x0 - px0:x1 - px0])
+        for r, c in zip((node_rows + y0 - py0).tolist(), (node_cols + x0 - px0).tolist()):
+            x, y = c + px0, r + py0
+            links = []
+            for direction in (-1, 1):
+                nc = c + direction
+                if stand[r][nc]:
+                    links.append(((x + direction, y), 1))  # 行走
+                elif up[r][nc] >= height:
+                    # 下落：落到这一列下面第一个实心方块上
+                    land = r + down[r][nc] - 1
+                    if land < last and land - r <= self.max_drop and stand[land][nc]:
+                        links.append(((x + direction, land + py0), 1 + land - r))
+                # 跳跃：先向上跳 dy 格，再向旁边移动 dx 格
+                for dy in range(jump + 1):
+                    tr = r - dy
+                    if up[r][c] < dy + height:
+                        break
+                    for dx in range(1, reach + 1):
+                        tc = c + direction * dx
+                        if up[tr][tc] < height:
+                            break
+                        if stand[tr][tc] and (dy > 0 or dx > 1):
+                            links.append(((x + direction * dx, tr + py0), 1 + dx + dy))
+            chunk[(x, y)] = links
+        return chunk
+
+
+class PathSearch:
+    """一次可以分多帧进行的 A* 搜索"""
+    def __init__(self, graph, start, goal, max_expansions):
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        self.max_expansions = max_expansions
+        self.expanded = 0
+        self.open = [(self.heuristic(start), 0, start)]
+        self.cost = {start: 0}
+        self.came_from = {start: None}
+        self.path = None
+        self.done = False
+
+    def heuristic(self, node):
+        # 每种连接的代价都不小于它移动的曼哈顿距离
+        return abs(node[0] - self.goal[0]) + abs(node[1] - self.goal[1])
+
+    def step(self, budget):
+        """最多展开 budget 个节点，返回实际展开的数量"""
+        graph = self.graph
+        cost, came_from, open_heap = self.cost, self.came_from, self.open
+        count = 0
+        while open_heap and count < budget:
+            _, node_cost, node = heapq.heappop(open_heap)
+            if node_cost > cost[node]:
+                continue
+            count += 1
+            if node == self.goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = came_from[node]
+                self.path = path[::-1]
+                self.done = True
+                return count
+            for neighbor, step_cost in graph.neighbors(node):
+                new_cost = node_cost + step_cost
+                if new_cost < cost.get(neighbor, math.inf):
+                    cost[neighbor] = new_cost
+                    came_from[neighbor] = node
+                    heapq.heappush(open_heap, (new_cost + self.heuristic(neighbor), new_cost, neighbor))
+        self.expanded += count
+        if not open_heap or self.expanded >= self.max_expansions:
+            self.done = True  # 找不到路径
+        return count
+
+
+class PathPlanner:
+    """寻路请求队列和路径跟随
+
+    request 只是把搜索放进队列，update 每帧最多展开 budget 个节点，
+    没做完的搜索留到下一帧继续，所以同时寻路的怪物再多，每帧的开销也有上限。
+    找到的路径保存在 paths 里，steer 让实体沿路径行走和跳跃。
+    """
+    BUDGET = 1000  # 每帧最多展开的节点数
+    MAX_EXPANSIONS = 20000  # 单次搜索最多展开的节点数
+    SPEED = 3  # 沿路径行走的速度（像素/帧）
+
+    def __init__(self, graph, budget=BUDGET):
+        self.graph = graph
+        self.budget = budget
+        self.queue = deque()  # 排队搜索的实体编号
+        self.searching = {}  # 实体编号 -> PathSearch
+        self.paths = {}  # 实体编号 -> 剩余的节点列表
+
+    def foot_tile(self, entities, index):
+        """实体站立的格子"""
+        grid_size = self.graph.world.grid_size
+        return (int((entities.x[index] + entities.w[index] / 2) // grid_size),
+                int((entities.y[index] + entities.h[index] - 1) // grid_size))
+
+    def request(self, index, start, goal):
+        """为实体请求一条从 start 到 goal 的路径（方块坐标），替换之前的请求；
+        起点和终点会落到正下方的节点上，落不到时返回 False"""
+        start, goal = self.graph.snap(*start), self.graph.snap(*goal)
+        if start is None or goal is None:
+            return False
+        search = PathSearch(self.graph, start, goal, self.MAX_EXPANSIONS)
+        if index not in self.searching:
+            self.queue.append(index)
+        self.searching[index] = search
+        return True
+
+    def cancel(self, index):
+        self.searching.pop(index, None)
+        self.paths.pop(index, None)
+
+    def on_despawn(self, index):
+        """实体被移除时丢掉它的搜索和路径，复用这个槽位的新实体不会接着走"""
+        self.cancel(index)
+
+    def update(self):
+        """用本帧的预算推进排队的搜索，返回本帧完成的搜索数"""
+        budget = self.budget
+        finished = 0
+        while self.queue and budget > 0:
+            index = self.queue[0]
+            search = self.searching.get(index)
+            if search is None:
+                self.queue.popleft()
+                continue
+            budget -= search.step(budget)
+            if search.done:
+                self.queue.popleft()
+                del self.searching[index]
+                if search.path is not None:
+                    self.paths[index] = deque(search.path[1:])
+                finished += 1
+        return finished
+
+    def steer(self, entities):
+        """设置沿路径行走的实体的速度，到达终点或死亡的实体不再跟随"""
+        grid_size = self.graph.world.grid_size
+        gravity = entities.gravity
+        for index in list(self.paths):
+            path = self.paths[index]
+            if not entities.flags[index] & entities.ALIVE:
+                del self.paths[index]
+                continue
+            x, y = self.foot_tile(entities, index)
+            while path and path[0] == (x, y):
+                path.popleft()
+            if not path:
+                del self.paths[index]
+                entities.vx[index] = 0
+                continue
+            target_x, target_y = path[0]
+            center = entities.x[index] + entities.w[index] / 2
+            dx = (target_x + 0.5) * grid_size - center
+            entities.vx[index] = max(-self.SPEED, min(self.SPEED, dx))
+            on_ground = entities.flags[index] & entities.ON_GROUND
+            if on_ground and (target_y < y or abs(target_x - x) > 1):
+                # 起跳速度刚好能跳到比目标高半格的位置
+                rise = (max(y - target_y, 0) + 0.5) * grid_size
+                entities.vy[index] = -math.sqrt(2 * gravity * rise)
+                entities.flags[index] &= ~np.uint8(entities.ON_GROUND | entities.SLEEPING)
@@ -0,0 +1,232 @@
+import asyncio
+import time
+from collections import deque, defaultdict
+import numpy as np
+from world import World
+from player import Player
+from simulation import wander_bot, MOVE_BINDINGS, DEFAULT_PLAYER, held_to_mask, mask_to_held
+import protocol
+
+
+class GameClient:
+    """多人游戏客户端
+
+    连接服务器后维护一份本地的世界副本：接收服务器推送的视野内的区块和
+    方块变化，用差分快照还原视野内的实体和玩家，并确认收到的快照。
+
+    自己的移动在本地立即预测：每个输入发给服务器的同时用与服务器相同的
+    Player.update 推进本地的玩家。服务器发回已处理的最后一个输入序号和权威
+    状态后，与当时预测的状态对比，不一致时回到权威状态、重放之后的输入。
+    其他玩家和实体在缓存的快照之间插值，显示时间比服务器晚 INTERP_DELAY 帧。
+    """
+    HISTORY = 64  # 最多保留的快照数，服务器只会用确认过的快照作为基准
+    INTERP_DELAY = 8  # 插值显示落后的帧数，要大于快照间隔加上网络抖动
+    TIMELINE = 32  # 插值用的快照缓存数
+
+    def __init__(self, name, view_size=(1280, 720)):
+        self.name = name
+        self.view_size = view_size
+        self.reader = None
+        self.writer = None
+        self.player_id = None
+        self.world = None
+        self.position = (0, 0)  # 自己的像素坐标（以服务器为准）
+        self.players = {}  # 视野内的玩家编号 -> (x, y)
+        self.entities = {}  # 视野内的实体 {编号: (种类, x, y)}
+        self.snapshots = {}  # 帧号 -> 还原后的快照
+        self.chunks = 0  # 收到的区块数
+        self.bytes_received = 0
+        self.sequence = 0
+        self.receiver = None
+        self.player = None  # 本地预测的玩家
+        self.chunk_keys = set()  # 收到的区块
+        self.pending = deque()  # 服务器还没处理的输入 (序号, 按住的动作)
+        self.predicted = {}  # 输入序号 -> 预测的玩家状态
+        self.corrections = []  # 每次预测错误时，预测位置与权威位置的距离
+        self.states = 0  # 收到的权威状态数
+        self.timeline = deque(maxlen=self.TIMELINE)  # (帧号, 快照)
+        self.clock = 0  # 估计的服务器帧号
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(protocol.hello(self.name))
+        kind, payload = await protocol.read_message(self.reader)
+        if kind != protocol.WELCOME:
+            raise protocol.ProtocolError(f"期望 WELCOME，收到 {kind}")
+        self.bytes_received += protocol.HEADER.size + len(payload)
+        self.player_id, width, height, grid_size, x, y = protocol.WELCOME_FORMAT.unpack(payload)
+        self.world = World(width, height, grid_size)
+        self.position = (x, y)
+        self.player = Player(x, y, dict(DEFAULT_PLAYER, name=self.name))
+        self.writer.write(protocol.view(*self.view_size))
+        self.receiver = asyncio.ensure_future(self.receive_loop())
+
+    async def close(self):
+        if self.receiver is not None:
+            self.receiver.cancel()
+        if self.writer is not None:
+            self.writer.close()
+
+    def apply_chunk(self, chunk_x, chunk_y, blocks):
+        world = self.world
+        size = World.CHUNK_SIZE
+        x0, y0 = chunk_x * size, chunk_y * size
+        height, width = blocks.shape
+        world.grid[y0:y0 + height, x0:x0 + width] = blocks
+        # 重新计算这几列的地表高度
+        solid = world.grid[:, x0:x0 + width] != World.EMPTY
+        world.heights[x0:x0 + width] = np.where(solid.any(axis=0), solid.argmax(axis=0), world.height)
+        self.chunks += 1
+        self.chunk_keys.add((chunk_x, chunk_y))
+
+    async def receive_loop(self):
+        try:
+            while True:
+                kind, payload = await protocol.read_message(self.reader)
+                self.bytes_received += protocol.HEADER.size + len(payload)
+                if kind == protocol.CHUNK:
+                    self.apply_chunk(*protocol.parse_chunk(payload))
+                elif kind == protocol.BLOCKS:
+                    for x, y, block_type in protocol.parse_blocks(payload):
+                        self.world.set_block(x, y, block_type)
+                elif kind == protocol.SNAPSHOT:
+                    self.apply_snapshot(payload)
+                elif kind == protocol.STATE:
+                    self.reconcile(*protocol.parse_state(payload))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+
+    def apply_snapshot(self, payload):
+        """还原快照并确认"""
+        _, base_tick = protocol.SNAPSHOT_HEADER.unpack_from(payload)[:2]
+        base = self.snapshots.get(base_tick, {}) if base_tick else {}
+        tick, _, current = protocol.parse_snapshot(payload, base)
+        self.snapshots[tick] = current
+        # 服务器之后只会以这次或更新的快照为基准
+        for old in [old for old in self.snapshots if old < base_tick]:
+            del self.snapshots[old]
+        if len(self.snapshots) > self.HISTORY:
+            del self.snapshots[min(self.snapshots)]
+        self.entities = current
+        self.players = {key & ~protocol.PLAYER_FLAG: (x, y) for key, (kind, x, y) in current.items()
+                        if kind == protocol.PLAYER_KIND}
+        if self.player_id in self.players:
+            self.position = self.players[self.player_id]
+        self.timeline.append((tick, current))
+        self.clock = max(self.clock, tick)
+        self.writer.write(protocol.ack(tick))
+
+    def ready(self):
+        """玩家所在的区块已经收到，可以在本地预测"""
+        size = World.CHUNK_SIZE * self.world.grid_size
+        rect = self.player.rect
+        return (rect.centerx // size, rect.centery // size) in self.chunk_keys
+
+    def predict(self, mask):
+        keys = defaultdict(bool, dict.fromkeys(mask_to_held(mask), True))
+        self.player.update(self.world, MOVE_BINDINGS, keys)
+
+    def reconcile(self, sequence, tick, state):
+        """用服务器的权威状态校正预测"""
+        self.states += 1
+        while self.pending and self.pending[0][0] <= sequence:
+            self.pending.popleft()
+        predicted = self.predicted.pop(sequence, None)
+        for old in [old for old in self.predicted if old < sequence]:
+            del self.predicted[old]
+        if predicted == state:
+            return
+        if predicted is not None:
+            self.corrections.append(float(np.hypot(predicted[0] - state[0], predicted[1] - state[1])))
+        # 回到权威状态，重放服务器还没处理的输入
+        self.player.set_state(state)
+        if self.ready():
+            for pending_sequence, mask in self.pending:
+                self.predict(mask)
+                self.predicted[pending_sequence] = self.player.get_state()
+
+    def step(self, held):
+        """本地推进一帧：发送输入并立即预测自己的移动"""
+        mask = held_to_mask(held)
+        self.sequence += 1
+        self.writer.write(protocol.input_message(self.sequence, mask))
+        self.pending.append((self.sequence, mask))
+        if self.ready():
+            self.predict(mask)
+            self.predicted[self.sequence] = self.player.get_state()
+        # 估计的服务器帧号不超过最新快照太多
+        latest = self.timeline[-1][0] if self.timeline else 0
+        self.clock = min(self.clock + 1, latest + self.INTERP_DELAY)
+
+    def interpolated(self):
+        """其他玩家和实体在 clock - INTERP_DELAY 帧的位置 {编号: (种类, x, y)}"""
+        if not self.timeline:
+            return {}
+        own = protocol.PLAYER_FLAG | self.player_id
+        render_tick = self.clock - self.INTERP_DELAY
+        after = None
+        for index, (tick, _) in enumerate(self.timeline):
+            if tick >= render_tick:
+                after = index
+                break
+        if after is None:
+            result = dict(self.timeline[-1][1])
+        elif after == 0:
+            result = dict(self.timeline[0][1])
+        else:
+            tick0, snapshot0 = self.timeline[after - 1]
+            tick1, snapshot1 = self.timeline[after]
+            t = (render_tick - tick0) / (tick1 - tick0)
+            result = dict(snapshot1)
+            for key, (kind, x1, y1) in snapshot1.items():
+                if key in snapshot0:
+                    _, x0, y0 = snapshot0[key]
+                    result[key] = (kind, x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+        result.pop(own, None)
+        return result
+
+    def send_action(self, name, x, y):
+        self.writer.write(protocol.action(name, x, y))
+
+
+async def run_bot(host, port, name, seconds, tick_rate=60):
+    """脚本客户端：按 wander_bot 走动（本地预测），每秒挖一次脚下的方块，返回断开前的客户端"""
+    client = GameClient(name)
+    await client.connect(host, port)
+    interval = 1 / tick_rate
+    start = time.perf_counter()
+    tick = 0
+    while time.perf_counter() - start < seconds:
+        tick_input = wander_bot(tick % 2000)
+        client.step(tick_input.held)
+        if tick % tick_rate == 0:
+            grid_size = client.world.grid_size
+            client.send_action('break', int(client.position[0] + 24) // grid_size,
+                               int(client.position[1] + 64) // grid_size)
+        tick += 1
+        await asyncio.sleep(interval)
+    await client.close()
+    return client
+
+
+def main():
+    """运行脚本客户端：python netclient.py 地址 端口 [--bots N] [--seconds S]"""
+    import argparse
+    parser = argparse.ArgumentParser(description="连接多人游戏服务器的脚本客户端")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    parser.add_argument("--bots", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    async def run():
+        return await asyncio.gather(*(run_bot(args.host, args.port, f"机器人{i}", args.seconds)
+                                      for i in range(args.bots)))
+
+    for client in asyncio.run(run()):
+        print(f"{client.name}: 收到 {client.chunks} 个区块, {client.bytes_received / 1024:.1f} KB, "
+              f"{client.bytes_received / 1024 / args.seconds:.1f} KB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -62,7 +62,8 @@ class Player:
         if not self.facing_right:
             self.image = pygame.transform.flip(self.image, True, False)
 
-    def update(self, world, key_bindings):
+    def update(self, world, key_bindings, keys=None):
+        """推进一帧。keys 是按键状态（以 key_bindings 中的值为下标），默认读取键盘"""
         current_time = pygame.time.get_ticks()
         
         # 更新动画帧
@@ -74,7 +75,8 @@ class Player:
         self.update_collision_rects(world)
         
         # 获取键盘输入
-        keys = pygame.key.get_pressed()
+        if keys is None:
+            keys = pygame.key.get_pressed()
         
         # 水平移动
         dx = 0
@@ -169,7 +171,7 @@ class Player:
         # 从上往下找到第一个地面方块
         spawn_y = 0
         for y in range(world.height):
-            if world.grid[y][center_grid_x] != world.EMPTY:
+            if world.SOLID[world.grid[y][center_grid_x]]:
                 spawn_y = y * world.grid_size - self.rect.height
                 break
         
@@ -204,7 +206,7 @@ class Player:
         check_range = 3
         for y in range(max(0, grid_y - check_range), min(len(world.grid), grid_y + check_range + 1)):
             for x in range(max(0, grid_x - check_range), min(len(world.grid[0]), grid_x + check_range + 1)):
-                if world.grid[y][x] != world.EMPTY:
+                if world.SOLID[world.grid[y][x]]:
                     self.collision_rects.append(
                         pygame.Rect(x * world.grid_size, 
                                   y * world.grid_size,
@@ -216,6 +218,16 @@ class Player:
         """获取玩家位置"""
         return self.rect.x, self.rect.y
         
+    def get_state(self):
+        """与移动有关的全部状态，用于网络同步、预测和回滚"""
+        return (self.rect.x, self.rect.y, self.dy, self.jumps_left,
+                self.on_ground, self.jump_pressed, self.facing_right)
+        
+    def set_state(self, state):
+        """恢复 get_state 返回的状态"""
+        (self.rect.x, self.rect.y, self.dy, self.jumps_left,
+         self.on_ground, self.jump_pressed, self.facing_right) = state
+        
     def get_health_hearts(self):
         """返回需要显示的完整心形数量"""
         return self.health // 20
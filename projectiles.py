@@ -0,0 +1,205 @@
+import math
+import pygame
+import numpy as np
+from world import World
+from entities import EntityManager
+
+class ProjectilePool:
+    """投射物（箭、法术）对象池
+
+    所有投射物保存在预先分配的结构数组里，发射和消失只是从空闲栈中取出或
+    放回一个槽位，不会在每次射击时分配对象。每帧用矢量化的 DDA 算法让所有
+    投射物沿着本帧的位移逐格穿过方块网格，速度再快也不会跳过方块；
+    与怪物的碰撞先用空间哈希做粗筛，再做线段与碰撞箱的精确检测。
+    """
+    ARROW = 0
+    SPELL = 1
+
+    # 每种投射物的重力倍数和颜色
+    GRAVITY = {ARROW: 0.25, SPELL: 0.0}
+    COLORS = {ARROW: (90, 60, 30), SPELL: (120, 80, 255)}
+
+    def __init__(self, world, entities, capacity=1024):
+        self.world = world
+        self.entities = entities
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)  # 剩余帧数
+        self.damage = np.zeros(capacity, dtype=np.int16)
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        # 空闲槽位栈
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_top = capacity
+
+    def __len__(self):
+        return self.capacity - self.free_top
+
+    def fire(self, kind, x, y, vx, vy, damage=1, life=180):
+        """发射一个投射物，池已满时返回 -1"""
+        if self.free_top == 0:
+            return -1
+        self.free_top -= 1
+        index = self.free[self.free_top]
+        self.x[index], self.y[index] = x, y
+        self.vx[index], self.vy[index] = vx, vy
+        self.life[index] = life
+        self.damage[index] = damage
+        self.kind[index] = kind
+        self.gravity[index] = self.GRAVITY[kind]
+        self.active[index] = True
+        return index
+
+    def release(self, ids):
+        """把投射物放回空闲栈"""
+        ids = ids[self.active[ids]]
+        self.active[ids] = False
+        count = len(ids)
+        self.free[self.free_top:self.free_top + count] = ids
+        self.free_top += count
+
+    def march(self, ids):
+        """矢量化 DDA：沿本帧位移逐格检测方块，返回命中时的参数 t（未命中为 inf）"""
+        grid_size = self.world.grid_size
+        grid = self.world.grid
+        height, width = grid.shape
+        px, py = self.x[ids] / grid_size, self.y[ids] / grid_size
+        dx, dy = self.vx[ids] / grid_size, self.vy[ids] / grid_size
+
+        cell_x = np.floor(px).astype(np.int64)
+        cell_y = np.floor(py).astype(np.int64)
+        step_x = np.sign(dx).astype(np.int64)
+        step_y = np.sign(dy).astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta_x = np.where(dx != 0, np.abs(1 / dx), np.inf)
+            delta_y = np.where(dy != 0, np.abs(1 / dy), np.inf)
+            t_max_x = np.where(dx != 0, (cell_x + (step_x > 0) - px) / dx, np.inf)
+            t_max_y = np.where(dy != 0, (cell_y + (step_y > 0) - py) / dy, np.inf)
+
+        # 本帧最多穿过的格子数决定迭代次数
+        end_x = np.floor(px + dx).astype(np.int64)
+        end_y = np.floor(py + dy).astype(np.int64)
+        steps = int((np.abs(end_x - cell_x) + np.abs(end_y - cell_y)).max()) + 1
+
+        hit_t = np.full(len(ids), np.inf)
+        t_enter = np.zeros(len(ids))
+        marching = np.ones(len(ids), dtype=bool)
+        for _ in range(steps):
+            inside = (cell_x >= 0) & (cell_x < width) & (cell_y >= 0) & (cell_y < height)
+            solid = np.zeros(len(ids), dtype=bool)
+            solid[inside] = World.SOLID[grid[cell_y[inside], cell_x[inside]]]
+            hit = marching & solid
+            hit_t[hit] = t_enter[hit]
+            marching &= ~hit
+
+            # 沿 t 较小的轴前进到下一个格子
+            advance_x = t_max_x < t_max_y
+            t_enter = np.where(advance_x, t_max_x, t_max_y)
+            marching &= t_enter <= 1
+            if not marching.any():
+                break
+            cell_x = np.where(marching & advance_x, cell_x + step_x, cell_x)
+            cell_y = np.where(marching & ~advance_x, cell_y + step_y, cell_y)
+            t_max_x = np.where(marching & advance_x, t_max_x + delta_x, t_max_x)
+            t_max_y = np.where(marching & ~advance_x, t_max_y + delta_y, t_max_y)
+        return hit_t
+
+    def hit_entities(self, ids, hit_t):
+        """粗筛：线段两端所在的哈希单元格有实体时，才检测线段与怪物碰撞箱的相交"""
+        e = self.entities
+        cells = e.hash.cells
+        cell_size = e.hash.cell_size
+        x0, y0 = self.x[ids], self.y[ids]
+        x1, y1 = x0 + self.vx[ids], y0 + self.vy[ids]
+        start_cx = np.floor(x0 / cell_size).astype(np.int64).tolist()
+        start_cy = np.floor(y0 / cell_size).astype(np.int64).tolist()
+        end_cx = np.floor(x1 / cell_size).astype(np.int64).tolist()
+        end_cy = np.floor(y1 / cell_size).astype(np.int64).tolist()
+
+        hits = []  # (投射物在 ids 中的位置, 怪物编号)
+        for i in range(len(ids)):
+            near = False
+            for cx in range(min(start_cx[i], end_cx[i]) - 1, max(start_cx[i], end_cx[i]) + 2):
+                for cy in range(min(start_cy[i], end_cy[i]) - 1, max(start_cy[i], end_cy[i]) + 2):
+                    if (cx, cy) in cells:
+                        near = True
+                        break
+                if near:
+                    break
+            if not near:
+                continue
+            mobs = e.hash.query_aabb(min(x0[i], x1[i]), min(y0[i], y1[i]),
+                                     max(x0[i], x1[i]) + 1, max(y0[i], y1[i]) + 1,
+                                     EntityManager.MOB)
+            if len(mobs) == 0:
+                continue
+            # 线段与碰撞箱的 slab 相交检测
+            dx, dy = x1[i] - x0[i], y1[i] - y0[i]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tx0 = (e.x[mobs] - x0[i]) / dx
+                tx1 = (e.x[mobs] + e.w[mobs] - x0[i]) / dx
+                ty0 = (e.y[mobs] - y0[i]) / dy
+                ty1 = (e.y[mobs] + e.h[mobs] - y0[i]) / dy
+            if dx == 0:
+                inside_x = (e.x[mobs] <= x0[i]) & (x0[i] < e.x[mobs] + e.w[mobs])
+                tx0 = np.where(inside_x, -np.inf, np.inf)
+                tx1 = np.where(inside_x, np.inf, -np.inf)
+            if dy == 0:
+                inside_y = (e.y[mobs] <= y0[i]) & (y0[i] < e.y[mobs] + e.h[mobs])
+                ty0 = np.where(inside_y, -np.inf, np.inf)
+                ty1 = np.where(inside_y, np.inf, -np.inf)
+            t_near = np.maximum(np.minimum(tx0, tx1), np.minimum(ty0, ty1))
+            t_far = np.minimum(np.maximum(tx0, tx1), np.maximum(ty0, ty1))
+            t_near = np.maximum(t_near, 0)
+            ok = (t_near <= t_far) & (t_near <= 1) & (t_near < hit_t[i])
+            if ok.any():
+                first = int(np.argmin(np.where(ok, t_near, np.inf)))
+                hits.append((i, int(mobs[first])))
+        return hits
+
+    def update(self):
+        """推进所有投射物一帧，返回仍然存在的投射物数量"""
+        ids = np.flatnonzero(self.active)
+        if len(ids) == 0:
+            return 0
+
+        # 重力（法术不受重力影响）
+        self.vy[ids] += self.gravity[ids] * self.entities.gravity
+
+        hit_t = self.march(ids)
+        for i, mob in self.hit_entities(ids, hit_t):
+            index = ids[i]
+            knockback = 4 if self.vx[index] > 0 else -4
+            if self.entities.flags[mob] & EntityManager.ALIVE:
+                self.entities.damage(np.array([mob]), int(self.damage[index]), knockback)
+            hit_t[i] = -1  # 标记为已命中
+
+        # 未命中的投射物前进
+        t = np.clip(hit_t, 0, 1)
+        self.x[ids] += self.vx[ids] * t
+        self.y[ids] += self.vy[ids] * t
+        self.life[ids] -= 1
+
+        world_w, world_h = self.world.get_world_size()
+        gone = (hit_t <= 1) | (self.life[ids] <= 0) | \
+               (self.x[ids] < 0) | (self.x[ids] >= world_w) | (self.y[ids] >= world_h)
+        self.release(ids[gone])
+        return len(self)
+
+    def draw(self, screen, camera_x, camera_y):
+        """箭画成沿速度方向的短线，法术画成小圆"""
+        ids = np.flatnonzero(self.active)
+        for index in ids.tolist():
+            x = self.x[index] - camera_x
+            y = self.y[index] - camera_y
+            color = self.COLORS[int(self.kind[index])]
+            if self.kind[index] == self.ARROW:
+                speed = math.hypot(self.vx[index], self.vy[index]) or 1
+                tail = (x - self.vx[index] / speed * 16, y - self.vy[index] / speed * 16)
+                pygame.draw.line(screen, color, tail, (x, y), 3)
+            else:
+                pygame.draw.circle(screen, color, (x, y), 6)
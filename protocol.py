@@ -0,0 +1,224 @@
+import struct
+import zlib
+import numpy as np
+from world import World
+
+# 多人游戏的二进制消息协议
+#
+# 每条消息是一帧：4 字节长度（小端，不含自身）+ 1 字节消息类型 + 内容。
+# 坐标、编号都用定长的小端整数，区块数据用 zlib 压缩。
+# 实体快照相对客户端最后确认的快照做差分：只发送位置变化了的实体
+# （位置量化到整像素，变化小时用 int16 的差值）和消失的实体。
+
+HELLO = 1  # 客户端 -> 服务器：玩家名字（UTF-8）
+WELCOME = 2  # 服务器 -> 客户端：玩家编号、世界大小、出生点
+REQUEST_CHUNKS = 3  # 客户端 -> 服务器：想要的区块列表
+CHUNK = 4  # 服务器 -> 客户端：一个区块的方块数组
+INPUT = 5  # 客户端 -> 服务器：输入序号、按住的动作位掩码
+ACTION = 6  # 客户端 -> 服务器：一个操作（破坏方块等）
+BLOCKS = 7  # 服务器 -> 客户端：一个区块里的一批方块变化
+SNAPSHOT = 8  # 服务器 -> 客户端：视野内实体的差分快照
+ACK = 9  # 客户端 -> 服务器：已经应用的快照帧号
+VIEW = 10  # 客户端 -> 服务器：视野（屏幕）大小
+STATE = 11  # 服务器 -> 客户端：已处理的最后一个输入序号和玩家自己的权威状态
+
+HEADER = struct.Struct('<IB')
+WELCOME_FORMAT = struct.Struct('<HIIHii')  # 玩家编号, 宽, 高, 格子大小, 出生点 x, y
+CHUNK_KEY = struct.Struct('<hh')
+CHUNK_HEADER = struct.Struct('<hhBB')  # 区块 x, y, 宽, 高
+INPUT_FORMAT = struct.Struct('<IB')  # 输入序号, 按住的动作
+ACTION_FORMAT = struct.Struct('<Bii')  # 操作, x, y
+COUNT = struct.Struct('<H')
+BLOCKS_HEADER = struct.Struct('<hhH')  # 区块 x, y, 变化数；每个变化是 u16 区块内下标 + u8 方块类型
+SNAPSHOT_HEADER = struct.Struct('<IIHH')  # 帧号, 基准帧号（0 表示完整快照）, 变化数, 消失数
+TICK = struct.Struct('<I')
+VIEW_FORMAT = struct.Struct('<HH')
+STATE_FORMAT = struct.Struct('<IIiidBB')  # 输入序号, 帧号, x, y, 垂直速度, 剩余跳跃次数, 标志位
+STATE_ON_GROUND = 1
+STATE_JUMP_PRESSED = 2
+STATE_FACING_RIGHT = 4
+
+# 一条消息（不含长度）最大的字节数，超过时认为对方出错或恶意，断开连接。
+# 最大的正常消息是有 65535 个实体的完整快照（约 1 MB）
+MAX_MESSAGE = 4 * 1024 * 1024
+
+# 快照里的实体种类：玩家，以及 EntityManager 的种类 + 1
+PLAYER_KIND = 0
+# 玩家和 EntityManager 的实体共用一个编号空间，玩家编号加上这个标志位
+PLAYER_FLAG = 0x80000000
+
+# 操作名称 <-> 编号
+ACTION_CODES = {'break': 1}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+CHUNK_SIZE = World.CHUNK_SIZE
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def unpack(fmt, payload):
+    """按固定长度的格式解析整条消息的内容，长度不对时抛出 ProtocolError"""
+    if len(payload) != fmt.size:
+        raise ProtocolError(f"消息长度不对: {len(payload)} 字节，应为 {fmt.size} 字节")
+    return fmt.unpack(payload)
+
+
+def frame(kind, payload=b''):
+    return HEADER.pack(len(payload) + 1, kind) + payload
+
+
+async def read_message(reader):
+    """从 asyncio.StreamReader 读一条消息，返回 (类型, 内容)"""
+    header = await reader.readexactly(HEADER.size)
+    length, kind = HEADER.unpack(header)
+    if length == 0:
+        raise ProtocolError("消息长度为 0")
+    if length > MAX_MESSAGE:
+        raise ProtocolError(f"消息太长: {length} 字节")
+    return kind, await reader.readexactly(length - 1)
+
+
+def hello(name):
+    return frame(HELLO, name.encode('utf-8'))
+
+
+def welcome(player_id, width, height, grid_size, x, y):
+    return frame(WELCOME, WELCOME_FORMAT.pack(player_id, width, height, grid_size, x, y))
+
+
+def request_chunks(keys):
+    return frame(REQUEST_CHUNKS, COUNT.pack(len(keys)) + b''.join(CHUNK_KEY.pack(*key) for key in keys))
+
+
+def parse_chunk_keys(payload):
+    count, = unpack(COUNT, payload[:COUNT.size])
+    if len(payload) != COUNT.size + count * CHUNK_KEY.size:
+        raise ProtocolError(f"区块请求的长度与数量 {count} 不符")
+    return [CHUNK_KEY.unpack_from(payload, COUNT.size + i * CHUNK_KEY.size) for i in range(count)]
+
+
+def chunk(chunk_x, chunk_y, blocks):
+    """blocks 是区块的 uint8 方块数组"""
+    height, width = blocks.shape
+    return frame(CHUNK, CHUNK_HEADER.pack(chunk_x, chunk_y, width, height) +
+                 zlib.compress(np.ascontiguousarray(blocks, dtype=np.uint8).tobytes(), 1))
+
+
+def parse_chunk(payload):
+    """返回 (区块x, 区块y, 方块数组)"""
+    chunk_x, chunk_y, width, height = CHUNK_HEADER.unpack_from(payload)
+    blocks = np.frombuffer(zlib.decompress(payload[CHUNK_HEADER.size:]), dtype=np.uint8)
+    return chunk_x, chunk_y, blocks.reshape(height, width)
+
+
+def input_message(sequence, mask):
+    return frame(INPUT, INPUT_FORMAT.pack(sequence, mask))
+
+
+def action(name, x, y):
+    return frame(ACTION, ACTION_FORMAT.pack(ACTION_CODES[name], x, y))
+
+
+def parse_action(payload):
+    code, x, y = unpack(ACTION_FORMAT, payload)
+    if code not in ACTION_NAMES:
+        raise ProtocolError(f"未知的操作: {code}")
+    return ACTION_NAMES[code], x, y
+
+
+def blocks(chunk_x, chunk_y, changes):
+    """一个区块里的一批方块变化，changes 是 [(x, y, 方块类型), ...]（世界方块坐标）"""
+    size = CHUNK_SIZE
+    data = np.array(changes, dtype=np.int64).reshape(-1, 3)
+    index = ((data[:, 1] - chunk_y * size) * size + data[:, 0] - chunk_x * size).astype('<u2')
+    record = np.empty(len(data), dtype=[('index', '<u2'), ('type', 'u1')])
+    record['index'] = index
+    record['type'] = data[:, 2]
+    return frame(BLOCKS, BLOCKS_HEADER.pack(chunk_x, chunk_y, len(data)) + record.tobytes())
+
+
+def parse_blocks(payload):
+    """返回 [(x, y, 方块类型), ...]（世界方块坐标）"""
+    chunk_x, chunk_y, count = BLOCKS_HEADER.unpack_from(payload)
+    record = np.frombuffer(payload, dtype=[('index', '<u2'), ('type', 'u1')],
+                           count=count, offset=BLOCKS_HEADER.size)
+    size = CHUNK_SIZE
+    xs = (record['index'] % size + chunk_x * size).tolist()
+    ys = (record['index'] // size + chunk_y * size).tolist()
+    return list(zip(xs, ys, record['type'].tolist()))
+
+
+def snapshot(tick, base_tick, current, base):
+    """实体快照，current 和 base 是 {编号: (种类, x, y)}（x、y 已量化为整数），
+    只发送相对 base 新出现或移动了的实体，以及 base 里有、current 里没有的实体"""
+    changed = [(key, value) for key, value in current.items() if base.get(key) != value]
+    removed = [key for key in base if key not in current]
+    ids = np.array([key for key, _ in changed], dtype='<u4')
+    kinds = np.array([value[0] for _, value in changed], dtype='u1')
+    position = np.array([value[1:] for _, value in changed], dtype=np.int64).reshape(-1, 2)
+    old = np.array([base[key][1:] if key in base else (0, 0) for key, _ in changed],
+                   dtype=np.int64).reshape(-1, 2)
+    delta = position - old
+    in_base = np.array([key in base for key, _ in changed], dtype=bool)
+    small = in_base & (np.abs(delta) < 32768).all(axis=1)
+    return frame(SNAPSHOT, b''.join([
+        SNAPSHOT_HEADER.pack(tick, base_tick, len(changed), len(removed)),
+        ids.tobytes(), kinds.tobytes(), np.packbits(small).tobytes(),
+        delta[small].astype('<i2').tobytes(), position[~small].astype('<i4').tobytes(),
+        np.array(removed, dtype='<u4').tobytes()]))
+
+
+def parse_snapshot(payload, base):
+    """用基准快照 base 还原完整的快照，返回 (帧号, 基准帧号, {编号: (种类, x, y)})"""
+    tick, base_tick, count, removed_count = SNAPSHOT_HEADER.unpack_from(payload)
+    offset = SNAPSHOT_HEADER.size
+    ids = np.frombuffer(payload, dtype='<u4', count=count, offset=offset)
+    offset += 4 * count
+    kinds = np.frombuffer(payload, dtype='u1', count=count, offset=offset)
+    offset += count
+    mask_bytes = (count + 7) // 8
+    small = np.unpackbits(np.frombuffer(payload, dtype='u1', count=mask_bytes, offset=offset),
+                          count=count).astype(bool)
+    offset += mask_bytes
+    small_count = int(small.sum())
+    delta = np.frombuffer(payload, dtype='<i2', count=2 * small_count, offset=offset).reshape(-1, 2)
+    offset += 4 * small_count
+    position = np.frombuffer(payload, dtype='<i4', count=2 * (count - small_count), offset=offset).reshape(-1, 2)
+    offset += 8 * (count - small_count)
+    removed = np.frombuffer(payload, dtype='<u4', count=removed_count, offset=offset)
+
+    current = dict(base)
+    for key in removed.tolist():
+        current.pop(key, None)
+    small_ids = ids[small].tolist()
+    for key, kind, (dx, dy) in zip(small_ids, kinds[small].tolist(), delta.tolist()):
+        _, x, y = base[key]
+        current[key] = (kind, x + dx, y + dy)
+    for key, kind, (x, y) in zip(ids[~small].tolist(), kinds[~small].tolist(), position.tolist()):
+        current[key] = (kind, x, y)
+    return tick, base_tick, current
+
+
+def state(sequence, tick, player_state):
+    """player_state 是 Player.get_state() 的返回值"""
+    x, y, dy, jumps_left, on_ground, jump_pressed, facing_right = player_state
+    flags = ((STATE_ON_GROUND if on_ground else 0) | (STATE_JUMP_PRESSED if jump_pressed else 0) |
+             (STATE_FACING_RIGHT if facing_right else 0))
+    return frame(STATE, STATE_FORMAT.pack(sequence, tick, x, y, dy, jumps_left, flags))
+
+
+def parse_state(payload):
+    """返回 (输入序号, 帧号, 玩家状态)"""
+    sequence, tick, x, y, dy, jumps_left, flags = STATE_FORMAT.unpack(payload)
+    return sequence, tick, (x, y, dy, jumps_left, bool(flags & STATE_ON_GROUND),
+                            bool(flags & STATE_JUMP_PRESSED), bool(flags & STATE_FACING_RIGHT))
+
+
+def ack(tick):
+    return frame(ACK, TICK.pack(tick))
+
+
+def view(width, height):
+    return frame(VIEW, VIEW_FORMAT.pack(width, height))
@@ -0,0 +1,120 @@
+import numpy as np
+from world import World
+
+
+class RegionScheduler:
+    """按模拟距离划分的区域调度器
+
+    世界被分成 REGION_CHUNKS×REGION_CHUNKS 个区块大小的区域，按与中心点
+    （玩家所在位置）的距离分成三类：
+    - ACTIVE：每帧更新
+    - LAZY：每 LAZY_INTERVAL 帧更新一次
+    - FROZEN：不更新
+    子系统用 register 注册每个区域的更新回调 callback(bounds, tick, elapsed)，
+    bounds 是区域的方块坐标范围 (x0, y0, x1, y1)，elapsed 是距离这个区域
+    上次更新经过的帧数（最多 MAX_CATCH_UP），冻结后恢复的区域据此补算。
+    结构数组形式的子系统可以用 due_at 批量判断实体所在的区域本帧是否更新，
+    用 elapsed_at 取得本帧要补算的帧数。
+    多进程分片时用 restrict 只更新本进程负责的那几列区域。
+    """
+    ACTIVE = 0
+    LAZY = 1
+    FROZEN = 2
+
+    REGION_CHUNKS = 4
+    ACTIVE_RADIUS = 1  # 以区域为单位的距离
+    LAZY_RADIUS = 3
+    LAZY_INTERVAL = 4
+    MAX_CATCH_UP = 3600  # 最多补算的帧数
+
+    def __init__(self, world):
+        self.world = world
+        self.region_size = World.CHUNK_SIZE * self.REGION_CHUNKS
+        self.regions_x = -(-world.width // self.region_size)
+        self.regions_y = -(-world.height // self.region_size)
+        shape = (self.regions_y, self.regions_x)
+        self.state = np.full(shape, self.FROZEN, dtype=np.uint8)
+        self.last_tick = np.zeros(shape, dtype=np.int64)
+        self.due = np.zeros(shape, dtype=bool)  # 本帧更新的区域
+        self.elapsed = np.zeros(shape, dtype=np.int64)  # 本帧更新的区域要补算的帧数，不更新的为 0
+        # 降频区域错开更新的帧，补算的开销分摊到每一帧
+        self.phase = (np.arange(self.regions_y)[:, None] + np.arange(self.regions_x)[None, :]) % self.LAZY_INTERVAL
+        self.distance = np.zeros(shape, dtype=np.int32)
+        self.centers = None
+        self.columns = None  # 只更新这个范围内的区域列 (起始, 结束)，None 表示不限制
+        self.tick = 0
+        self.callbacks = []
+
+    def register(self, callback):
+        """注册区域更新回调，回调返回真值表示有变化"""
+        self.callbacks.append(callback)
+
+    def unregister(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def restrict(self, x0, x1):
+        """只更新方块坐标 x0~x1 列内的区域（x0、x1 应当是区域边长的倍数）"""
+        self.columns = (x0 // self.region_size, -(-x1 // self.region_size))
+        self.centers = None
+
+    def set_center(self, x, y):
+        """根据中心点（方块坐标）重新划分区域"""
+        self.set_centers([(x, y)])
+
+    def set_centers(self, points):
+        """有多个中心点（例如多个玩家）时，按离最近的中心点的距离划分区域"""
+        centers = tuple(sorted(set(
+            (min(max(int(x) // self.region_size, 0), self.regions_x - 1),
+             min(max(int(y) // self.region_size, 0), self.regions_y - 1))
+            for x, y in points)))
+        if centers == self.centers:
+            return
+        self.centers = centers
+        self.distance = np.full((self.regions_y, self.regions_x), np.iinfo(np.int32).max, dtype=np.int32)
+        for center_x, center_y in centers:
+            xs = np.abs(np.arange(self.regions_x) - center_x)
+            ys = np.abs(np.arange(self.regions_y) - center_y)
+            np.minimum(self.distance, np.maximum(xs[None, :], ys[:, None]), out=self.distance)
+        self.state = np.where(self.distance <= self.ACTIVE_RADIUS, self.ACTIVE,
+                              np.where(self.distance <= self.LAZY_RADIUS, self.LAZY, self.FROZEN)).astype(np.uint8)
+        if self.columns is not None:
+            start, end = self.columns
+            self.state[:, :start] = self.FROZEN
+            self.state[:, end:] = self.FROZEN
+
+    def bounds(self, region_x, region_y):
+        """区域的方块坐标范围"""
+        size = self.region_size
+        x0, y0 = region_x * size, region_y * size
+        return x0, y0, min(x0 + size, self.world.width), min(y0 + size, self.world.height)
+
+    def update(self):
+        """推进一帧：由近到远调用本帧要更新的区域的回调，返回是否有变化"""
+        self.tick += 1
+        since = self.tick - self.last_tick
+        self.due = (self.state == self.ACTIVE) | ((self.state == self.LAZY) & ((self.tick + self.phase) % self.LAZY_INTERVAL == 0))
+        self.elapsed = np.where(self.due, np.minimum(since, self.MAX_CATCH_UP), 0)
+        rows, cols = np.nonzero(self.due)
+        order = np.argsort(self.distance[rows, cols], kind='stable')
+        changed = False
+        for region_y, region_x in zip(rows[order].tolist(), cols[order].tolist()):
+            bounds = self.bounds(region_x, region_y)
+            elapsed = int(self.elapsed[region_y, region_x])
+            for callback in self.callbacks:
+                if callback(bounds, self.tick, elapsed):
+                    changed = True
+        self.last_tick[self.due] = self.tick
+        return changed
+
+    def due_at(self, xs, ys):
+        """批量判断方块坐标 (xs, ys) 所在的区域本帧是否更新"""
+        region_x = np.clip(np.asarray(xs, dtype=np.int64) // self.region_size, 0, self.regions_x - 1)
+        region_y = np.clip(np.asarray(ys, dtype=np.int64) // self.region_size, 0, self.regions_y - 1)
+        return self.due[region_y, region_x]
+
+    def elapsed_at(self, xs, ys):
+        """批量取得方块坐标 (xs, ys) 所在的区域本帧要补算的帧数，本帧不更新的为 0"""
+        region_x = np.clip(np.asarray(xs, dtype=np.int64) // self.region_size, 0, self.regions_x - 1)
+        region_y = np.clip(np.asarray(ys, dtype=np.int64) // self.region_size, 0, self.regions_y - 1)
+        return self.elapsed[region_y, region_x]
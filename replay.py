@@ -0,0 +1,166 @@
+import gzip
+import hashlib
+import json
+import time
+from simulation import Simulation, TickInput, held_to_mask, mask_to_held, timing_stats
+
+REPLAY_VERSION = 1
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def state_digest(simulation):
+    """模拟状态的校验值：方块数组、玩家位置和帧数"""
+    digest = hashlib.sha1(simulation.world.grid.tobytes())
+    rect = simulation.player.rect
+    digest.update(json.dumps([simulation.tick_count, rect.x, rect.y, simulation.player.dy]).encode())
+    return digest.hexdigest()
+
+
+class ReplayRecorder:
+    """记录每一帧的输入
+
+    按住的动作只在变化时记录一次 (帧号, 位掩码)，操作按 (帧号, 操作...) 记录，
+    连同地图文件、角色数据和随机种子一起用 gzip 压缩的 JSON 保存。
+    """
+    def __init__(self, world_file, player_data, seed):
+        self.world_file = world_file
+        self.world_digest = file_digest(world_file)
+        self.player_data = player_data
+        self.seed = seed
+        self.tick = 0
+        self.held = []  # [帧号, 位掩码]
+        self.actions = []  # [帧号, 操作...]
+        self.last_mask = None
+
+    def record(self, tick_input):
+        mask = held_to_mask(tick_input.held)
+        if mask != self.last_mask:
+            self.held.append([self.tick, mask])
+            self.last_mask = mask
+        for action in tick_input.actions:
+            self.actions.append([self.tick, *action])
+        self.tick += 1
+
+    def save(self, path, simulation=None):
+        """保存录像；给出 simulation 时同时保存最终状态的校验值"""
+        data = {
+            'version': REPLAY_VERSION,
+            'world_file': self.world_file,
+            'world_digest': self.world_digest,
+            'player': self.player_data,
+            'seed': self.seed,
+            'ticks': self.tick,
+            'held': self.held,
+            'actions': self.actions,
+            'final_digest': state_digest(simulation) if simulation is not None else None
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class ReplayInput:
+    """把录像作为输入源逐帧回放"""
+    def __init__(self, data):
+        self.data = data
+        self.held_index = 0
+        self.action_index = 0
+        self.mask = 0
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError(f"不支持的录像版本: {data.get('version')}")
+        return cls(data)
+
+    def next_input(self, tick):
+        if tick >= self.data['ticks']:
+            return None
+        held, actions = self.data['held'], self.data['actions']
+        while self.held_index < len(held) and held[self.held_index][0] <= tick:
+            self.mask = held[self.held_index][1]
+            self.held_index += 1
+        tick_actions = []
+        while self.action_index < len(actions) and actions[self.action_index][0] == tick:
+            tick_actions.append(tuple(actions[self.action_index][1:]))
+            self.action_index += 1
+        return TickInput(mask_to_held(self.mask), tick_actions)
+
+    def create_simulation(self, **kwargs):
+        """用录像记录的地图文件、角色数据和随机种子创建模拟"""
+        data = self.data
+        if file_digest(data['world_file']) != data['world_digest']:
+            print(f"警告: 地图文件 {data['world_file']} 与录制时不同，回放结果可能不一致")
+        with open(data['world_file'], 'r', encoding='utf-8') as f:
+            world_data = json.load(f)
+        return Simulation(world_data, data['player'], seed=data['seed'], **kwargs)
+
+    def check(self, simulation):
+        """回放结束后与录像中的最终状态对比，没有记录时返回 None"""
+        expected = self.data.get('final_digest')
+        if expected is None:
+            return None
+        return state_digest(simulation) == expected
+
+
+def replay_headless(path):
+    """无窗口回放，返回 (耗时统计, 最终状态是否一致)"""
+    source = ReplayInput.load(path)
+    simulation = source.create_simulation()
+    stats = simulation.run(source)
+    return stats, source.check(simulation)
+
+
+def replay_windowed(path):
+    """在窗口中回放，每帧推进模拟并绘制，不限帧率，返回 (帧耗时统计, 最终状态是否一致)"""
+    import pygame
+    from main import Game
+
+    game = Game()
+    source = ReplayInput.load(path)
+    simulation = source.create_simulation(inventory_pos=(10, game.screen_height - 50))
+    game.start_simulation(simulation)
+    seconds = []
+    tick = 0
+    while True:
+        tick_input = source.next_input(tick)
+        if tick_input is None:
+            break
+        start = time.perf_counter()
+        pygame.event.pump()
+        simulation.tick(tick_input)
+        game.update_camera()
+        game.draw_game()
+        seconds.append(time.perf_counter() - start)
+        tick += 1
+    return timing_stats(seconds), source.check(simulation)
+
+
+def main():
+    """回放录像：python replay.py 录像文件 [--window]"""
+    import argparse
+    import os
+    import pygame
+    parser = argparse.ArgumentParser(description="回放录像并报告帧耗时")
+    parser.add_argument("replay_file")
+    parser.add_argument("--window", action="store_true", help="在窗口中回放（同时统计绘制耗时）")
+    args = parser.parse_args()
+
+    if args.window:
+        stats, same = replay_windowed(args.replay_file)
+    else:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.init()
+        stats, same = replay_headless(args.replay_file)
+    for key, value in stats.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    if same is not None:
+        print(f"最终状态与录制时{'一致' if same else '不一致!'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import asyncio
+import time
+from collections import deque, defaultdict
+from world import World
+from player import Player
+from inventory import Inventory
+from simulation import Simulation, MOVE_BINDINGS, DEFAULT_PLAYER, mask_to_held, timing_stats
+from interest import InterestManager
+import protocol
+
+
+class ClientConnection:
+    """服务器上的一个客户端连接
+
+    发给客户端的消息先放进有上限的发送队列，由单独的任务写入套接字并等待
+    drain。队列满时，可以丢弃的消息（实体快照）直接丢掉，不能丢弃的消息
+    说明客户端跟不上，断开连接。
+    """
+    HISTORY = 64  # 最多保留的已发送快照数
+    MAX_INPUTS = 32  # 最多积压的输入数，超过时丢弃最旧的
+
+    def __init__(self, player_id, player, writer, queue_size):
+        self.player_id = player_id
+        self.player = player
+        self.inventory = Inventory(0, 0)  # 服务器上的背包，拾取的掉落物放在这里
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.chunk_requests = deque()  # 等待发送的区块
+        self.queued = set()  # chunk_requests 里的区块
+        self.chunks = set()  # 已经发给客户端、仍在同步的区块
+        self.view_size = (1280, 720)  # 客户端的屏幕大小
+        self.snapshots = {}  # 帧号 -> 发出的快照 {编号: (种类, x, y)}
+        self.acked = 0  # 客户端确认过的最新快照帧号
+        self.chunk_range = None  # 上次计算兴趣时视野覆盖的区块范围
+        self.keep_range = None  # 继续同步的区块范围
+        self.inputs = deque(maxlen=self.MAX_INPUTS)  # 收到、还没处理的输入 (序号, 按住的动作)
+        self.input_budget = 0  # 还能处理的输入数，每帧增加 1
+        self.sequence = 0  # 最后处理的输入序号
+        self.actions = []
+        self.bytes_sent = 0
+        self.dropped = 0  # 因为队列满而丢弃的消息数
+        self.closed = False
+        self.sender = asyncio.ensure_future(self.send_loop())
+
+    def send(self, data, droppable=False):
+        """放进发送队列，返回是否放入"""
+        if self.closed or not data:
+            return False
+        if self.queue.full():
+            if droppable:
+                self.dropped += 1
+                return False
+            self.close()
+            return False
+        self.queue.put_nowait(data)
+        return True
+
+    async def send_loop(self):
+        """把队列里积攒的消息合并成一次写入"""
+        try:
+            while True:
+                data = [await self.queue.get()]
+                while not self.queue.empty():
+                    data.append(self.queue.get_nowait())
+                payload = b''.join(data)
+                self.writer.write(payload)
+                self.bytes_sent += len(payload)
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+    def acknowledge(self, tick):
+        """客户端确认了快照，更早的快照不会再被用作基准"""
+        if tick in self.snapshots and tick > self.acked:
+            self.acked = tick
+            for old in [old for old in self.snapshots if old < tick]:
+                del self.snapshots[old]
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.sender.cancel()
+
+
+class GameServer:
+    """专用服务器
+
+    以无窗口的模拟核心为权威世界，每帧应用所有客户端最新的输入，推进世界，
+    然后通过兴趣管理只给每个客户端发送视野内的东西：推送视野内压缩的区块
+    （每帧每个客户端有上限，发送队列太满时暂停），按区块批量发送方块变化，
+    定期发送相对客户端最后确认的快照做了差分的实体快照。
+    """
+    TICK_RATE = 60
+    SEND_QUEUE = 256  # 每个连接的发送队列最多积攒的消息数
+    CHUNKS_PER_TICK = 4  # 每帧给每个客户端最多发送的区块数
+    SNAPSHOT_INTERVAL = 3  # 每隔几帧发送一次实体快照
+    INPUT_BURST = 3  # 输入额度最多积攒到几个，网络抖动后可以在一帧里补上几个输入
+    MAX_VIEW = (3840, 2160)  # 客户端视野的上限，更大的视野会让兴趣管理和快照的开销失控
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.world = simulation.world
+        self.clients = {}  # 玩家编号 -> ClientConnection
+        self.next_id = 1
+        self.changes = []  # 本帧的方块变化 (x, y, 新类型)
+        self.tick_seconds = []
+        self.server = None
+        self.handlers = set()  # 处理各个连接的任务
+        self.interest = InterestManager(self.world, simulation.entities)
+        self.spawn_point = simulation.spawn_point  # 新玩家的出生点，返回像素坐标 (x, y)
+        self.world.add_listener(self)
+
+    def on_block_changed(self, x, y, old, new):
+        self.changes.append((x, y, new))
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        self.changes.extend(zip(xs.tolist(), ys.tolist(), new.tolist()))
+
+    async def start(self, host='127.0.0.1', port=0):
+        """开始监听，返回实际的端口（port 为 0 时由系统分配）"""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+        for handler in list(self.handlers):
+            handler.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        handler = asyncio.current_task()
+        self.handlers.add(handler)
+        try:
+            await self.serve_client(reader, writer)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.handlers.discard(handler)
+
+    async def serve_client(self, reader, writer):
+        try:
+            kind, payload = await protocol.read_message(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, protocol.ProtocolError):
+            writer.close()
+            return
+        if kind != protocol.HELLO:
+            writer.close()
+            return
+        player_id = self.next_id
+        self.next_id += 1
+        data = dict(DEFAULT_PLAYER, name=payload.decode('utf-8', 'replace') or DEFAULT_PLAYER['name'])
+        player = Player(*self.spawn_point(), data)
+        client = ClientConnection(player_id, player, writer, self.SEND_QUEUE)
+        self.clients[player_id] = client
+        client.send(protocol.welcome(player_id, self.world.width, self.world.height, self.world.grid_size,
+                                     player.rect.x, player.rect.y))
+        try:
+            while not client.closed:
+                kind, payload = await protocol.read_message(reader)
+                if kind == protocol.INPUT:
+                    client.inputs.append(protocol.unpack(protocol.INPUT_FORMAT, payload))
+                elif kind == protocol.ACTION:
+                    client.actions.append(protocol.parse_action(payload))
+                elif kind == protocol.ACK:
+                    client.acknowledge(protocol.unpack(protocol.TICK, payload)[0])
+                elif kind == protocol.VIEW:
+                    width, height = protocol.unpack(protocol.VIEW_FORMAT, payload)
+                    client.view_size = (min(width, self.MAX_VIEW[0]), min(height, self.MAX_VIEW[1]))
+                elif kind == protocol.REQUEST_CHUNKS:
+                    self.queue_chunks(client, protocol.parse_chunk_keys(payload))
+        except (asyncio.IncompleteReadError, ConnectionError, protocol.ProtocolError):
+            pass
+        finally:
+            client.close()
+            del self.clients[player_id]
+
+    def apply_inputs(self, client):
+        """处理客户端的操作和输入（操作按服务器上的玩家位置检查距离）
+
+        每个输入让玩家移动一帧，与客户端预测时完全一样；没有收到输入的帧玩家
+        不动。每帧只增加一个输入的额度（最多积攒 INPUT_BURST 个），网络抖动时
+        积攒的输入在之后的帧里补上，但平均每帧最多处理一个输入，客户端多发
+        输入也不能跑得更快。
+        """
+        simulation = self.simulation
+        grid_size = self.world.grid_size
+        for name, x, y in client.actions:
+            # 与本地游戏一样，只能破坏从玩家中心够得到、中间没有遮挡的方块
+            target = ((x + 0.5) * grid_size, (y + 0.5) * grid_size)
+            if name == 'break' and simulation.pick_tile(*target, player=client.player) == (x, y):
+                simulation.break_block(x, y)
+        client.actions.clear()
+        client.input_budget = min(client.input_budget + 1, self.INPUT_BURST)
+        while client.inputs and client.input_budget >= 1:
+            client.input_budget -= 1
+            client.sequence, mask = client.inputs.popleft()
+            keys = defaultdict(bool, dict.fromkeys(mask_to_held(mask), True))
+            client.player.update(self.world, MOVE_BINDINGS, keys)
+
+    def queue_chunks(self, client, keys):
+        for key in keys:
+            if key not in client.chunks and key not in client.queued:
+                client.queued.add(key)
+                client.chunk_requests.append(key)
+
+    def stream_chunks(self, client):
+        """发送排队的区块，发送队列积压过半时留到之后的帧"""
+        size = World.CHUNK_SIZE
+        sent = 0
+        while (client.chunk_requests and sent < self.CHUNKS_PER_TICK and
+               client.queue.qsize() < self.SEND_QUEUE // 2):
+            chunk_x, chunk_y = client.chunk_requests.popleft()
+            client.queued.discard((chunk_x, chunk_y))
+            if (chunk_x, chunk_y) in client.chunks:
+                continue
+            if client.keep_range is not None:
+                cx0, cy0, cx1, cy1 = client.keep_range
+                if not (cx0 <= chunk_x < cx1 and cy0 <= chunk_y < cy1):
+                    continue  # 排队期间已经离开视野
+            x0, y0 = chunk_x * size, chunk_y * size
+            if not (0 <= x0 < self.world.width and 0 <= y0 < self.world.height):
+                continue
+            blocks = self.world.grid[y0:y0 + size, x0:x0 + size]
+            if client.send(protocol.chunk(chunk_x, chunk_y, blocks)):
+                client.chunks.add((chunk_x, chunk_y))
+                sent += 1
+
+    def update_interest(self, client, rect):
+        """推送进入视野的区块，停止同步离开视野较远的区块"""
+        chunk_range = self.interest.chunk_range(rect)
+        if chunk_range == client.chunk_range:
+            return
+        client.chunk_range = chunk_range
+        self.queue_chunks(client, self.interest.chunks_in(rect))
+        cx0, cy0, cx1, cy1 = client.keep_range = self.interest.chunk_range(rect, self.interest.KEEP_CHUNKS)
+        far = [key for key in client.chunks if not (cx0 <= key[0] < cx1 and cy0 <= key[1] < cy1)]
+        client.chunks.difference_update(far)
+
+    def flush_changes(self, client, grouped):
+        """把本帧的方块变化发给客户端（只发它正在同步的区块里的）"""
+        chunks = client.chunks
+        if len(grouped) < len(chunks):
+            keys = [key for key in grouped if key in chunks]
+        else:
+            keys = [key for key in chunks if key in grouped]
+        if keys:
+            client.send(b''.join(grouped[key] for key in keys))
+
+    def send_snapshot(self, client, rect, tick):
+        """发送视野内实体相对客户端最后确认的快照的差分"""
+        current = self.interest.visible(rect)
+        base_tick = client.acked
+        base = client.snapshots.get(base_tick)
+        if base is None:
+            base_tick, base = 0, {}
+        if client.send(protocol.snapshot(tick, base_tick, current, base), droppable=True):
+            client.snapshots[tick] = current
+            if len(client.snapshots) > client.HISTORY:
+                del client.snapshots[min(client.snapshots)]
+
+    def tick(self):
+        """推进一帧"""
+        simulation = self.simulation
+        simulation.tick_count += 1
+        clients = list(self.clients.values())
+        for client in clients:
+            self.apply_inputs(client)
+        grid_size = self.world.grid_size
+        centers = [(client.player.rect.centerx / grid_size, client.player.rect.centery / grid_size)
+                   for client in clients]
+        simulation.step_world(centers)
+        simulation.pickup([(client.player, client.inventory) for client in clients])
+
+        grouped = self.interest.group_changes(self.changes)
+        self.changes.clear()
+        snapshot_tick = simulation.tick_count % self.SNAPSHOT_INTERVAL == 0
+        if snapshot_tick and clients:
+            self.interest.index_players([(client.player_id, client.player) for client in clients],
+                                        max(max(client.view_size) for client in clients))
+        for client in clients:
+            rect = self.interest.view_rect(client.player, client.view_size)
+            self.update_interest(client, rect)
+            if grouped:
+                self.flush_changes(client, grouped)
+            self.stream_chunks(client)
+            if snapshot_tick:
+                client.send(protocol.state(client.sequence, simulation.tick_count, client.player.get_state()),
+                            droppable=True)
+                self.send_snapshot(client, rect, simulation.tick_count)
+
+    async def run(self, seconds=None):
+        """按 TICK_RATE 固定帧率运行，seconds 为 None 时一直运行"""
+        interval = 1 / self.TICK_RATE
+        next_tick = time.perf_counter()
+        end = None if seconds is None else next_tick + seconds
+        while end is None or time.perf_counter() < end:
+            start = time.perf_counter()
+            self.tick()
+            self.tick_seconds.append(time.perf_counter() - start)
+            next_tick += interval
+            # 落后太多时不追帧
+            next_tick = max(next_tick, time.perf_counter() - interval)
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    def stats(self):
+        """帧耗时统计和每个客户端发送的字节数"""
+        stats = timing_stats(self.tick_seconds)
+        stats['bytes_sent'] = {player_id: client.bytes_sent for player_id, client in self.clients.items()}
+        return stats
+
+
+def main():
+    """专用服务器：python server.py 地图文件 [--host 地址] [--port 端口] [--seed N] [--shards N]"""
+    import argparse
+    import json
+    import os
+    import pygame
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    parser = argparse.ArgumentParser(description="运行多人游戏专用服务器")
+    parser.add_argument("world_file")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=25600)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--shards", type=int, default=0, help="多进程分片数，0 表示单进程")
+    args = parser.parse_args()
+
+    pygame.init()
+    with open(args.world_file, 'r', encoding='utf-8') as f:
+        world_data = json.load(f)
+    if args.shards:
+        from shards import ShardedSimulation
+        simulation = ShardedSimulation(world_data, args.shards, seed=args.seed)
+    else:
+        simulation = Simulation(world_data, None, seed=args.seed)
+    server = GameServer(simulation)
+
+    async def serve():
+        port = await server.start(args.host, args.port)
+        print(f"服务器已启动: {args.host}:{port}")
+        await server.run()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.shards:
+            simulation.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from world import World
+from entities import EntityManager
+from regions import RegionScheduler
+from liquids import Liquids
+from drops import ItemDrops
+from simulation import Simulation, timing_stats
+
+# 在分片之间移交实体时复制的 EntityManager 字段
+ENTITY_FIELDS = ('kind', 'x', 'y', 'w', 'h', 'vx', 'vy', 'sprite', 'flags', 'hp', 'item', 'stack')
+# 全局实体编号 = 分片编号 << SHARD_SHIFT | 分片内的编号
+SHARD_SHIFT = 24
+
+
+class ShardWorld(World):
+    """方块数组放在共享内存里、只写自己负责的几列的世界
+
+    x0~x1 列以外的方块属于其他分片：set_block 不直接写入，而是记在 outgoing 里
+    由协调器转交给负责的分片。自己写入的变化记在 changes 里，由协调器广播给
+    其他分片，它们用 apply_remote 更新地表高度并通知监听者（共享内存里的方块
+    已经是新的）。x0 == x1 时不负责任何方块（协调器里的世界）。
+    """
+    def __init__(self, width, height, grid_size, grid, x0=0, x1=None):
+        super().__init__(width, height, grid_size)
+        self.set_grid(grid)  # uint8 数组不会被复制，仍然指向共享内存
+        self.x0 = x0
+        self.x1 = width if x1 is None else x1
+        self.changes = []  # 本帧自己写入的变化 (x, y, 旧类型, 新类型)
+        self.outgoing = []  # 要交给其他分片的修改 (x, y, 新类型)
+
+    def set_block(self, x, y, block_type):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        if not self.x0 <= x < self.x1:
+            self.outgoing.append((x, y, block_type))
+            return
+        old = int(self.grid[y, x])
+        if old != block_type:
+            super().set_block(x, y, block_type)
+            self.changes.append((x, y, old, block_type))
+
+    def set_blocks(self, xs, ys, block_types):
+        xs = np.asarray(xs, dtype=np.int64).ravel()
+        ys = np.asarray(ys, dtype=np.int64).ravel()
+        new = np.broadcast_to(np.asarray(block_types, dtype=np.uint8), xs.shape)
+        own = (xs >= self.x0) & (xs < self.x1)
+        foreign = ~own & (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        self.outgoing.extend(zip(xs[foreign].tolist(), ys[foreign].tolist(), new[foreign].tolist()))
+        result = super().set_blocks(xs[own], ys[own], new[own])
+        self.changes.extend(zip(*(values.tolist() for values in result)))
+        return result
+
+    def apply_remote(self, changes):
+        """其他分片写入共享内存的变化"""
+        if not changes:
+            return
+        xs, ys, old, new = (np.array(values, dtype=dtype) for values, dtype in
+                            zip(zip(*changes), (np.int64, np.int64, np.uint8, np.uint8)))
+        self.update_heights(np.unique(xs))
+        self.notify(xs, ys, old, new)
+
+    def take_changes(self):
+        """取出并清空本帧的变化和要转交的修改"""
+        changes, outgoing = self.changes, self.outgoing
+        self.changes, self.outgoing = [], []
+        return changes, outgoing
+
+
+class ShardWorker:
+    """在分片进程里模拟 x0~x1 列的一个 Simulation（没有本地玩家）
+
+    每帧：应用其他分片的方块变化、转交来的修改、流进来的液体和操作，接收
+    移交过来的实体，推进一帧，然后把中心移出 x0~x1 的实体打包移交出去。只有
+    这几列里的区域更新，只在这几列里的玩家附近生成怪物。液量数组 mass 与其他
+    分片共享（见 Liquids.share）。
+    """
+    def __init__(self, index, world, mass, seed=None):
+        self.index = index
+        self.world = world
+        self.simulation = Simulation(None, None, seed=seed, world=world)
+        self.simulation.regions.restrict(world.x0, world.x1)
+        self.simulation.liquids.share(mass, world.x0, world.x1)
+
+    def add_entities(self, records):
+        """接收移交过来的实体"""
+        simulation = self.simulation
+        e = simulation.entities
+        for i in range(len(records['kind'])):
+            kind = int(records['kind'][i])
+            index = e.spawn(kind, records['x'][i], records['y'][i], records['w'][i], records['h'][i],
+                            records['vx'][i], records['vy'][i], int(records['sprite'][i]),
+                            int(records['flags'][i]), int(records['hp'][i]))
+            e.item[index], e.stack[index] = records['item'][i], records['stack'][i]
+            if kind == EntityManager.DROP:  # 掉落物的精灵是各进程按需创建的
+                e.sprite[index] = simulation.drops.sprite_for(int(records['item'][i]))
+            if records['mob'][i] >= 0:
+                simulation.spawner.mobs[index] = int(records['mob'][i])
+
+    def take_leaving(self):
+        """打包并移除中心已经不在 x0~x1 列里的实体"""
+        simulation = self.simulation
+        e = simulation.entities
+        ids = e.alive_ids()
+        column = (e.x[ids] + e.w[ids] / 2) // self.world.grid_size
+        ids = ids[(column < self.world.x0) | (column >= self.world.x1)]
+        if len(ids) == 0:
+            return None
+        records = {field: getattr(e, field)[ids].copy() for field in ENTITY_FIELDS}
+        records['mob'] = np.array([simulation.spawner.mobs.pop(index, -1) for index in ids.tolist()],
+                                  dtype=np.int16)
+        for index in ids.tolist():
+            e.despawn(index)
+        return records
+
+    def tick(self, centers, remote, edits, flows, actions, arrivals, pickups):
+        start = time.perf_counter()
+        simulation = self.simulation
+        world = self.world
+        world.apply_remote(remote)
+        for x, y, block_type in edits:
+            world.set_block(x, y, block_type)
+        simulation.liquids.receive(flows)
+        for action in actions:
+            simulation.apply(action)
+        for records in arrivals:
+            self.add_entities(records)
+        own = [center for center in centers if world.x0 <= center[0] < world.x1]
+        changed = simulation.step_world(centers, spawn_centers=own)
+        # 拾取请求 (请求编号, x, y)，拾取到的物品交给协调器放进玩家的背包
+        picked = [(request, block_type, count) for request, x, y in pickups
+                  for block_type, count in simulation.drops.take(x, y)]
+        leaving = self.take_leaving()
+        changes, outgoing = world.take_changes()
+        outflow, simulation.liquids.outflow = simulation.liquids.outflow, []
+        e = simulation.entities
+        ids = e.alive_ids()
+        view = (ids.astype(np.uint32), e.kind[ids], e.x[ids], e.y[ids], e.w[ids], e.h[ids])
+        return changes, outgoing, outflow, leaving, picked, view, changed, time.perf_counter() - start
+
+
+def run_shard(index, bounds, shape, grid_size, memory_name, seed, inbox, outbox):
+    """分片进程的入口：收到 None 时退出"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    memory = shared_memory.SharedMemory(name=memory_name)
+    height, width = shape
+    grid = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+    mass = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf, offset=grid.nbytes)
+    worker = ShardWorker(index, ShardWorld(width, height, grid_size, grid, *bounds), mass,
+                         seed=None if seed is None else seed + index)
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        outbox.put(worker.tick(*message))
+
+
+class ShardEntities:
+    """协调器汇总的各分片实体，只用于查询（兴趣管理、快照）
+
+    和 EntityManager 一样有 kind/x/y/w/h 数组和 hash.query_aabb，另外 keys 是
+    每个实体的全局编号。实体按 x 排序，矩形查询用二分查找。
+    """
+    def __init__(self):
+        self.hash = self
+        self.rebuild([])
+
+    def rebuild(self, views):
+        """views 是各分片的 (编号, 种类, x, y, w, h)"""
+        if views:
+            keys = np.concatenate([view[0].astype(np.int64) | (shard << SHARD_SHIFT)
+                                   for shard, view in enumerate(views)])
+            kind, x, y, w, h = (np.concatenate(arrays) for arrays in list(zip(*views))[1:])
+        else:
+            keys = np.zeros(0, dtype=np.int64)
+            kind, x, y, w, h = (np.zeros(0, dtype=np.float32) for _ in range(5))
+        order = np.argsort(x, kind='stable')
+        self.keys, self.kind, self.x, self.y, self.w, self.h = (
+            array[order] for array in (keys, kind, x, y, w, h))
+        self.max_width = float(w.max()) if len(w) else 0.0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def query_aabb(self, x0, y0, x1, y1, kind=None):
+        """返回碰撞箱与矩形 [x0, x1) × [y0, y1) 相交的实体（数组下标）"""
+        start, end = np.searchsorted(self.x, [x0 - self.max_width, x1])
+        ids = np.arange(start, end)
+        hit = ((self.x[ids] + self.w[ids] > x0) & (self.y[ids] < y1) & (self.y[ids] + self.h[ids] > y0))
+        if kind is not None:
+            hit &= self.kind[ids] == kind
+        return ids[hit]
+
+
+class ShardError(Exception):
+    """分片的工作进程退出或者长时间没有回应"""
+
+
+class ShardedSimulation:
+    """多进程分片的世界模拟
+
+    世界按列分成几片（分界线对齐到 RegionScheduler 的区域），每片在一个工作
+    进程里由 ShardWorker 模拟，方块数组和液量数组在所有进程共享的内存里。协调器每帧把
+    玩家位置和上一帧的结果发给所有分片，等它们都完成后汇总：
+    - 方块变化广播给其他分片，并通知协调器世界的监听者（例如 GameServer）
+    - 写到别的分片的方块、流过分界线的液量、操作（破坏方块）转交给负责的分片
+    - 中心越过分界线的实体移交给新的分片
+    - 各分片的实体汇总成 entities（ShardEntities）供查询
+    提供 GameServer 用到的 Simulation 接口（world、entities、tick_count、
+    spawn_point、pick_tile、step_world、pickup、break_block），可以直接替换 Simulation。
+    用完后调用 close 结束工作进程并释放共享内存。工作进程退出或者超过
+    SHARD_TIMEOUT 秒没有返回一帧的结果时，step_world 抛出 ShardError。
+    """
+    SHARD_TIMEOUT = 30  # 等一个分片返回一帧结果的最长秒数
+    spawn_point = Simulation.spawn_point
+    pick_tile = Simulation.pick_tile
+    REACH = Simulation.REACH
+
+    def __init__(self, world_data, shards=None, seed=None):
+        grid = np.asarray(world_data['grid'], dtype=np.uint8)
+        height, width = grid.shape
+        grid_size = world_data['grid_size']
+        self.memory = shared_memory.SharedMemory(create=True, size=grid.nbytes * 2)
+        self.grid = np.ndarray(grid.shape, dtype=np.uint8, buffer=self.memory.buf)
+        self.grid[:] = grid
+        # 液量数组紧接在方块数组后面，由各分片的 Liquids 写入
+        self.mass = np.ndarray(grid.shape, dtype=np.uint8, buffer=self.memory.buf, offset=grid.nbytes)
+        self.mass[:] = np.where(np.isin(grid, World.LIQUIDS), Liquids.FULL, 0)
+        self.world = ShardWorld(width, height, grid_size, self.grid, 0, 0)
+        self.entities = ShardEntities()
+        self.tick_count = 0
+
+        # 按区域划分列，每片的区域数尽量相同
+        region_size = World.CHUNK_SIZE * RegionScheduler.REGION_CHUNKS
+        regions = -(-width // region_size)
+        count = max(1, min(shards or os.cpu_count() or 1, regions))
+        self.edges = np.minimum(np.linspace(0, regions, count + 1).round().astype(np.int64) * region_size, width)
+        self.bounds = [(int(x0), int(x1)) for x0, x1 in zip(self.edges[:-1], self.edges[1:])]
+
+        context = multiprocessing.get_context('spawn')
+        self.inboxes = [context.Queue() for _ in self.bounds]
+        self.outboxes = [context.Queue() for _ in self.bounds]
+        self.processes = [context.Process(target=run_shard, daemon=True,
+                                          args=(index, bounds, grid.shape, grid_size, self.memory.name,
+                                                seed, self.inboxes[index], self.outboxes[index]))
+                          for index, bounds in enumerate(self.bounds)]
+        for process in self.processes:
+            process.start()
+
+        # 下一帧要发给各分片的内容
+        self.remote = [[] for _ in self.bounds]
+        self.edits = [[] for _ in self.bounds]
+        self.flows = [[] for _ in self.bounds]
+        self.actions = [[] for _ in self.bounds]
+        self.arrivals = [[] for _ in self.bounds]
+        self.pickups = [[] for _ in self.bounds]
+        self.pickers = []  # 发出的拾取请求对应的 (玩家, 背包)
+        self.tick_seconds = []
+        self.shard_seconds = [[] for _ in self.bounds]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def owner(self, x):
+        """负责方块坐标 x 这一列的分片"""
+        return int(np.clip(np.searchsorted(self.edges, x, side='right') - 1, 0, len(self.bounds) - 1))
+
+    def route_edits(self, edits):
+        for x, y, block_type in edits:
+            self.edits[self.owner(x)].append((x, y, block_type))
+
+    def route_flows(self, flows):
+        for flow in flows:
+            self.flows[self.owner(flow[0])].append(flow)
+
+    def route_entities(self, records):
+        """按实体中心所在的列把打包的实体分给负责的分片"""
+        column = (records['x'] + records['w'] / 2) // self.world.grid_size
+        owners = np.clip(np.searchsorted(self.edges, column, side='right') - 1, 0, len(self.bounds) - 1)
+        for owner in np.unique(owners).tolist():
+            mask = owners == owner
+            self.arrivals[owner].append({field: values[mask] for field, values in records.items()})
+
+    def spawn(self, kind, x, y, w, h, vx=0.0, vy=0.0, sprite=0, flags=0, hp=1):
+        """在负责 (x, y)（像素）的分片里生成一个实体，下一帧生效"""
+        records = dict(kind=kind, x=x, y=y, w=w, h=h, vx=vx, vy=vy, sprite=sprite,
+                       flags=flags | EntityManager.ALIVE, hp=hp, item=0, stack=0, mob=-1)
+        self.route_entities({field: np.array([value]) for field, value in records.items()})
+
+    def break_block(self, tile_x, tile_y):
+        """转交给负责的分片，下一帧生效"""
+        if not World.SOLID[self.world.get_block(tile_x, tile_y)]:
+            return False
+        self.actions[self.owner(tile_x)].append(('break', tile_x, tile_y))
+        return True
+
+    def pickup(self, pickers):
+        """每个玩家拾取附近的掉落物：请求发给拾取范围覆盖的分片，下一帧放进背包"""
+        grid_size = self.world.grid_size
+        for player, inventory in pickers:
+            request = len(self.pickers)
+            self.pickers.append((player, inventory))
+            x, y = player.rect.centerx, player.rect.centery
+            first = self.owner((x - ItemDrops.PICKUP_RADIUS) // grid_size)
+            last = self.owner((x + ItemDrops.PICKUP_RADIUS) // grid_size)
+            for index in range(first, last + 1):
+                self.pickups[index].append((request, x, y))
+        return False
+
+    def give(self, picked, pickers):
+        """把分片拾取到的物品放进背包，放不下的在玩家脚下重新掉落"""
+        for request, block_type, count in picked:
+            player, inventory = pickers[request]
+            if inventory.add_items(block_type, count) == count:
+                continue
+            size = ItemDrops.SIZE
+            records = dict(kind=EntityManager.DROP, x=player.rect.centerx - size / 2, y=player.rect.centery,
+                           w=size, h=size, vx=0.0, vy=0.0, sprite=0, flags=EntityManager.ALIVE, hp=1,
+                           item=block_type, stack=count, mob=-1)
+            self.route_entities({field: np.array([value]) for field, value in records.items()})
+
+    def step_world(self, centers, player=None, inventory=None):
+        """所有分片并行推进一帧并汇总结果，返回是否有变化（没有本地玩家，忽略 player）"""
+        start = time.perf_counter()
+        _, outgoing = self.world.take_changes()
+        self.route_edits(outgoing)
+        centers = [(float(x), float(y)) for x, y in centers]
+        for index, inbox in enumerate(self.inboxes):
+            inbox.put((centers, self.remote[index], self.edits[index], self.flows[index],
+                       self.actions[index], self.arrivals[index], self.pickups[index]))
+        count = len(self.bounds)
+        self.remote = [[] for _ in range(count)]
+        self.edits = [[] for _ in range(count)]
+        self.flows = [[] for _ in range(count)]
+        self.actions = [[] for _ in range(count)]
+        self.arrivals = [[] for _ in range(count)]
+        self.pickups = [[] for _ in range(count)]
+        pickers, self.pickers = self.pickers, []
+
+        changed = False
+        views = []
+        for index, outbox in enumerate(self.outboxes):
+            changes, outgoing, outflow, leaving, picked, view, shard_changed, seconds = self.receive(index)
+            if changes:
+                self.world.apply_remote(changes)
+                for other in range(count):
+                    if other != index:
+                        self.remote[other].extend(changes)
+            self.route_edits(outgoing)
+            self.route_flows(outflow)
+            if leaving is not None:
+                self.route_entities(leaving)
+            if picked:
+                self.give(picked, pickers)
+            views.append(view)
+            changed = changed or shard_changed or bool(changes)
+            self.shard_seconds[index].append(seconds)
+        self.entities.rebuild(views)
+        self.tick_seconds.append(time.perf_counter() - start)
+        return changed
+
+    def receive(self, index):
+        """等分片 index 返回一帧的结果，期间定时检查工作进程是否还在运行"""
+        process = self.processes[index]
+        deadline = time.perf_counter() + self.SHARD_TIMEOUT
+        while True:
+            try:
+                return self.outboxes[index].get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive():
+                    raise ShardError(f"分片 {index} 的工作进程已经退出（退出码 {process.exitcode}）")
+                if time.perf_counter() > deadline:
+                    raise ShardError(f"分片 {index} 超过 {self.SHARD_TIMEOUT} 秒没有回应")
+
+    def liquid_mass(self):
+        """液体总量，包括正在转交给其他分片的液量"""
+        return int(self.mass.sum(dtype=np.int64)) + sum(flow[3] for flows in self.flows for flow in flows)
+
+    def stats(self):
+        """协调器每帧的耗时统计，shards 是各分片自己的耗时统计"""
+        stats = timing_stats(self.tick_seconds)
+        stats['shards'] = [timing_stats(seconds) for seconds in self.shard_seconds]
+        return stats
+
+    def close(self):
+        """结束工作进程并释放共享内存"""
+        if self.memory is None:
+            return
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        # 共享内存上还有数组时不能关闭
+        self.world.grid = self.grid = self.mass = None
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
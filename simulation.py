@@ -0,0 +1,427 @@
+import json
+import math
+import time
+from collections import defaultdict
+import numpy as np
+import pygame
+from world import World
+from player import Player
+from inventory import Inventory
+from lighting import LightMap
+from entities import EntityManager
+from drops import ItemDrops
+from projectiles import ProjectilePool
+from liquids import Liquids
+from block_updates import BlockUpdates
+from regions import RegionScheduler
+from navigation import NavGraph, PathPlanner
+from spawner import MobSpawner
+from world_edit import WorldEditor
+
+# 各职业的初始武器: 职业 -> (武器名称, 武器类型, 颜色)
+CLASS_WEAPONS = {
+    "战士": ("铁剑", "sword", (192, 192, 192)),
+    "法师": ("法杖", "staff", (120, 80, 255)),
+    "弓箭手": ("木弓", "bow", (160, 110, 60))
+}
+
+# 网络玩家的默认外观（多人游戏里只同步名字）
+DEFAULT_PLAYER = {
+    "name": "玩家", "hairstyle": "发型1", "body_type": "普通", "class": "战士",
+    "skin_color": [255, 220, 180], "health": 100, "mana": 100, "inventory": []
+}
+
+# 物品名称 -> 方块类型，用于没有记录方块类型的旧物品
+BLOCK_TYPES = {name: block_type for block_type, name in World.BLOCK_NAMES.items()}
+
+# 按住就持续生效的动作，模拟核心里直接用动作名代替按键
+HELD_ACTIONS = ('left', 'right', 'jump')
+MOVE_BINDINGS = {action: action for action in HELD_ACTIONS}
+# 按住的动作压缩成位掩码，录像和网络消息都用它
+HELD_BITS = {action: 1 << i for i, action in enumerate(HELD_ACTIONS)}
+
+
+def held_to_mask(held):
+    mask = 0
+    for action in held:
+        mask |= HELD_BITS[action]
+    return mask
+
+
+def mask_to_held(mask):
+    return [action for action, bit in HELD_BITS.items() if mask & bit]
+
+
+class TickInput:
+    """一帧的输入
+
+    held 是这一帧按住的动作（'left'、'right'、'jump'），
+    actions 是这一帧发生的操作：
+    - ('attack', x, y)：朝世界像素坐标 (x, y) 攻击
+    - ('break', x, y)：破坏方块 (x, y)
+    - ('place', x, y)：在 (x, y) 放置选中的方块
+    - ('select', slot)：选择物品栏的第 slot 格
+    - ('undo',)、('redo',)：撤销、重做最近一次批量编辑
+    """
+    __slots__ = ('held', 'actions')
+
+    def __init__(self, held=(), actions=()):
+        self.held = frozenset(held)
+        self.actions = list(actions)
+
+
+class ScriptedInput:
+    """按帧号给出输入的输入源，用于脚本、机器人和测试
+
+    script 可以是 TickInput 的列表，也可以是 script(tick) -> TickInput 的函数；
+    返回 None 或列表用完表示结束。
+    """
+    def __init__(self, script):
+        self.script = script
+
+    def next_input(self, tick):
+        if callable(self.script):
+            return self.script(tick)
+        if tick < len(self.script):
+            return self.script[tick]
+        return None
+
+
+def wander_bot(tick):
+    """简单的机器人：来回走动、不时跳跃和攻击，每 2000 帧结束"""
+    if tick >= 2000:
+        return None
+    held = ['right' if (tick // 300) % 2 == 0 else 'left']
+    if tick % 90 < 10:
+        held.append('jump')
+    actions = []
+    if tick % 45 == 0:
+        actions.append(('attack', 1e9 if held[0] == 'right' else -1e9, 0))
+    return TickInput(held, actions)
+
+
+def timing_stats(seconds):
+    """帧耗时统计（毫秒）"""
+    ms = np.asarray(seconds) * 1000
+    if len(ms) == 0:
+        return {'ticks': 0}
+    return {
+        'ticks': len(ms),
+        'total_s': float(ms.sum() / 1000),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+        'ticks_per_s': float(len(ms) / max(ms.sum() / 1000, 1e-9))
+    }
+
+
+class Simulation:
+    """游戏的模拟核心
+
+    世界、玩家、背包和所有按帧更新的子系统，不依赖窗口、键盘和鼠标：
+    输入通过 tick(TickInput) 传入。Game 在窗口中每帧用键盘和鼠标状态驱动它，
+    无窗口模式下 run 用任意输入源不限帧率地推进。
+
+    一帧里对方块的所有修改（破坏、放置、液体、方块更新、批量编辑）都先记在
+    世界的变化缓冲里，step_world 结束时合并后一次性通知渲染缓存、光照、
+    地表高度、网络等监听者，连续修改很多方块时每种重新计算每帧只做一次。
+    """
+    REACH = 6  # 玩家能破坏和放置方块的距离（方块）
+
+    def __init__(self, world_data, player_data, seed=None, inventory_pos=(10, 670), world=None):
+        """world 是已经创建好的世界（例如分片进程里共享内存的世界），给出时不使用 world_data"""
+        self.seed = seed
+        # 各子系统用自己的随机数生成器，不改动全局的 random 状态
+        self.rng = np.random.default_rng(seed)
+        self.tick_count = 0
+
+        # 世界和各个子系统
+        if world is None:
+            world = World(world_data['width'], world_data['height'], world_data['grid_size'])
+            world.set_grid(world_data['grid'])
+        self.world = world
+        self.world.deferred = True
+        self.lighting = LightMap(self.world)
+        self.entities = EntityManager(self.world)
+        mob_image = pygame.Surface((32, 32))
+        mob_image.fill((180, 40, 40))
+        self.mob_sprite = self.entities.add_sprite(mob_image)
+        animal_image = pygame.Surface((28, 24))
+        animal_image.fill((235, 215, 190))
+        self.animal_sprite = self.entities.add_sprite(animal_image)
+        self.drops = ItemDrops(self.entities, rng=self.rng)
+        self.projectiles = ProjectilePool(self.world, self.entities)
+        self.liquids = Liquids(self.world)
+        self.block_updates = BlockUpdates(self.world, self.lighting, seed=seed)
+        self.regions = RegionScheduler(self.world)
+        self.regions.register(self.liquids.tick_region)
+        self.regions.register(self.block_updates.tick_region)
+        self.editor = WorldEditor(self.world)
+        self.navigation = NavGraph(self.world)
+        self.paths = PathPlanner(self.navigation)
+        self.entities.add_listener(self.paths)
+        self.spawner = MobSpawner(self.world, self.entities, self.lighting, seed=seed,
+                                  time_budget=MobSpawner.TIME_BUDGET,
+                                  sprites={MobSpawner.ANIMAL: self.animal_sprite,
+                                           MobSpawner.ENEMY: self.mob_sprite})
+
+        # 背包，按职业放入初始武器。没有角色数据时（专用服务器）没有本地玩家
+        self.inventory = Inventory(*inventory_pos)
+        self.player = None
+        if player_data is None:
+            return
+        self.player = Player(*self.spawn_point(), player_data)
+        weapon_name, weapon, color = CLASS_WEAPONS.get(self.player.class_type, CLASS_WEAPONS["战士"])
+        for slot in self.inventory.slots:
+            if not slot.item:
+                slot.item = {'name': weapon_name, 'color': color, 'count': 1, 'weapon': weapon}
+                break
+
+    def spawn_point(self):
+        """玩家的出生点（像素坐标）：世界中心的地面上"""
+        spawn_x = (self.world.width * self.world.grid_size) // 2
+        spawn_y = 0
+        for y in range(self.world.height):
+            if self.world.SOLID[self.world.grid[y][spawn_x // self.world.grid_size]]:
+                spawn_y = y * self.world.grid_size - 64  # 64是玩家高度
+                break
+        return spawn_x, spawn_y
+
+    @classmethod
+    def from_files(cls, world_file, player_file, **kwargs):
+        """从地图文件和角色文件创建"""
+        with open(world_file, 'r', encoding='utf-8') as f:
+            world_data = json.load(f)
+        with open(player_file, 'r', encoding='utf-8') as f:
+            player_data = json.load(f)
+        return cls(world_data, player_data, **kwargs)
+
+    def attack(self, target_x, target_y):
+        """使用当前选中的武器朝世界坐标 (target_x, target_y) 攻击；
+        没有选中武器时使用职业的初始武器"""
+        item = self.inventory.get_selected_item()
+        if item and 'weapon' in item:
+            weapon = item['weapon']
+        else:
+            weapon = CLASS_WEAPONS.get(self.player.class_type, CLASS_WEAPONS["战士"])[1]
+        if weapon == "sword":
+            return self.melee_attack()
+
+        # 弓和法杖朝目标方向发射投射物
+        start_x, start_y = self.player.rect.center
+        dx = target_x - start_x
+        dy = target_y - start_y
+        length = math.hypot(dx, dy) or 1
+        if weapon == "bow":
+            speed, kind, damage = 18, ProjectilePool.ARROW, 1
+        else:
+            speed, kind, damage = 12, ProjectilePool.SPELL, 2
+        self.projectiles.fire(kind, start_x, start_y, dx / length * speed, dy / length * speed, damage)
+        self.player.facing_right = dx >= 0
+        return True
+
+    def melee_attack(self):
+        """近战攻击：击中玩家面前的怪物"""
+        reach = 48
+        rect = self.player.rect
+        if self.player.facing_right:
+            x0, x1 = rect.right, rect.right + reach
+        else:
+            x0, x1 = rect.left - reach, rect.left
+        knockback = 8 if self.player.facing_right else -8
+        return bool(self.entities.melee_hit(x0, rect.top, x1, rect.bottom, damage=1, knockback=knockback))
+
+    def break_block(self, tile_x, tile_y):
+        """破坏方块，并在原处掉落对应的物品"""
+        block_type = self.world.get_block(tile_x, tile_y)
+        if not World.SOLID[block_type]:  # 空气和液体不能破坏
+            return False
+        self.world.set_block(tile_x, tile_y, World.EMPTY)
+        grid_size = self.world.grid_size
+        self.drops.spawn(block_type, 1, (tile_x + 0.5) * grid_size, (tile_y + 0.5) * grid_size)
+        return True
+
+    def place_block(self, tile_x, tile_y):
+        """在空格（空气或液体）里放置选中的方块，消耗一个物品"""
+        world = self.world
+        if not (0 <= tile_x < world.width and 0 <= tile_y < world.height):
+            return False
+        if World.SOLID[world.get_block(tile_x, tile_y)]:
+            return False
+        slot = self.inventory.slots[self.inventory.selected_slot]
+        item = slot.item
+        block_type = item and item.get('block', BLOCK_TYPES.get(item['name']))
+        if block_type is None:
+            return False
+        grid_size = world.grid_size
+        tile = pygame.Rect(tile_x * grid_size, tile_y * grid_size, grid_size, grid_size)
+        if self.player is not None and tile.colliderect(self.player.rect):
+            return False
+        world.set_block(tile_x, tile_y, block_type)
+        slot.remove_one()
+        return True
+
+    def pick_tile(self, target_x, target_y, place=False, player=None):
+        """从玩家中心朝世界像素坐标 (target_x, target_y) 做射线检测，
+        返回要破坏（place 为真时是要放置）的方块坐标，够不到时返回 None
+
+        射线逐格穿过方块网格，最远到目标点或 REACH 格：破坏时取碰到的第一个实心方块；
+        放置时取它前面的一格，没有碰到实心方块时取目标格（要与实心方块相邻）。
+        player 默认是本地玩家，服务器用它检查网络玩家的操作。
+        """
+        world = self.world
+        grid_size = world.grid_size
+        player = player or self.player
+        x0, y0 = player.rect.centerx / grid_size, player.rect.centery / grid_size
+        dx, dy = target_x / grid_size - x0, target_y / grid_size - y0
+        length = math.hypot(dx, dy)
+        if length > self.REACH:
+            dx, dy = dx * self.REACH / length, dy * self.REACH / length
+        cell_x, cell_y = math.floor(x0), math.floor(y0)
+        step_x, step_y = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+        t_max_x = (cell_x + (step_x > 0) - x0) / dx if dx else math.inf
+        t_max_y = (cell_y + (step_y > 0) - y0) / dy if dy else math.inf
+        t_delta_x = abs(1 / dx) if dx else math.inf
+        t_delta_y = abs(1 / dy) if dy else math.inf
+        previous = None
+        while True:
+            if world.is_solid(cell_x, cell_y):
+                return previous if place else (cell_x, cell_y)
+            previous = (cell_x, cell_y)
+            if min(t_max_x, t_max_y) > 1:
+                break
+            if t_max_x < t_max_y:
+                cell_x += step_x
+                t_max_x += t_delta_x
+            else:
+                cell_y += step_y
+                t_max_y += t_delta_y
+        if place and any(world.is_solid(cell_x + nx, cell_y + ny)
+                         for nx, ny in ((1, 0), (-1, 0), (0, 1), (0, -1))):
+            return cell_x, cell_y
+        return None
+
+    def select_slot(self, slot):
+        self.inventory.selected_slot = slot
+        return True
+
+    def apply(self, action):
+        """执行一个操作，返回是否需要重绘"""
+        kind = action[0]
+        if kind == 'attack':
+            return self.attack(action[1], action[2])
+        if kind == 'break':
+            return self.break_block(action[1], action[2])
+        if kind == 'place':
+            return self.place_block(action[1], action[2])
+        if kind == 'select':
+            return self.select_slot(action[1])
+        if kind == 'undo':
+            return self.editor.undo()
+        if kind == 'redo':
+            return self.editor.redo()
+        return False
+
+    def tick(self, tick_input=None):
+        """推进一帧，返回是否有需要重绘的变化"""
+        self.tick_count += 1
+        changed = False
+        if tick_input is not None:
+            for action in tick_input.actions:
+                if self.apply(action):
+                    changed = True
+        held = tick_input.held if tick_input is not None else ()
+        self.player.update(self.world, MOVE_BINDINGS, defaultdict(bool, dict.fromkeys(held, True)))
+
+        grid_size = self.world.grid_size
+        center = (self.player.rect.centerx / grid_size, self.player.rect.centery / grid_size)
+        if self.step_world([center], self.player, self.inventory):
+            changed = True
+        return changed
+
+    def step_world(self, centers, player=None, inventory=None, spawn_centers=None):
+        """推进玩家以外的部分一帧：方块更新、液体、怪物、掉落物和投射物，返回是否有变化
+
+        centers 是所有玩家所在位置（方块坐标）的列表，给出 player 和 inventory 时
+        这个玩家会拾取附近的掉落物。spawn_centers 是生成怪物用的中心点，默认与 centers 相同。
+        """
+        # 方块更新和液体按区域调度，只有玩家附近的区域每帧更新
+        changed = False
+        grid_size = self.world.grid_size
+        self.regions.set_centers(centers)
+        if self.block_updates.run_scheduled():
+            changed = True
+        if self.regions.update():
+            changed = True
+        if self.spawner.update(centers if spawn_centers is None else spawn_centers):
+            changed = True
+
+        if len(self.entities):
+            # 寻路每帧只用固定的预算，沿路径行走的怪物在实体更新前设置速度
+            if self.paths.queue:
+                self.paths.update()
+            if self.paths.paths:
+                self.paths.steer(self.entities)
+            self.entities.separate(EntityManager.MOB)
+            awake = self.entities.awake_ids()
+            # 降频区域里的实体补算经过的帧数，冻结后恢复的区域里的实体不补算
+            steps = np.minimum(self.regions.elapsed_at(self.entities.x[awake] // grid_size,
+                                                       self.entities.y[awake] // grid_size),
+                               RegionScheduler.LAZY_INTERVAL)
+            due = steps > 0
+            awake = self.entities.update(awake[due], steps[due])
+            if self.drops.update(awake, player, inventory) or len(awake):
+                changed = True
+        if len(self.projectiles):
+            self.projectiles.update()
+            changed = True
+        # 本帧的方块变化合并后一次性通知
+        if self.world.flush_changes():
+            changed = True
+        return changed
+
+    def pickup(self, pickers):
+        """多人时每个玩家拾取附近的掉落物，pickers 是 (玩家, 背包) 的列表，返回是否拾取了物品"""
+        picked = False
+        for player, inventory in pickers:
+            if self.drops.pickup(player, inventory):
+                picked = True
+        return picked
+
+    def run(self, source, max_ticks=None):
+        """无窗口模式：不限帧率地推进，直到输入源结束或达到 max_ticks，返回耗时统计"""
+        seconds = []
+        tick = 0
+        while max_ticks is None or tick < max_ticks:
+            tick_input = source.next_input(tick)
+            if tick_input is None:
+                break
+            start = time.perf_counter()
+            self.tick(tick_input)
+            seconds.append(time.perf_counter() - start)
+            tick += 1
+        return timing_stats(seconds)
+
+
+def main():
+    """无窗口运行：python simulation.py 地图文件 角色文件 [--ticks N] [--seed N]"""
+    import argparse
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    parser = argparse.ArgumentParser(description="无窗口运行游戏模拟")
+    parser.add_argument("world_file")
+    parser.add_argument("player_file")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pygame.init()
+    simulation = Simulation.from_files(args.world_file, args.player_file, seed=args.seed)
+    stats = simulation.run(ScriptedInput(wander_bot), args.ticks)
+    for key, value in stats.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
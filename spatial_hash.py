@@ -0,0 +1,138 @@
+import math
+import numpy as np
+
+class SpatialHash:
+    """均匀网格空间哈希
+
+    单元格边长是 World.grid_size 的整数倍，每个实体按中心点放进一个单元格。
+    实体移动后只重新登记跨越了单元格的实体，查询时只检查附近的单元格，
+    因此半径、矩形和最近邻查询的开销与实体总数无关。
+    实体的位置和尺寸直接读取 EntityManager 的结构数组。
+    """
+    NO_CELL = np.iinfo(np.int32).min
+
+    def __init__(self, entities, grid_size, cell_tiles=2):
+        self.entities = entities
+        self.cell_size = grid_size * cell_tiles
+        self.cells = {}  # (单元格x, 单元格y) -> 实体编号集合
+        self.cell_x = np.full(entities.capacity, self.NO_CELL, dtype=np.int32)
+        self.cell_y = np.full(entities.capacity, self.NO_CELL, dtype=np.int32)
+        self.max_half_size = 0.0  # 已登记实体的最大半宽/半高，用于扩大查询范围
+
+    def cells_of(self, ids):
+        """批量计算实体中心所在的单元格"""
+        e = self.entities
+        cx = np.floor((e.x[ids] + e.w[ids] / 2) / self.cell_size).astype(np.int32)
+        cy = np.floor((e.y[ids] + e.h[ids] / 2) / self.cell_size).astype(np.int32)
+        return cx, cy
+
+    def update(self, ids):
+        """实体移动后重新登记跨越单元格的实体"""
+        if len(ids) == 0:
+            return
+        if len(self.cell_x) < self.entities.capacity:
+            grow = self.entities.capacity - len(self.cell_x)
+            self.cell_x = np.concatenate([self.cell_x, np.full(grow, self.NO_CELL, dtype=np.int32)])
+            self.cell_y = np.concatenate([self.cell_y, np.full(grow, self.NO_CELL, dtype=np.int32)])
+        e = self.entities
+        self.max_half_size = max(self.max_half_size,
+                                 float(e.w[ids].max()) / 2, float(e.h[ids].max()) / 2)
+
+        new_x, new_y = self.cells_of(ids)
+        moved = (new_x != self.cell_x[ids]) | (new_y != self.cell_y[ids])
+        for index, cx, cy in zip(ids[moved].tolist(), new_x[moved].tolist(), new_y[moved].tolist()):
+            self.unlink(index)
+            self.cells.setdefault((cx, cy), set()).add(index)
+            self.cell_x[index] = cx
+            self.cell_y[index] = cy
+
+    def unlink(self, index):
+        """从所在单元格中移除一个实体"""
+        if self.cell_x[index] == self.NO_CELL:
+            return
+        key = (int(self.cell_x[index]), int(self.cell_y[index]))
+        bucket = self.cells.get(key)
+        if bucket is not None:
+            bucket.discard(index)
+            if not bucket:
+                del self.cells[key]
+        self.cell_x[index] = self.NO_CELL
+        self.cell_y[index] = self.NO_CELL
+
+    def remove(self, index):
+        self.unlink(int(index))
+
+    def candidates(self, x0, y0, x1, y1):
+        """收集与矩形（按最大实体尺寸扩大后）相交的单元格中的所有实体"""
+        pad = self.max_half_size
+        cs = self.cell_size
+        found = []
+        for cy in range(math.floor((y0 - pad) / cs), math.floor((y1 + pad) / cs) + 1):
+            for cx in range(math.floor((x0 - pad) / cs), math.floor((x1 + pad) / cs) + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return np.array(found, dtype=np.int64)
+
+    def query_aabb(self, x0, y0, x1, y1, kind=None):
+        """返回碰撞箱与矩形 [x0, x1) × [y0, y1) 相交的实体编号"""
+        ids = self.candidates(x0, y0, x1, y1)
+        if len(ids) == 0:
+            return ids
+        e = self.entities
+        hit = ((e.x[ids] < x1) & (e.x[ids] + e.w[ids] > x0) &
+               (e.y[ids] < y1) & (e.y[ids] + e.h[ids] > y0))
+        if kind is not None:
+            hit &= e.kind[ids] == kind
+        return ids[hit]
+
+    def query_radius(self, x, y, radius, kind=None):
+        """返回中心点距离 (x, y) 不超过 radius 的实体编号"""
+        ids = self.candidates(x - radius, y - radius, x + radius, y + radius)
+        if len(ids) == 0:
+            return ids
+        e = self.entities
+        dx = e.x[ids] + e.w[ids] / 2 - x
+        dy = e.y[ids] + e.h[ids] / 2 - y
+        hit = dx * dx + dy * dy <= radius * radius
+        if kind is not None:
+            hit &= e.kind[ids] == kind
+        return ids[hit]
+
+    def nearest(self, x, y, max_radius, kind=None, exclude=None):
+        """返回距离 (x, y) 最近的实体编号，max_radius 内没有则返回 -1
+
+        从所在单元格开始一圈一圈向外搜索，找到的候选比下一圈更近时提前结束。
+        """
+        cs = self.cell_size
+        home_x, home_y = math.floor(x / cs), math.floor(y / cs)
+        e = self.entities
+        best, best_dist = -1, max_radius * max_radius
+        for ring in range(int(max_radius // cs) + 2):
+            # 下一圈单元格离查询点至少 (ring - 1) 个单元格
+            if best >= 0 and ((ring - 1) * cs) ** 2 > best_dist:
+                break
+            found = []
+            for cy in range(home_y - ring, home_y + ring + 1):
+                for cx in range(home_x - ring, home_x + ring + 1):
+                    if max(abs(cx - home_x), abs(cy - home_y)) != ring:
+                        continue
+                    bucket = self.cells.get((cx, cy))
+                    if bucket:
+                        found.extend(bucket)
+            if not found:
+                continue
+            ids = np.array(found, dtype=np.int64)
+            if kind is not None:
+                ids = ids[e.kind[ids] == kind]
+            if exclude is not None:
+                ids = ids[ids != exclude]
+            if len(ids) == 0:
+                continue
+            dx = e.x[ids] + e.w[ids] / 2 - x
+            dy = e.y[ids] + e.h[ids] / 2 - y
+            dist = dx * dx + dy * dy
+            i = int(np.argmin(dist))
+            if dist[i] <= best_dist:
+                best, best_dist = int(ids[i]), float(dist[i])
+        return best
@@ -0,0 +1,146 @@
+import time
+import numpy as np
+from world import World
+from entities import EntityManager
+from lighting import LightMap
+
+
+class MobSpawner:
+    """怪物和动物的生成器
+
+    不扫描世界：每次随机挑一个玩家，在玩家左右 MIN_DISTANCE~MAX_DISTANCE 格之间随机挑一列，
+    - 动物：用 World.heights 直接找到这一列的地表，地表是草地、上方够亮时生成
+    - 敌人：在玩家上下 DEPTH_RANGE 格内随机挑一个格子，空着、下面是实心、
+      而且足够暗（洞穴里）时生成
+    每个候选位置只做常数次查表（方块数组、地表高度、光照），同一区块里已有
+    的怪物数在每次生成前按生成器管理的怪物统计一次。怪物总数有上限，远离玩家的怪物被移除，
+    每 INTERVAL 帧最多尝试 max_attempts 次、最多花 time_budget 秒，所以生成
+    的开销与世界大小和实体数量无关。
+    """
+    ANIMAL = 0
+    ENEMY = 1
+
+    MOB_CAP = 40  # 生成器管理的怪物总数上限
+    CHUNK_CAP = 4  # 每个区块最多的怪物数
+    MIN_DISTANCE = 24  # 生成位置与玩家的最小水平距离（格），避免在屏幕内出现
+    MAX_DISTANCE = 64
+    DEPTH_RANGE = 48  # 敌人生成位置与玩家的最大垂直距离（格）
+    DESPAWN_DISTANCE = 128  # 超过这个距离的怪物被移除
+    ANIMAL_MIN_LIGHT = 9
+    ENEMY_MAX_LIGHT = 7
+    MAX_ATTEMPTS = 16  # 每次最多检查的候选位置
+    INTERVAL = 20  # 每隔几帧尝试生成一次
+    TIME_BUDGET = 0.0005  # 游戏里每次尝试生成最多花的秒数
+
+    # 种类 -> (宽, 高, 生命值, 行走速度)
+    KINDS = {
+        ANIMAL: (28, 24, 1, 1.0),
+        ENEMY: (32, 32, 3, 2.0)
+    }
+
+    def __init__(self, world, entities, light=None, sprites=None, seed=None,
+                 max_attempts=MAX_ATTEMPTS, time_budget=None):
+        self.world = world
+        self.entities = entities
+        self.light = light
+        self.sprites = sprites or {}  # 种类 -> 精灵编号
+        self.rng = np.random.default_rng(seed)
+        self.max_attempts = max_attempts
+        self.time_budget = time_budget  # 每帧最多花的秒数，None 表示只按尝试次数限制
+        self.mobs = {}  # 实体编号 -> 种类
+        self.tick = 0
+        self.attempts = 0  # 累计尝试次数，用于统计
+
+    def prune(self, centers):
+        """忘掉已经死亡的怪物，移除离所有玩家都太远的怪物，返回各区块剩下的怪物数"""
+        e = self.entities
+        grid_size = self.world.grid_size
+        chunk = World.CHUNK_SIZE * grid_size
+        counts = {}
+        for index in list(self.mobs):
+            if not e.flags[index] & EntityManager.ALIVE or e.kind[index] != EntityManager.MOB:
+                del self.mobs[index]
+            elif min(max(abs(e.x[index] / grid_size - center_x), abs(e.y[index] / grid_size - center_y))
+                     for center_x, center_y in centers) > self.DESPAWN_DISTANCE:
+                e.despawn(index)
+                del self.mobs[index]
+            else:
+                key = (int(e.x[index] // chunk), int(e.y[index] // chunk))
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def light_at(self, x, y):
+        """(x, y) 的亮度。只读已经算好的光照区块，没算过的区块按地表以下的深度估计，
+        不会为了生成怪物去计算光照"""
+        size = World.CHUNK_SIZE
+        chunk = self.light.chunks.get((x // size, y // size)) if self.light is not None else None
+        if chunk is not None:
+            return int(chunk[y % size, x % size])
+        depth = y - int(self.world.heights[x]) + 1
+        if depth <= 0:
+            return LightMap.MAX_LIGHT
+        return max(0, LightMap.MAX_LIGHT - World.BLOCK_OPACITY[World.PLATFORM] * depth)
+
+    def candidate(self, centers):
+        """随机挑一个候选位置，返回 (种类, x, y) 或 None（方块坐标，y 是怪物脚下的格子）"""
+        world = self.world
+        rng = self.rng
+        center_x, center_y = centers[int(rng.integers(len(centers)))] if len(centers) > 1 else centers[0]
+        offset = int(rng.integers(self.MIN_DISTANCE, self.MAX_DISTANCE + 1))
+        x = int(center_x) + (offset if rng.random() < 0.5 else -offset)
+        if not 0 <= x < world.width:
+            return None
+        grid = world.grid
+        if rng.random() < 0.5:
+            y = int(world.heights[x]) - 1
+            if y < 0 or grid[y + 1, x] != World.GRASS or grid[y, x] != World.EMPTY:
+                return None
+            if self.light_at(x, y) < self.ANIMAL_MIN_LIGHT:
+                return None
+            return self.ANIMAL, x, y
+        y = int(center_y) + int(rng.integers(-self.DEPTH_RANGE, self.DEPTH_RANGE + 1))
+        # 地表以上不生成敌人
+        if y <= world.heights[x] or y + 1 >= world.height:
+            return None
+        if grid[y, x] != World.EMPTY or grid[y - 1, x] != World.EMPTY or not World.SOLID[grid[y + 1, x]]:
+            return None
+        if self.light_at(x, y) > self.ENEMY_MAX_LIGHT:
+            return None
+        return self.ENEMY, x, y
+
+    def spawn(self, kind, x, y):
+        width, height, hp, speed = self.KINDS[kind]
+        grid_size = self.world.grid_size
+        vx = speed if self.rng.random() < 0.5 else -speed
+        index = self.entities.spawn(EntityManager.MOB, (x + 0.5) * grid_size - width / 2,
+                                    (y + 1) * grid_size - height, width, height, vx=vx,
+                                    sprite=self.sprites.get(kind, 0), flags=EntityManager.WALKER, hp=hp)
+        self.mobs[index] = kind
+        return index
+
+    def update(self, centers):
+        """在玩家附近尝试生成怪物，centers 是玩家位置（方块坐标）的列表，返回生成的数量"""
+        self.tick += 1
+        if self.tick % self.INTERVAL or not centers:
+            return 0
+        counts = self.prune(centers)
+        if len(self.mobs) >= self.MOB_CAP:
+            return 0
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+        spawned = 0
+        for _ in range(self.max_attempts):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.attempts += 1
+            found = self.candidate(centers)
+            if found is None:
+                continue
+            key = (found[1] // World.CHUNK_SIZE, found[2] // World.CHUNK_SIZE)
+            if counts.get(key, 0) >= self.CHUNK_CAP:
+                continue
+            counts[key] = counts.get(key, 0) + 1
+            self.spawn(*found)
+            spawned += 1
+            if len(self.mobs) >= self.MOB_CAP:
+                break
+        return spawned
@@ -0,0 +1,244 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from world import World
+
+_MASK = np.uint64(0xFFFFFFFF)
+
+
+def lattice(xs, ys, seed, salt):
+    """整数格点上的伪随机值（0~1 的 float32），只取决于坐标、种子和 salt"""
+    h = (np.asarray(xs, dtype=np.int64).astype(np.uint64) * np.uint64(0x27D4EB2D) +
+         np.asarray(ys, dtype=np.int64).astype(np.uint64) * np.uint64(0x165667B1) +
+         np.uint64((seed * 0x9E3779B1 + salt * 0x85EBCA77) & 0xFFFFFFFF)) & _MASK
+    h = ((h ^ (h >> np.uint64(15))) * np.uint64(0x2C1B3C6D)) & _MASK
+    h = ((h ^ (h >> np.uint64(12))) * np.uint64(0x297A2D39)) & _MASK
+    h ^= h >> np.uint64(15)
+    return (h & np.uint64(0xFFFFFF)).astype(np.float32) / np.float32(0x1000000)
+
+
+def weights(start, stop, scale):
+    """[start, stop) 每个坐标所在的格点下标和平滑后的插值系数"""
+    coords = np.arange(start, stop, dtype=np.int64)
+    index = coords // scale
+    t = ((coords - index * scale) / np.float32(scale)).astype(np.float32)
+    return index, t * t * (3 - 2 * t)
+
+
+def value_noise(x0, y0, x1, y1, scale, seed, salt):
+    """矩形 [x0, x1) × [y0, y1) 上格点间距为 scale 的值噪声
+
+    先沿 y、再沿 x 做两次一维插值，每个格子的结果只取决于它的绝对坐标，
+    与矩形怎样划分无关，所以任何区块都可以单独生成。
+    """
+    ix, tx = weights(x0, x1, scale)
+    iy, ty = weights(y0, y1, scale)
+    cols = np.arange(ix[0], ix[-1] + 2)
+    rows = np.arange(iy[0], iy[-1] + 2)
+    grid = lattice(cols[None, :], rows[:, None], seed, salt)
+    ry = iy - rows[0]
+    column = grid[ry] * (1 - ty)[:, None] + grid[ry + 1] * ty[:, None]
+    rx = ix - cols[0]
+    return column[:, rx] * (1 - tx) + column[:, rx + 1] * tx
+
+
+def fractal_noise(x0, y0, x1, y1, scale, octaves, seed, salt):
+    """多个八度叠加的值噪声，归一化到 0~1"""
+    total = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        total += np.float32(amplitude) * value_noise(x0, y0, x1, y1, max(scale >> octave, 1),
+                                                     seed, salt * 16 + octave)
+        norm += amplitude
+        amplitude *= 0.5
+    return total / np.float32(norm)
+
+
+def smooth(mask, iterations):
+    """元胞自动机平滑：3×3 邻域里（含自己）至少 5 格为真的格子为真
+
+    每次迭代结果向内缩小一圈，调用方要多算 iterations 圈边界再裁掉。
+    """
+    for _ in range(iterations):
+        m = mask.astype(np.uint8)
+        count = (m[:-2, :-2] + m[:-2, 1:-1] + m[:-2, 2:] + m[1:-1, :-2] + m[1:-1, 1:-1] +
+                 m[1:-1, 2:] + m[2:, :-2] + m[2:, 1:-1] + m[2:, 2:])
+        mask = count >= 5
+    return mask
+
+
+class TerrainGenerator:
+    """由种子生成地形，每个区块（或任意矩形）可以单独、以任意顺序生成
+
+    - 地表高度：一维多八度值噪声
+    - 地层：地表一格草地，下面两格泥土，再往下是石头
+    - 洞穴：两种噪声取阈值——峰脊噪声（|n - 0.5| 很小的地方）形成连通的隧道，
+      低频噪声的高值形成大洞，再用元胞自动机平滑边缘
+    - 矿脉：石头里高频噪声的高值，铁矿在浅处、金矿和萤石在深处
+    - 湖泊和岩浆洞：位置由种子决定（生成器创建时算好，数量很少），
+      各区块只画出与自己重叠的部分
+    所有随机数都由格点坐标的哈希得到，结果与生成顺序和矩形的划分方式无关。
+    """
+    SURFACE_SCALE = 128  # 地表起伏的格点间距（格）
+    CAVE_SCALE = 32
+    CAVERN_SCALE = 64
+    ORE_SCALE = 8
+    SMOOTH_ITERATIONS = 2
+    CAVE_DEPTH = 12  # 地表以下多少格开始有洞穴
+    TUNNEL_WIDTH = 0.025  # 峰脊噪声的阈值，越大隧道越宽
+    CAVERN_THRESHOLD = 0.7
+    # workers=None 时只有核数和世界都够大才用进程池，否则启动进程的开销抵不上并行的收益
+    PARALLEL_MIN_CPUS = 3
+    PARALLEL_MIN_CELLS = 4096 * 1024
+
+    # 矿石：方块类型, 噪声 salt, 阈值, 最浅的深度（占世界高度的比例）
+    ORES = (
+        (World.IRON_ORE, 5, 0.80, 0.0),
+        (World.GOLD_ORE, 6, 0.84, 0.25),
+        (World.GLOWSTONE, 7, 0.88, 0.35),
+    )
+
+    def __init__(self, width, height, seed=0):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # 湖泊 (起点, 宽度, 深度) 和岩浆洞 (中心x, 中心y, 半径)
+        self.lakes = []
+        for _ in range(width // 200):
+            lake_width = int(rng.integers(10, 31))
+            start = int(rng.integers(0, width - lake_width + 1))
+            self.lakes.append((start, lake_width, int(rng.integers(3, 7))))
+        self.lava_pockets = []
+        for _ in range(width // 300):
+            center_x = int(rng.integers(10, width - 10))
+            top = min(int(self.surface(center_x, center_x + 1)[0]) + 30, height - 10)
+            self.lava_pockets.append((center_x, int(rng.integers(top, height - 9)), int(rng.integers(3, 7))))
+
+    def surface(self, x0, x1):
+        """x0~x1 列的地表高度（最上面的空气格所在的行）"""
+        noise = fractal_noise(x0, 0, x1, 1, self.SURFACE_SCALE, 4, self.seed, 1)[0]
+        heights = self.height // 2 + ((noise - 0.5) * (self.height // 3)).astype(np.int64)
+        return np.clip(heights, self.height // 4, self.height * 3 // 4)
+
+    def caves(self, x0, y0, x1, y1):
+        """矩形内的洞穴掩码"""
+        pad = self.SMOOTH_ITERATIONS
+        px0, py0, px1, py1 = x0 - pad, y0 - pad, x1 + pad, y1 + pad
+        tunnel = np.abs(fractal_noise(px0, py0, px1, py1, self.CAVE_SCALE, 3, self.seed, 2) - 0.5)
+        cavern = fractal_noise(px0, py0, px1, py1, self.CAVERN_SCALE, 2, self.seed, 3)
+        depth = np.arange(py0, py1)[:, None] - self.surface(px0, px1)[None, :]
+        mask = ((tunnel < self.TUNNEL_WIDTH) | (cavern > self.CAVERN_THRESHOLD)) & (depth > self.CAVE_DEPTH)
+        return smooth(mask, pad)
+
+    def generate_region(self, x0, y0, x1, y1):
+        """生成矩形 [x0, x1) × [y0, y1) 的方块数组"""
+        surface = self.surface(x0, x1)
+        rows = np.arange(y0, y1)[:, None]
+        depth = rows - surface[None, :]
+        grid = np.where(depth > 3, World.PLATFORM,
+                        np.where(depth > 1, World.GROUND,
+                                 np.where(depth > 0, World.GRASS, World.EMPTY))).astype(np.uint8)
+
+        stone = grid == World.PLATFORM
+        for block_type, salt, threshold, min_depth in self.ORES:
+            noise = fractal_noise(x0, y0, x1, y1, self.ORE_SCALE, 2, self.seed, salt)
+            grid[stone & (noise > threshold) & (rows >= int(self.height * min_depth))] = block_type
+        grid[self.caves(x0, y0, x1, y1)] = World.EMPTY
+
+        self.draw_lakes(grid, x0, y0, x1, y1)
+        self.draw_lava(grid, x0, y0, x1, y1)
+        return grid
+
+    def draw_lakes(self, grid, x0, y0, x1, y1):
+        """湖泊：在地面挖出碗状的坑，水面与湖中心的地面平齐，湖底铺一层沙子"""
+        for start, lake_width, depth in self.lakes:
+            lx0, lx1 = max(start, x0), min(start + lake_width, x1)
+            if lx0 >= lx1:
+                continue
+            center = start + lake_width // 2
+            level = int(self.surface(center, center + 1)[0]) + 1
+            columns = np.arange(lx0, lx1)
+            edge = np.minimum(columns - start, start + lake_width - 1 - columns)  # 越靠近湖岸越浅
+            bottom = level + np.minimum(depth, edge + 1)
+            top = np.minimum(level, self.surface(lx0, lx1) + 1)
+            rows = np.arange(y0, y1)[:, None]
+            view = grid[:, lx0 - x0:lx1 - x0]
+            hole = (rows >= top) & (rows < bottom)
+            view[hole & (rows >= level)] = World.WATER
+            view[hole & (rows < level)] = World.EMPTY
+            view[(rows == bottom) & (rows < self.height)] = World.SAND
+
+    def draw_lava(self, grid, x0, y0, x1, y1):
+        """地下深处的岩浆洞：下半部分是岩浆"""
+        rows = np.arange(y0, y1)[:, None]
+        for center_x, center_y, radius in self.lava_pockets:
+            lx0, lx1 = max(center_x - radius, x0), min(center_x + radius + 1, x1)
+            if lx0 >= lx1 or center_y + radius < y0 or center_y - radius >= y1:
+                continue
+            columns = np.arange(lx0, lx1)[None, :]
+            inside = (columns - center_x) ** 2 + (rows - center_y) ** 2 <= radius * radius
+            view = grid[:, lx0 - x0:lx1 - x0]
+            view[inside & (rows >= center_y)] = World.LAVA
+            view[inside & (rows < center_y)] = World.EMPTY
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        size = World.CHUNK_SIZE
+        x0, y0 = chunk_x * size, chunk_y * size
+        return self.generate_region(x0, y0, min(x0 + size, self.width), min(y0 + size, self.height))
+
+    def generate(self, band=World.CHUNK_SIZE * 8, workers=1):
+        """生成整个世界，按 band 列宽的竖条逐条生成（结果与 band 无关）
+
+        workers 大于 1 时把竖条分给进程池并行生成，结果与单进程生成的完全相同。
+        workers 为 None 时按 CPU 核数和世界大小自动选择。
+        """
+        bands = [(x0, min(x0 + band, self.width)) for x0 in range(0, self.width, band)]
+        if workers is None:
+            cpus = os.cpu_count() or 1
+            large = self.width * self.height >= self.PARALLEL_MIN_CELLS
+            workers = cpus if cpus >= self.PARALLEL_MIN_CPUS and large else 1
+        workers = min(workers, len(bands))
+        if workers > 1:
+            return self.generate_parallel(bands, workers)
+        grid = np.empty((self.height, self.width), dtype=np.uint8)
+        for x0, x1 in bands:
+            grid[:, x0:x1] = self.generate_region(x0, 0, x1, self.height)
+        return grid
+
+    def generate_parallel(self, bands, workers):
+        """工作进程把各自的竖条直接写进共享内存里的方块数组，不经过管道传回"""
+        memory = shared_memory.SharedMemory(create=True, size=self.width * self.height)
+        try:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                     initargs=(self, memory.name)) as pool:
+                for _ in pool.map(generate_band, bands):
+                    pass
+            grid = np.ndarray((self.height, self.width), dtype=np.uint8, buffer=memory.buf).copy()
+        finally:
+            memory.close()
+            memory.unlink()
+        return grid
+
+
+# 工作进程里的生成器和共享内存上的方块数组，由 init_worker 设置
+worker_generator = None
+worker_memory = None
+worker_grid = None
+
+
+def init_worker(generator, memory_name):
+    """进程池工作进程的初始化：连接到共享内存"""
+    global worker_generator, worker_memory, worker_grid
+    worker_generator = generator
+    worker_memory = shared_memory.SharedMemory(name=memory_name)
+    worker_grid = np.ndarray((generator.height, generator.width), dtype=np.uint8, buffer=worker_memory.buf)
+
+
+def generate_band(bounds):
+    x0, x1 = bounds
+    worker_grid[:, x0:x1] = worker_generator.generate_region(x0, 0, x1, worker_generator.height)
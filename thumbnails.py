@@ -0,0 +1,107 @@
+import os
+import json
+import queue
+import threading
+import pygame
+import numpy as np
+from world import World
+
+# 缩略图生成完成时投递的事件，用于唤醒处于空闲等待的菜单
+THUMBNAIL_READY = pygame.event.custom_type()
+
+
+def render_thumbnail(grid, max_size):
+    """把方块数组矢量化地转换成缩略图
+
+    每 N×N 个方块取一个像素，N 取能让缩略图放进 max_size 的最小值。
+    """
+    grid = np.asarray(grid, dtype=np.uint8)
+    height, width = grid.shape
+    step = max(1, -(-width // max_size[0]), -(-height // max_size[1]))
+    pixels = World.color_lut()[grid[::step, ::step]]
+    # surfarray 使用 (x, y) 顺序
+    return pygame.surfarray.make_surface(pixels.swapaxes(0, 1))
+
+
+class ThumbnailCache:
+    """地图缩略图缓存
+
+    缩略图保存为地图文件旁边的 <地图名>.thumb.png，文件的修改时间被设置成
+    对应地图文件的修改时间，两者不一致时说明缩略图已过期。读取和重新生成都在
+    后台线程中进行，主线程只查询内存中的结果，不会解析地图文件。
+    """
+    SIZE = (80, 45)
+
+    def __init__(self, world_path):
+        self.world_path = world_path
+        self.surfaces = {}  # 地图名 -> (地图修改时间, Surface)
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.thread = None
+
+    def world_file(self, name):
+        return os.path.join(self.world_path, f"{name}.json")
+
+    def thumbnail_file(self, name):
+        return os.path.join(self.world_path, f"{name}.thumb.png")
+
+    def get(self, name):
+        """返回地图的缩略图；还没有准备好时返回 None 并安排后台生成"""
+        try:
+            mtime = os.stat(self.world_file(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            cached = self.surfaces.get(name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            if name in self.pending:
+                return cached[1] if cached else None
+            self.pending.add(name)
+        self.requests.put(name)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.worker, daemon=True)
+            self.thread.start()
+        # 过期的缩略图在新的生成好之前继续显示
+        return cached[1] if cached else None
+
+    def remove(self, name):
+        """删除地图时一并删除它的缩略图"""
+        with self.lock:
+            self.surfaces.pop(name, None)
+        thumb_file = self.thumbnail_file(name)
+        if os.path.exists(thumb_file):
+            os.remove(thumb_file)
+
+    def worker(self):
+        """后台线程：读取或重新生成缩略图"""
+        while True:
+            name = self.requests.get()
+            try:
+                result = self.load_or_generate(name)
+            except Exception as e:
+                print(f"生成缩略图失败: {name}: {e}")
+                result = None
+            with self.lock:
+                self.pending.discard(name)
+                if result is not None:
+                    self.surfaces[name] = result
+            if result is not None:
+                pygame.event.post(pygame.event.Event(THUMBNAIL_READY, name=name))
+
+    def load_or_generate(self, name):
+        world_file = self.world_file(name)
+        thumb_file = self.thumbnail_file(name)
+        mtime = os.stat(world_file).st_mtime_ns
+
+        # 磁盘上的缩略图仍然有效时直接读取
+        if os.path.exists(thumb_file) and os.stat(thumb_file).st_mtime_ns == mtime:
+            return mtime, pygame.image.load(thumb_file)
+
+        with open(world_file, 'r', encoding='utf-8') as f:
+            world_data = json.load(f)
+        surface = render_thumbnail(world_data['grid'], self.SIZE)
+        pygame.image.save(surface, thumb_file)
+        os.utime(thumb_file, ns=(mtime, mtime))
+        return mtime, surface
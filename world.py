@@ -7,20 +7,104 @@ class World:
     EMPTY = 0
     GROUND = 1
     PLATFORM = 2
+    GRASS = 3
+    GLOWSTONE = 4
+    WATER = 5
+    LAVA = 6
+    SAND = 7
+    IRON_ORE = 8
+    GOLD_ORE = 9
+    
+    # 液体方块，可以穿过
+    LIQUIDS = (WATER, LAVA)
+    
+    # 方块类型是否为实心（参与碰撞）的查找表
+    SOLID = np.ones(256, dtype=bool)
+    SOLID[[EMPTY, WATER, LAVA]] = False
+    
+    # 区块边长（方块数），光照和渲染缓存等按区块划分的子系统共用
+    CHUNK_SIZE = 32
+    
+    # 方块颜色
+    BLOCK_COLORS = {
+        EMPTY: None,  # 空气方块不需要颜色
+        GROUND: (139, 69, 19),  # 泥土方块的颜色
+        PLATFORM: (128, 128, 128),  # 石头方块的颜色
+        GRASS: (34, 139, 34),  # 草地方块的颜色
+        GLOWSTONE: (255, 214, 90),  # 萤石方块的颜色
+        WATER: (40, 90, 220),  # 水的颜色
+        LAVA: (230, 90, 20),  # 岩浆的颜色
+        SAND: (220, 200, 120),  # 沙子的颜色
+        IRON_ORE: (170, 140, 120),  # 铁矿石的颜色
+        GOLD_ORE: (230, 190, 60)  # 金矿石的颜色
+    }
+    UNKNOWN_COLOR = (200, 200, 200)  # 未定义颜色的方块
+    
+    # 方块名称（也是背包中物品的名称）
+    BLOCK_NAMES = {
+        GROUND: "泥土",
+        PLATFORM: "石头",
+        GRASS: "草地",
+        GLOWSTONE: "萤石",
+        WATER: "水",
+        LAVA: "岩浆",
+        SAND: "沙子",
+        IRON_ORE: "铁矿石",
+        GOLD_ORE: "金矿石"
+    }
+    
+    # 光线穿过方块时额外的衰减（空气为 0），以及方块自身发出的光照等级
+    BLOCK_OPACITY = {
+        GROUND: 3,
+        PLATFORM: 3,
+        GRASS: 3,
+        GLOWSTONE: 0,
+        WATER: 1,
+        LAVA: 3,
+        SAND: 3,
+        IRON_ORE: 3,
+        GOLD_ORE: 3
+    }
+    BLOCK_LIGHT = {
+        GLOWSTONE: 14,
+        LAVA: 12
+    }
+    SKY_COLOR = (135, 206, 235)
     
     def __init__(self, width, height, grid_size):
         """初始化世界"""
         self.width = width
         self.height = height
         self.grid_size = grid_size
-        self.grid = [[self.EMPTY for _ in range(width)] for _ in range(height)]
+        self.grid = np.zeros((height, width), dtype=np.uint8)
+        
+        # 每一列最上面的非空方块所在的行（整列为空时等于 height），用于计算阳光
+        self.heights = np.full(width, height, dtype=np.int32)
         
         # 定义方块颜色
-        self.block_colors = {
-            self.EMPTY: None,  # 空气方块不需要颜色
-            self.GROUND: (139, 69, 19),  # 泥土方块的颜色
-            self.PLATFORM: (128, 128, 128)  # 石头方块的颜色
-        }
+        self.block_colors = dict(self.BLOCK_COLORS)
+        
+        # 方块变化监听者，需要实现 on_block_changed(x, y, old, new)；
+        # 实现了 on_blocks_changed(xs, ys, old, new) 的监听者在批量修改时每批只通知一次
+        self.listeners = []
+        
+        # 为真时修改只写入方块数组并记录下来，由 flush_changes 合并后一次性
+        # 更新地表高度和通知监听者（模拟核心在每帧结束时调用）
+        self.deferred = False
+        self.pending = []  # 推迟通知的批量变化 [(xs, ys, 旧类型), ...]
+        self.pending_tiles = []  # 推迟通知的单格变化 (x, y, 旧类型)
+    
+    @classmethod
+    def color_lut(cls, sky_color=None):
+        """返回方块类型到 RGB 颜色的查找表（256x3 的 uint8 数组）
+
+        用 lut[grid] 可以一次性把整个方块数组转换成像素颜色。
+        """
+        lut = np.empty((256, 3), dtype=np.uint8)
+        lut[:] = cls.UNKNOWN_COLOR
+        for block_type, color in cls.BLOCK_COLORS.items():
+            lut[block_type] = color if color is not None else (sky_color or cls.SKY_COLOR)
+        return lut
     
     def draw(self, surface, camera_x, camera_y):
         """绘制世界"""
@@ -48,16 +132,123 @@ class World:
                     if block_type != self.EMPTY:  # 只给非空方块添加边框
                         pygame.draw.rect(surface, (0, 0, 0), rect, 2)  # 2像素宽的黑色边框
     
+    def set_grid(self, grid):
+        """设置整个方块数组（例如从地图文件加载的嵌套列表）"""
+        self.grid = np.asarray(grid, dtype=np.uint8)
+        self.height, self.width = self.grid.shape
+        solid = self.grid != self.EMPTY
+        self.heights = np.where(solid.any(axis=0), solid.argmax(axis=0), self.height).astype(np.int32)
+    
+    def add_listener(self, listener):
+        """注册方块变化监听者"""
+        self.listeners.append(listener)
+    
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    
     def get_block(self, x, y):
         """获取指定位置的方块类型"""
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.grid[y][x]
+            return int(self.grid[y, x])
         return self.EMPTY
     
+    def is_solid(self, x, y):
+        """指定位置是否为实心方块（世界外视为非实心）"""
+        return bool(self.SOLID[self.get_block(x, y)])
+    
     def set_block(self, x, y, block_type):
-        """设置指定位置的方块类型"""
+        """设置指定位置的方块类型，并通知监听者"""
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.grid[y][x] = block_type
+            old = int(self.grid[y, x])
+            if old == block_type:
+                return
+            self.grid[y, x] = block_type
+            if self.deferred:
+                self.pending_tiles.append((x, y, old))
+                return
+            self.update_height(x, y, block_type)
+            for listener in self.listeners:
+                listener.on_block_changed(x, y, old, block_type)
+        
+    def set_blocks(self, xs, ys, block_types):
+        """批量设置方块（坐标不应重复），世界外的坐标被忽略
+
+        block_types 可以是一个类型或与坐标等长的数组。返回实际变化了的格子
+        (xs, ys, 旧类型, 新类型)，地表高度按列、监听者按批只更新一次。
+        """
+        xs = np.asarray(xs, dtype=np.int64).ravel()
+        ys = np.asarray(ys, dtype=np.int64).ravel()
+        new = np.broadcast_to(np.asarray(block_types, dtype=np.uint8), xs.shape)
+        keep = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys, new = xs[keep], ys[keep], new[keep]
+        old = self.grid[ys, xs]
+        keep = old != new
+        xs, ys, old, new = xs[keep], ys[keep], old[keep], new[keep]
+        if len(xs) == 0:
+            return xs, ys, old, new
+        self.grid[ys, xs] = new
+        if self.deferred:
+            self.seal_tiles()
+            self.pending.append((xs, ys, old))
+        else:
+            self.update_heights(np.unique(xs))
+            self.notify(xs, ys, old, new)
+        return xs, ys, old, new
+    
+    def seal_tiles(self):
+        """把记录的单格变化转成一批，保持变化的先后顺序"""
+        if self.pending_tiles:
+            xs, ys, old = zip(*self.pending_tiles)
+            self.pending.append((np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64),
+                                 np.array(old, dtype=np.uint8)))
+            self.pending_tiles = []
+    
+    def flush_changes(self):
+        """合并推迟的变化并一次性通知，返回通知的格子数
+
+        同一格变化多次时旧类型取第一次的、新类型取方块数组里现在的，
+        最后变回原样的格子不通知。
+        """
+        self.seal_tiles()
+        if not self.pending:
+            return 0
+        xs, ys, old = (np.concatenate(values) for values in zip(*self.pending))
+        self.pending = []
+        _, first = np.unique(ys * self.width + xs, return_index=True)
+        xs, ys, old = xs[first], ys[first], old[first]
+        self.update_heights(np.unique(xs))
+        new = self.grid[ys, xs]
+        changed = old != new
+        if not changed.any():
+            return 0
+        xs, ys, old, new = xs[changed], ys[changed], old[changed], new[changed]
+        self.notify(xs, ys, old, new)
+        return len(xs)
+    
+    def notify(self, xs, ys, old, new):
+        """把一批变化通知给监听者，只有逐格接口的监听者逐格通知"""
+        for listener in self.listeners:
+            bulk = getattr(listener, 'on_blocks_changed', None)
+            if bulk is not None:
+                bulk(xs, ys, old, new)
+            else:
+                for change in zip(xs.tolist(), ys.tolist(), old.tolist(), new.tolist()):
+                    listener.on_block_changed(*change)
+    
+    def update_heights(self, columns):
+        """重新计算这些列的地表高度"""
+        solid = self.grid[:, columns] != self.EMPTY
+        self.heights[columns] = np.where(solid.any(axis=0), solid.argmax(axis=0), self.height)
+        
+    def update_height(self, x, y, block_type):
+        """方块变化后更新该列的地表高度"""
+        if block_type != self.EMPTY:
+            if y < self.heights[x]:
+                self.heights[x] = y
+        elif y == self.heights[x]:
+            solid = np.flatnonzero(self.grid[y:, x])
+            self.heights[x] = y + solid[0] if len(solid) else self.height
         
     def generate_terrain(self):
         """生成基本地形"""
@@ -89,6 +280,14 @@ class World:
                     
         return grid
         
+    def camera_target(self, center_x, center_y, view_width, view_height):
+        """让 (center_x, center_y) 处于视野中心、且不超出世界边界的摄像机位置（像素）"""
+        target_x = center_x - view_width // 2
+        target_y = center_y - view_height // 2
+        target_x = max(0, min(target_x, self.width * self.grid_size - view_width))
+        target_y = max(0, min(target_y, self.height * self.grid_size - view_height))
+        return target_x, target_y
+        
     def get_world_size(self):
         """返回世界的像素尺寸"""
         return self.width * self.grid_size, self.height * self.grid_size
@@ -109,7 +308,7 @@ class World:
         # 检查实体占据的所有网格是否有碰撞
         for y in range(grid_y, grid_bottom + 1):
             for x in range(grid_x, grid_right + 1):
-                if self.grid[y][x] != self.EMPTY:
+                if self.SOLID[self.grid[y, x]]:
                     return True
                     
         return False 
\ No newline at end of file
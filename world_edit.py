@@ -0,0 +1,174 @@
+import numpy as np
+
+
+class EditRecord:
+    """一次批量编辑实际改变的格子：一维下标（y * 宽 + x）、旧类型、新类型"""
+    __slots__ = ('index', 'old', 'new')
+
+    def __init__(self, index, old, new):
+        self.index = index
+        self.old = old
+        self.new = new
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.old.nbytes + self.new.nbytes
+
+
+class WorldEditor:
+    """批量编辑世界（爆炸、建造工具、放置建筑）和撤销/重做
+
+    每个操作先用 NumPy 切片和掩码算出要修改的格子，再用一次 World.set_blocks
+    写入，地表高度和监听者（光照、渲染缓存、小地图等）每个操作只更新一次。
+    撤销历史只保存实际变化的格子（每格 6 字节），总大小超过 MAX_HISTORY_BYTES
+    时丢弃最旧的记录。
+    replace 参数限制只修改这些类型的方块（一个类型或类型列表），None 表示不限制。
+    """
+    MAX_HISTORY = 100  # 最多能撤销的操作数
+    MAX_HISTORY_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, world):
+        self.world = world
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def clip(self, x0, y0, x1, y1):
+        """矩形与世界的交集，没有交集时返回 None"""
+        x0, y0 = max(int(x0), 0), max(int(y0), 0)
+        x1, y1 = min(int(x1), self.world.width), min(int(y1), self.world.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def apply_mask(self, x0, y0, mask, block_types, replace=None):
+        """把 mask（左上角在 (x0, y0)）为真的格子设成 block_types，返回变化的格子数
+
+        block_types 可以是一个类型，也可以是与 mask 同形状的数组。
+        """
+        height, width = mask.shape
+        if replace is not None:
+            mask = mask & np.isin(self.world.grid[y0:y0 + height, x0:x0 + width], replace)
+        rows, cols = np.nonzero(mask)
+        block_types = np.asarray(block_types, dtype=np.uint8)
+        if block_types.ndim:
+            block_types = block_types[rows, cols]
+        xs, ys, old, new = self.world.set_blocks(cols + x0, rows + y0, block_types)
+        if len(xs):
+            self.push(EditRecord((ys * self.world.width + xs).astype(np.uint32), old, new))
+        return len(xs)
+
+    def fill_rect(self, x0, y0, x1, y1, block_type, replace=None):
+        """填充矩形 [x0, x1) × [y0, y1)"""
+        rect = self.clip(x0, y0, x1, y1)
+        if rect is None:
+            return 0
+        x0, y0, x1, y1 = rect
+        return self.apply_mask(x0, y0, np.ones((y1 - y0, x1 - x0), dtype=bool), block_type, replace)
+
+    def fill_circle(self, center_x, center_y, radius, block_type, replace=None):
+        """填充以 (center_x, center_y) 为圆心的圆（例如爆炸用 EMPTY 替换实心方块）"""
+        rect = self.clip(center_x - radius, center_y - radius, center_x + radius + 1, center_y + radius + 1)
+        if rect is None:
+            return 0
+        x0, y0, x1, y1 = rect
+        dx = np.arange(x0, x1) - center_x
+        dy = np.arange(y0, y1) - center_y
+        mask = dx[None, :] ** 2 + dy[:, None] ** 2 <= radius * radius
+        return self.apply_mask(x0, y0, mask, block_type, replace)
+
+    def flood_fill(self, x, y, block_type, max_radius=64):
+        """把与 (x, y) 相连（上下左右）的同类方块换成 block_type，只在 max_radius 以内搜索
+
+        连通区域用整段扩展求出：轮流沿行和沿列把区域扩展到它接触的整段同类方块，
+        直到不再变化，迭代次数只与区域的拐弯数有关。
+        """
+        rect = self.clip(x - max_radius, y - max_radius, x + max_radius + 1, y + max_radius + 1)
+        if rect is None or not (0 <= x < self.world.width and 0 <= y < self.world.height):
+            return 0
+        x0, y0, x1, y1 = rect
+        target = self.world.grid[y0:y1, x0:x1] == self.world.grid[y, x]
+        region = np.zeros_like(target)
+        region[y - y0, x - x0] = True
+        count = 1
+        while True:
+            region = spread_runs(region, target)
+            region = spread_runs(region.T, target.T).T
+            new_count = int(region.sum())
+            if new_count == count:
+                break
+            count = new_count
+        return self.apply_mask(x0, y0, region, block_type)
+
+    def paste(self, stamp, x, y, transparent=None):
+        """把方块数组 stamp 贴到左上角 (x, y)，stamp 里等于 transparent 的格子不修改"""
+        stamp = np.asarray(stamp, dtype=np.uint8)
+        height, width = stamp.shape
+        rect = self.clip(x, y, x + width, y + height)
+        if rect is None:
+            return 0
+        x0, y0, x1, y1 = rect
+        stamp = stamp[y0 - y:y1 - y, x0 - x:x1 - x]
+        mask = np.ones(stamp.shape, dtype=bool) if transparent is None else stamp != transparent
+        return self.apply_mask(x0, y0, mask, stamp)
+
+    def copy(self, x0, y0, x1, y1):
+        """复制矩形里的方块，可以用 paste 贴到别处"""
+        rect = self.clip(x0, y0, x1, y1)
+        if rect is None:
+            return np.zeros((0, 0), dtype=np.uint8)
+        x0, y0, x1, y1 = rect
+        return self.world.grid[y0:y1, x0:x1].copy()
+
+    def push(self, record):
+        """记录一次编辑，清空重做历史"""
+        self.undo_stack.append(record)
+        self.redo_stack.clear()
+        total = sum(record.nbytes for record in self.undo_stack)
+        while (len(self.undo_stack) > self.MAX_HISTORY or
+               (total > self.MAX_HISTORY_BYTES and len(self.undo_stack) > 1)):
+            total -= self.undo_stack.pop(0).nbytes
+
+    def restore(self, record, expected, values):
+        """把仍然是 expected 的格子改成 values，返回只包含这些格子的记录
+
+        编辑之后又被别的修改（破坏、放置、液体流动等）改过的格子保持不变，
+        并且从记录里去掉：撤销不会覆盖之后的修改，重做也不会让已经挖走的
+        方块重新出现。
+        """
+        width = self.world.width
+        index = record.index.astype(np.int64)
+        xs, ys = index % width, index // width
+        keep = self.world.grid[ys, xs] == expected
+        self.world.set_blocks(xs[keep], ys[keep], values[keep])
+        return EditRecord(record.index[keep], record.old[keep], record.new[keep])
+
+    def undo(self):
+        """撤销最近一次编辑，返回是否撤销了"""
+        if not self.undo_stack:
+            return False
+        record = self.undo_stack.pop()
+        self.redo_stack.append(self.restore(record, record.new, record.old))
+        return True
+
+    def redo(self):
+        """重做最近一次撤销的编辑，返回是否重做了"""
+        if not self.redo_stack:
+            return False
+        record = self.redo_stack.pop()
+        self.undo_stack.append(self.restore(record, record.old, record.new))
+        return True
+
+
+def spread_runs(region, target):
+    """把 region 扩展到它接触的、沿行连续的整段 target"""
+    height, width = target.shape
+    starts = target.copy()
+    starts[:, 1:] &= ~target[:, :-1]
+    labels = np.cumsum(starts.ravel()).reshape(height, width) * target
+    hit = np.zeros(int(labels.max()) + 1, dtype=bool)
+    hit[labels[region & target]] = True
+    hit[0] = False
+    return hit[labels]
@@ -0,0 +1,146 @@
+import pygame
+import numpy as np
+from world import World
+
+
+def downsample(pixels):
+    """把 RGB 图像按 2×2 取平均缩小一半（奇数边长时复制边缘）"""
+    height, width = pixels.shape[:2]
+    if height % 2 or width % 2:
+        pixels = np.pad(pixels, ((0, height % 2), (0, width % 2), (0, 0)), mode='edge')
+    total = pixels.astype(np.uint16)
+    total = total[0::2, 0::2] + total[1::2, 0::2] + total[0::2, 1::2] + total[1::2, 1::2]
+    return (total // 4).astype(np.uint8)
+
+
+class WorldMap:
+    """可缩放的世界地图，由多级细节（mip）金字塔支撑
+
+    第 0 级每个方块一个像素，之后每一级边长减半。每一级被切成 TILE×TILE 像素的
+    图块，缩放级别都是 2 的整数次幂，所以绘制时只需原样 blit 覆盖屏幕的几个图块。
+    方块变化时只标记所在的区块，在下次绘制前逐级重新计算该区块对应的像素。
+    """
+    TILE = 256
+    MAX_ZOOM = 2  # 放大到每个方块 2**MAX_ZOOM 个像素
+
+    def __init__(self, world):
+        self.world = world
+        self.lut = World.color_lut()
+
+        # 逐级构建金字塔，直到最高一级能放进一个图块
+        self.levels = [self.lut[world.grid]]
+        while max(self.levels[-1].shape[:2]) > self.TILE:
+            self.levels.append(downsample(self.levels[-1]))
+
+        self.tiles = {}  # (缩放, 图块x, 图块y) -> Surface
+        self.dirty_chunks = set()
+        self.zoom = 0
+        world.add_listener(self)
+
+    @property
+    def min_zoom(self):
+        return -(len(self.levels) - 1)
+
+    def fit_zoom(self, screen_size):
+        """能让整个世界放进屏幕的最大缩放级别"""
+        for level, pixels in enumerate(self.levels):
+            if pixels.shape[1] <= screen_size[0] and pixels.shape[0] <= screen_size[1]:
+                return -level
+        return self.min_zoom
+
+    def set_zoom(self, zoom):
+        """设置缩放级别，返回是否改变"""
+        zoom = max(self.min_zoom, min(self.MAX_ZOOM, zoom))
+        changed = zoom != self.zoom
+        self.zoom = zoom
+        return changed
+
+    def on_block_changed(self, x, y, old, new):
+        self.levels[0][y, x] = self.lut[new]
+        self.dirty_chunks.add((x // self.TILE, y // self.TILE))
+
+    def on_blocks_changed(self, xs, ys, old, new):
+        self.levels[0][ys, xs] = self.lut[new]
+        self.dirty_chunks.update(zip((xs // self.TILE).tolist(), (ys // self.TILE).tolist()))
+
+    def flush(self):
+        """逐级重新计算变化区块对应的像素，并丢弃受影响的图块缓存"""
+        for chunk_x, chunk_y in self.dirty_chunks:
+            x0, y0 = chunk_x * self.TILE, chunk_y * self.TILE
+            x1, y1 = x0 + self.TILE, y0 + self.TILE
+            for level in range(1, len(self.levels)):
+                # 上一级的区域边界对齐到偶数，保证 2×2 取样不跨越边界
+                x0, y0 = x0 // 2, y0 // 2
+                x1, y1 = -(-x1 // 2), -(-y1 // 2)
+                dst = self.levels[level]
+                x1, y1 = min(x1, dst.shape[1]), min(y1, dst.shape[0])
+                src = self.levels[level - 1][y0 * 2:y1 * 2, x0 * 2:x1 * 2]
+                dst[y0:y1, x0:x1] = downsample(src)[:y1 - y0, :x1 - x0]
+            self.drop_tiles(chunk_x, chunk_y)
+        self.dirty_chunks.clear()
+
+    def drop_tiles(self, chunk_x, chunk_y):
+        """丢弃与第 0 级某个区块重叠的所有图块"""
+        for key in list(self.tiles):
+            zoom, tile_x, tile_y = key
+            if zoom >= 0:
+                # 放大的图块覆盖 TILE >> zoom 个方块
+                span = self.TILE >> zoom
+                hit = tile_x * span // self.TILE == chunk_x and tile_y * span // self.TILE == chunk_y
+            else:
+                hit = tile_x == chunk_x >> -zoom and tile_y == chunk_y >> -zoom
+            if hit:
+                del self.tiles[key]
+
+    def get_tile(self, tile_x, tile_y):
+        """返回当前缩放级别下的一个图块（缓存）"""
+        key = (self.zoom, tile_x, tile_y)
+        surface = self.tiles.get(key)
+        if surface is None:
+            level = max(0, -self.zoom)
+            scale = 1 << max(0, self.zoom)
+            span = self.TILE // scale  # 图块覆盖的源像素数
+            pixels = self.levels[level][tile_y * span:(tile_y + 1) * span,
+                                        tile_x * span:(tile_x + 1) * span]
+            if scale > 1:
+                pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+            surface = pygame.surfarray.make_surface(pixels.swapaxes(0, 1))
+            self.tiles[key] = surface
+        return surface
+
+    def draw(self, screen, center_x, center_y, player=None):
+        """以 (center_x, center_y)（方块坐标）为中心绘制地图"""
+        self.flush()
+        screen.fill((20, 20, 30))
+        screen_w, screen_h = screen.get_size()
+        level_w, level_h = self.levels[0].shape[1], self.levels[0].shape[0]
+
+        # 当前缩放下世界的像素尺寸和屏幕左上角对应的世界像素坐标
+        scale = 2.0 ** self.zoom
+        world_w, world_h = int(level_w * scale), int(level_h * scale)
+        if world_w <= screen_w:
+            origin_x = -(screen_w - world_w) // 2
+        else:
+            origin_x = int(max(0, min(center_x * scale - screen_w / 2, world_w - screen_w)))
+        if world_h <= screen_h:
+            origin_y = -(screen_h - world_h) // 2
+        else:
+            origin_y = int(max(0, min(center_y * scale - screen_h / 2, world_h - screen_h)))
+
+        # 只 blit 与屏幕相交的图块
+        first_x, first_y = max(0, origin_x // self.TILE), max(0, origin_y // self.TILE)
+        last_x = min(-(-world_w // self.TILE), (origin_x + screen_w) // self.TILE + 1)
+        last_y = min(-(-world_h // self.TILE), (origin_y + screen_h) // self.TILE + 1)
+        screen.blits([
+            (self.get_tile(tile_x, tile_y),
+             (tile_x * self.TILE - origin_x, tile_y * self.TILE - origin_y))
+            for tile_y in range(first_y, last_y)
+            for tile_x in range(first_x, last_x)
+        ], doreturn=False)
+
+        if player is not None:
+            grid_size = self.world.grid_size
+            pos = (int(player.rect.centerx / grid_size * scale) - origin_x,
+                   int(player.rect.centery / grid_size * scale) - origin_y)
+            pygame.draw.circle(screen, (255, 0, 0), pos, 4)
+            pygame.draw.circle(screen, (255, 255, 255), pos, 4, 1)